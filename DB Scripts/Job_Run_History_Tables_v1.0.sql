@@ -0,0 +1,34 @@
+-- Create Scheduled Job Run History Tables
+-- One row per execution of a scheduled job (daily/monthly performance calculation)
+IF OBJECT_ID('cms.job_runs', 'U') IS NULL
+CREATE TABLE cms.job_runs (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    job_id NVARCHAR(100) NOT NULL,
+    job_name NVARCHAR(200) NULL,
+    status NVARCHAR(20) NOT NULL,
+    started_at DATETIME2 NOT NULL,
+    finished_at DATETIME2 NULL,
+    duration_ms FLOAT NULL,
+    rows_affected INT NULL,
+    statement_count INT NULL,
+    error NVARCHAR(MAX) NULL
+);
+
+-- Optional: Create an index for better query performance
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_job_runs_job_id_started_at')
+CREATE INDEX IX_job_runs_job_id_started_at ON cms.job_runs(job_id, started_at DESC);
+
+--============================================================================================
+-- Per-statement timings for each job run
+IF OBJECT_ID('cms.job_run_statements', 'U') IS NULL
+CREATE TABLE cms.job_run_statements (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    job_run_id INT NOT NULL REFERENCES cms.job_runs(id),
+    position INT NOT NULL,
+    statement NVARCHAR(400) NOT NULL,
+    duration_ms FLOAT NOT NULL,
+    rows_affected INT NULL
+);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_job_run_statements_job_run_id')
+CREATE INDEX IX_job_run_statements_job_run_id ON cms.job_run_statements(job_run_id);
@@ -1,26 +1,15 @@
 from flask import Flask
 import logging
-from logging.config import dictConfig
+import os
+import threading
 from sqlalchemy import text
 from .config import Config
 from .extensions import db, jwt, ma, cors
+from .startup_profile import StartupProfile
+from .log_pipeline import configure_logging
 
-# Configure logging
-dictConfig({
-    'version': 1,
-    'formatters': {'default': {
-        'format': '[%(asctime)s] %(levelname)s in %(module)s: %(message)s',
-    }},
-    'handlers': {'wsgi': {
-        'class': 'logging.StreamHandler',
-        'stream': 'ext://sys.stdout',
-        'formatter': 'default'
-    }},
-    'root': {
-        'level': 'INFO',
-        'handlers': ['wsgi']
-    }
-})
+# Configure logging: records are queued and written to stdout by a listener thread
+configure_logging(Config.LOG_LEVEL, Config.LOG_FORMAT, Config.LOG_QUEUE_SIZE)
 
 logger = logging.getLogger(__name__)
 
@@ -33,82 +22,174 @@ def test_db_connection(app):
         logger.error(f'Database connection failed! Error: {str(e)}')
         raise
 
+def _test_db_connection_in_background(app):
+    def probe():
+        try:
+            test_db_connection(app)
+        except Exception as e:
+            logger.warning(f'Background database connection test failed: {str(e)}')
+
+    threading.Thread(target=probe, name='db-probe', daemon=True).start()
+
+def _start_scheduler_later(app, delay):
+    def start():
+        from app.jobs.scheduler import flask_scheduler
+        flask_scheduler.init_scheduler(app)
+        logger.info('Deferred scheduler started')
+
+    timer = threading.Timer(delay, start)
+    timer.daemon = True
+    timer.start()
+    app.extensions['scheduler_timer'] = timer
+
+def _setup_swagger(app, fast_start):
+    from .swagger_setup import setup_swagger, setup_lazy_swagger, setup_static_swagger
+
+    if app.config['SWAGGER_MODE'] == 'static':
+        spec_file = app.config['SWAGGER_SPEC_FILE']
+        if os.path.exists(spec_file):
+            setup_static_swagger(app, spec_file)
+            logger.info(f'Serving prebuilt Swagger spec from {spec_file}')
+            return
+        logger.warning(f'Swagger spec artifact {spec_file} not found, building it on first request')
+        setup_lazy_swagger(app)
+    elif fast_start:
+        # Spec is built on the first request to /api/apispec_1.json
+        setup_lazy_swagger(app)
+        logger.info('Swagger spec deferred to first request')
+    else:
+        setup_swagger(app)
+        logger.info('Swagger documentation setup successfully')
+
 def create_app(config_class=Config):
+    profile = StartupProfile()
     app = Flask(__name__)
-    try:
-        app.config.from_object(Config)
-        logger.info('Configuration loaded successfully')
-    except Exception as e:
-        logger.error(f'Failed to load configuration: {str(e)}')
-        raise
+    with profile.phase('config'):
+        try:
+            app.config.from_object(Config)
+            logger.info('Configuration loaded successfully')
+        except Exception as e:
+            logger.error(f'Failed to load configuration: {str(e)}')
+            raise
+    fast_start = app.config['FAST_START']
 
-    from app.models.appointments import DrugPickup, ViralLoad
-    from app.models.cmt import CMT
-    from app.models.user import User, Roles, UserRoles
-    from app.models.patient import Patient
-    from app.models.facility import Facility, State
-    from app.models.case_manager import CaseManager
-    from app.models.performance import CaseManagerPerformance
+    with profile.phase('models'):
+        from app.models.appointments import DrugPickup, ViralLoad
+        from app.models.cmt import CMT
+        from app.models.user import User, Roles, UserRoles
+        from app.models.patient import Patient
+        from app.models.facility import Facility, State
+        from app.models.case_manager import CaseManager
+        from app.models.performance import CaseManagerPerformance
+        from app.models.job_run import JobRun, JobRunStatement
 
     # Initialize extensions
-    db.init_app(app)
-    jwt.init_app(app)
-    cors.init_app(
-        app,
-        supports_credentials=True,
-        resources={
-            r"/api/*": {
-                "origins": ["http://localhost:5001", 'http://eboard.ecews.org:5001']  # Replace with your frontend's origin
+    with profile.phase('extensions'):
+        from .utils.db_pool import configure_pool, register_pool_events
+        from .utils.slow_queries import register_slow_query_log
+        from .utils.cache import register_cache
+        from .db_routing import configure_replica, register_replica_events
+        configure_pool(app)
+        configure_replica(app)
+        db.init_app(app)
+        register_pool_events(app)
+        register_replica_events(app)
+        register_slow_query_log(app)
+        register_cache(app)
+        jwt.init_app(app)
+        cors.init_app(
+            app,
+            supports_credentials=True,
+            resources={
+                r"/api/*": {
+                    "origins": ["http://localhost:5001", 'http://eboard.ecews.org:5001']  # Replace with your frontend's origin
+                }
             }
-        }
-    )
- 
-    ma.init_app(app)
+        )
+
+        ma.init_app(app)
 
     # Test database connection (non-blocking)
-    try:
-        test_db_connection(app)
-    except Exception as e:
-        logger.warning(f'Initial database connection test failed, but continuing: {str(e)}')
-    
-    with app.app_context():
-        from app.jobs.scheduler import flask_scheduler
-        scheduler = flask_scheduler.init_scheduler(app)
-        
+    if fast_start:
+        _test_db_connection_in_background(app)
+        profile.deferred('db_probe')
+    else:
+        with profile.phase('db_probe'):
+            try:
+                test_db_connection(app)
+            except Exception as e:
+                logger.warning(f'Initial database connection test failed, but continuing: {str(e)}')
+
+    if not app.config['SCHEDULER_ENABLED']:
+        logger.info('Scheduler disabled for this process')
+    elif fast_start:
+        _start_scheduler_later(app, app.config['SCHEDULER_START_DELAY'])
+        profile.deferred('scheduler')
+    else:
+        with profile.phase('scheduler'):
+            with app.app_context():
+                from app.jobs.scheduler import flask_scheduler
+                scheduler = flask_scheduler.init_scheduler(app)
 
     # Import and register blueprints
-    from .routes import (
-        auth_bp, user_bp, cmt_bp, case_manager_bp, 
-        patient_bp, dashboard_bp, report_bp, home_bp, 
-        facility_bp, performance_bp
-    )
-
-    app.register_blueprint(auth_bp)
-    app.register_blueprint(user_bp)
-    app.register_blueprint(cmt_bp)
-    app.register_blueprint(case_manager_bp)
-    app.register_blueprint(patient_bp)
-    app.register_blueprint(dashboard_bp)
-    app.register_blueprint(report_bp)
-    app.register_blueprint(home_bp)
-    app.register_blueprint(facility_bp)
-    app.register_blueprint(performance_bp)
-    logger.info('Blueprints registered successfully')
+    with profile.phase('blueprints'):
+        from .routes import (
+            auth_bp, user_bp, cmt_bp, case_manager_bp,
+            patient_bp, dashboard_bp, report_bp, home_bp,
+            facility_bp, performance_bp, admin_bp
+        )
+
+        app.register_blueprint(auth_bp)
+        app.register_blueprint(user_bp)
+        app.register_blueprint(cmt_bp)
+        app.register_blueprint(case_manager_bp)
+        app.register_blueprint(patient_bp)
+        app.register_blueprint(dashboard_bp)
+        app.register_blueprint(report_bp)
+        app.register_blueprint(home_bp)
+        app.register_blueprint(facility_bp)
+        app.register_blueprint(performance_bp)
+        app.register_blueprint(admin_bp)
+        logger.info('Blueprints registered successfully')
 
     # Register error handlers
     from .utils import register_error_handlers
     register_error_handlers(app)
 
+    # Response serialization and compression
+    from .utils.json_provider import init_json_provider
+    from .utils.compression import register_compression
+    if init_json_provider(app):
+        logger.info('Using orjson JSON provider')
+    register_compression(app)
+
+    # Request, database and pool metrics for /metrics
+    from .utils.metrics import register_metrics
+    register_metrics(app)
+
+    # Sampled per-request traces of service calls and SQL
+    from .utils.tracing import register_tracing
+    register_tracing(app)
+
+    # Sampled CPU profiles of requests sent with X-Profile by a Super Admin
+    from .utils.profiling import register_profiling
+    register_profiling(app)
+
+    # tracemalloc profiles of requests sent with X-Memory-Profile, and of a sample of all
+    from .utils.memory_profiling import register_memory_profiling
+    register_memory_profiling(app)
+
     # Register CLI commands
     from app.cli.commands import register_commands
     register_commands(app)
-    
+
     # Setup Swagger documentation (non-intrusive)
-    try:
-        from .swagger_setup import setup_swagger
-        setup_swagger(app)
-        logger.info('Swagger documentation setup successfully')
-    except Exception as e:
-        logger.warning(f'Swagger setup failed, but continuing: {str(e)}')
-    
+    with profile.phase('swagger'):
+        try:
+            _setup_swagger(app, fast_start)
+        except Exception as e:
+            logger.warning(f'Swagger setup failed, but continuing: {str(e)}')
+
+    profile.finish()
+    app.extensions['startup_profile'] = profile
     return app
@@ -1,6 +1,10 @@
 import click
+import json
+import time
+from flask import current_app
 from flask.cli import with_appcontext
 from app import db
+from app.startup_profile import PROFILED_IMPORTS, measure_import_times
 
 @click.command('init-db')
 @with_appcontext
@@ -41,8 +45,340 @@ def recreate_db():
         click.echo(f'Error recreating database: {str(e)}', err=True)
         raise
 
+@click.command('startup-profile')
+@click.option('--module', 'modules', multiple=True,
+              help='Extra module to time the import of (repeatable).')
+@click.option('--as-json', is_flag=True, help='Print the report as JSON.')
+@with_appcontext
+def startup_profile(modules, as_json):
+    """Report time spent per create_app phase and per heavy import."""
+    profile = current_app.extensions['startup_profile'].to_dict()
+    imports = measure_import_times(PROFILED_IMPORTS + list(modules))
+
+    if as_json:
+        click.echo(json.dumps({'startup': profile, 'imports': imports}, indent=2))
+        return
+
+    mode = 'fast start' if current_app.config['FAST_START'] else 'standard'
+    click.echo(f'create_app phases ({mode} mode):')
+    for phase in profile['phases']:
+        duration = 'deferred' if phase.get('deferred') else f"{phase['duration_ms']:10.1f} ms"
+        click.echo(f"  {phase['phase']:<20}{duration:>13}")
+    click.echo(f"  {'total':<20}{profile['total_ms']:10.1f} ms")
+
+    click.echo('Cold imports (fresh interpreter, cumulative):')
+    for result in imports:
+        if result['cumulative_ms'] is None:
+            click.echo(f"  {result['module']:<20}{'failed':>13}  {result['error'] or ''}")
+        else:
+            click.echo(f"  {result['module']:<20}{result['cumulative_ms']:10.1f} ms")
+
+@click.command('build-apispec')
+@click.option('--output', default=None,
+              help='Where to write the spec (defaults to SWAGGER_SPEC_FILE).')
+@with_appcontext
+def build_apispec(output):
+    """Compile the Swagger spec from route docstrings into a static JSON file."""
+    from app.swagger_setup import write_apispec
+
+    output = output or current_app.config['SWAGGER_SPEC_FILE']
+    spec = write_apispec(current_app._get_current_object(), output)
+    click.echo(f"Wrote {len(spec.get('paths', {}))} paths to {output}")
+
+@click.command('serve')
+@click.option('--bind', default=None, help='host:port to listen on (defaults to WEB_BIND).')
+@click.option('--workers', type=int, default=None, help='Worker processes (defaults to WEB_WORKERS).')
+@click.option('--threads', type=int, default=None, help='Threads per worker (defaults to WEB_THREADS).')
+@with_appcontext
+def serve(bind, workers, threads):
+    """Serve the app with gunicorn: preloaded app, forked workers, no scheduler."""
+    from app.jobs.scheduler import flask_scheduler
+    from app.server import serve as serve_app
+
+    timer = current_app.extensions.get('scheduler_timer')
+    if timer:
+        timer.cancel()
+    if flask_scheduler.scheduler.running:
+        # Jobs belong to `flask run-scheduler`; never run them once per worker
+        flask_scheduler.scheduler.shutdown(wait=False)
+        click.echo('Scheduler stopped for web workers; set SCHEDULER_ENABLED=false to skip starting it', err=True)
+
+    serve_app(current_app._get_current_object(), bind=bind, workers=workers, threads=threads)
+
+@click.command('run-scheduler')
+@with_appcontext
+def run_scheduler():
+    """Run the scheduled performance jobs in the foreground."""
+    import signal
+    import threading
+    from app.jobs.scheduler import flask_scheduler
+
+    if not flask_scheduler.scheduler.running:
+        flask_scheduler.init_scheduler(current_app._get_current_object())
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    signal.signal(signal.SIGINT, lambda *args: stop.set())
+    click.echo('Scheduler running, press Ctrl+C to stop')
+    stop.wait()
+    flask_scheduler.scheduler.shutdown()
+
+@click.command('plan-report')
+@click.option('--output', default=None, help='Also write the report as JSON to this file.')
+@click.option('--compare', 'baseline', default=None, type=click.Path(exists=True, dir_okay=False),
+              help='Earlier report (e.g. taken before `flask db upgrade`) to compare against.')
+@with_appcontext
+def plan_report(output, baseline):
+    """Show the query plans of the hot line list and appointment queries."""
+    from app.utils.query_plans import plan_report as build_report, compare_reports
+
+    report = build_report()
+    if output:
+        with open(output, 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+
+    click.echo(f"Query plans ({report['dialect']})")
+    for name, plan in report['queries'].items():
+        cost = f"{plan['estimated_cost']:.4f}" if plan['estimated_cost'] is not None else '-'
+        click.echo(f"  {name:<34}{plan['scans']:>3} scans {plan['seeks']:>3} seeks  cost {cost}")
+        for operator in plan['operators']:
+            click.echo(f"      {operator['operator']}: {operator['object']}")
+
+    if baseline:
+        with open(baseline) as baseline_file:
+            before = json.load(baseline_file)
+        click.echo(f"Compared with {baseline} (before -> after)")
+        for row in compare_reports(before, report):
+            click.echo(
+                f"  {row['query']:<34}scans {row['scans'][0]} -> {row['scans'][1]}, "
+                f"seeks {row['seeks'][0]} -> {row['seeks'][1]}, "
+                f"cost {row['estimated_cost'][0]} -> {row['estimated_cost'][1]}"
+            )
+
+@click.command('verify-predicates')
+@click.option('--reference', default=None, type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Reference date of the windows; defaults to now.')
+@with_appcontext
+def verify_predicates(reference):
+    """Check that the sargable date predicates match the DATEDIFF forms they replaced."""
+    from app.utils.predicates import verify_equivalence
+
+    results = verify_equivalence(db.session, reference)
+    for row in results:
+        status = 'ok' if row['equal'] else 'MISMATCH'
+        click.echo(f"  {row['predicate']:<30}legacy {row['legacy']:>8}  sargable {row['sargable']:>8}  {status}")
+    if not all(row['equal'] for row in results):
+        raise click.ClickException('Sargable predicates do not match the legacy counts')
+    click.echo('All predicates match.')
+
+@click.command('gen-synthetic')
+@click.option('--patients', default=1_000_000, show_default=True, type=int, help='Line list rows to generate.')
+@click.option('--seed', default=42, show_default=True, type=int, help='Random seed; same seed, same data.')
+@click.option('--reference', default=None, type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Date the data is generated relative to; defaults to today.')
+@click.option('--batch-size', default=5000, show_default=True, type=int, help='Rows per insert batch.')
+@click.option('--clear', is_flag=True, help='Delete the existing rows of the generated tables first.')
+@click.option('--yes', is_flag=True, help='Do not ask before clearing.')
+@with_appcontext
+def gen_synthetic(patients, seed, reference, batch_size, clear, yes):
+    """Fill the database with a synthetic national-scale line list."""
+    from app.utils.synthetic import clear as clear_tables, generate
+
+    if clear:
+        if not yes:
+            click.confirm('Delete all line list, appointment, case manager, CMT, facility and state rows?',
+                          abort=True)
+        clear_tables(db.session)
+    started = time.perf_counter()
+    try:
+        counts = generate(db.session, patients=patients, seed=seed, reference=reference, batch_size=batch_size)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    for table, count in counts.items():
+        click.echo(f"  {table:<24}{count:>10}")
+    click.echo(f"Generated in {time.perf_counter() - started:.1f}s")
+
+@click.command('bench-services')
+@click.option('--sizes', default='10000,100000', show_default=True,
+              help='Comma-separated line list sizes to generate and benchmark.')
+@click.option('--existing', is_flag=True, help='Benchmark the data already in the database instead of generating it.')
+@click.option('--repeat', default=5, show_default=True, type=int, help='Timed runs per benchmark.')
+@click.option('--only', multiple=True, help='Run only these benchmarks (e.g. dashboard.get_stats).')
+@click.option('--seed', default=42, show_default=True, type=int, help='Seed of the generated data.')
+@click.option('--reference', default=None, type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Reference date of the generated data and the dashboard window; defaults to today.')
+@click.option('--baseline', default=None, type=click.Path(exists=True, dir_okay=False),
+              help='Fail when results regress against this baseline file.')
+@click.option('--threshold', default=0.25, show_default=True, type=float,
+              help='Allowed relative growth of wall time and peak memory.')
+@click.option('--save-baseline', default=None, help='Write the results to this file as the new baseline.')
+@click.option('--yes', is_flag=True, help='Do not ask before replacing the data with generated data.')
+@with_appcontext
+def bench_services(sizes, existing, repeat, only, seed, reference, baseline, threshold, save_baseline, yes):
+    """Benchmark the hot service methods on synthetic data and gate regressions."""
+    from app.utils.benchmarks import SERVICE_BENCHMARKS, run_benchmarks, compare, empty_results
+    from app.utils.synthetic import clear as clear_tables, generate
+
+    unknown = set(only) - set(SERVICE_BENCHMARKS)
+    if unknown:
+        raise click.BadParameter(f"unknown benchmarks {', '.join(sorted(unknown))}", param_hint='--only')
+    if not existing and not yes:
+        click.confirm('Replace all line list, appointment, case manager, CMT, facility and state rows '
+                      'with generated data?', abort=True)
+
+    results = {}
+    for size in ([None] if existing else [int(size) for size in sizes.split(',')]):
+        if size is not None:
+            clear_tables(db.session)
+            generate(db.session, patients=size, seed=seed, reference=reference)
+        run = run_benchmarks(repeat=repeat, only=only, reference=reference)
+        results[str(run['patients'])] = run['results']
+
+        click.echo(f"{run['patients']} patients")
+        for name, metrics in run['results'].items():
+            click.echo(
+                f"  {name:<50}{metrics['wall_ms']:>10.1f} ms {metrics['statements']:>6} stmts "
+                f"{metrics['peak_kb']:>10.1f} KB {metrics['result_size']:>6} rows"
+            )
+
+    empty = [(size, name) for size, sizes_results in results.items() for name in empty_results(sizes_results)]
+    for size, name in empty:
+        click.echo(f"  EMPTY {size} {name}: no result, check the log for a failed query", err=True)
+    if empty:
+        raise click.ClickException(f"{len(empty)} benchmarks returned no result; their timings are not meaningful")
+
+    if save_baseline:
+        with open(save_baseline, 'w') as baseline_file:
+            json.dump({'dialect': db.engine.dialect.name, 'threshold': threshold, 'sizes': results},
+                      baseline_file, indent=2)
+        click.echo(f"Baseline written to {save_baseline}")
+
+    if baseline:
+        with open(baseline) as baseline_file:
+            regressions = compare(json.load(baseline_file)['sizes'], results, threshold)
+        for row in regressions:
+            click.echo(
+                f"  REGRESSION {row['size']} {row['benchmark']} {row['metric']}: "
+                f"{row['baseline']} -> {row['current']}", err=True
+            )
+        if regressions:
+            raise click.ClickException(f"{len(regressions)} benchmark regressions against {baseline}")
+        click.echo(f"No regressions against {baseline}")
+
+@click.command('load-test')
+@click.option('--url', default=None, help='Base URL of the running app (defaults to WEB_BIND on localhost).')
+@click.option('--duration', default=60, show_default=True, type=int, help='Measured seconds of load.')
+@click.option('--warmup', default=5, show_default=True, type=int, help='Seconds of load before measuring.')
+@click.option('--concurrency', default=16, show_default=True, type=int, help='Client threads.')
+@click.option('--users-per-role', default=5, show_default=True, type=int, help='Synthetic users per role.')
+@click.option('--roles', default=None,
+              help='Traffic share per role, e.g. "Super Admin=1,State=3,Admin=4,CaseManager=8".')
+@click.option('--reference', default=None, type=click.DateTime(formats=['%Y-%m-%d']),
+              help='End of the dashboard date window; defaults to today.')
+@click.option('--seed', default=42, show_default=True, type=int, help='Seed of the users and the request mix.')
+@click.option('--output', default=None, help='Also write the report to this JSON file.')
+@click.option('--max-error-rate', default=None, type=float, help='Fail when the total error rate exceeds this.')
+@click.option('--keep-users', is_flag=True, help='Leave the synthetic users in the database afterwards.')
+@with_appcontext
+def load_test(url, duration, warmup, concurrency, users_per_role, roles, reference, seed, output,
+              max_error_rate, keep_users):
+    """Drive a weighted role and endpoint mix against a running instance and report latency."""
+    from app.utils.loadtest import ROLE_WEIGHTS, create_users, mint_tokens, remove_users, run_load
+
+    role_weights = dict(ROLE_WEIGHTS)
+    if roles:
+        try:
+            role_weights = {
+                name.strip(): float(weight)
+                for name, weight in (item.split('=') for item in roles.split(','))
+            }
+        except ValueError:
+            raise click.BadParameter('expected "Role=weight,..."', param_hint='--roles')
+        unknown = set(role_weights) - set(ROLE_WEIGHTS)
+        if unknown:
+            raise click.BadParameter(f"unknown roles {', '.join(sorted(unknown))}", param_hint='--roles')
+
+    if not url:
+        host, _, port = current_app.config['WEB_BIND'].rpartition(':')
+        url = f"http://{'127.0.0.1' if host in ('', '0.0.0.0') else host}:{port}"
+
+    try:
+        users = mint_tokens(create_users(db.session, users_per_role=users_per_role, seed=seed))
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Loading {url} from {concurrency} clients for {warmup}s + {duration}s")
+    try:
+        report = run_load(url, users, duration=duration, concurrency=concurrency, warmup=warmup,
+                          role_weights=role_weights, reference=reference, seed=seed)
+    finally:
+        if not keep_users:
+            remove_users(db.session)
+
+    click.echo(f"{'route':<32}{'req':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>9}")
+    for name, row in sorted(report['routes'].items(), key=lambda item: (item[0] == 'total', item[0])):
+        click.echo(
+            f"{name:<32}{row['requests']:>8}{row['throughput']:>9.1f}{row['p50_ms']:>9.1f}"
+            f"{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['error_rate']:>9.2%}"
+        )
+
+    if output:
+        with open(output, 'w') as report_file:
+            json.dump({'url': url, 'role_weights': role_weights, **report}, report_file, indent=2)
+        click.echo(f"Report written to {output}")
+
+    total = report['routes'].get('total')
+    if total is None:
+        raise click.ClickException('No requests completed')
+    if max_error_rate is not None and total['error_rate'] > max_error_rate:
+        raise click.ClickException(f"Error rate {total['error_rate']:.2%} exceeds {max_error_rate:.2%}")
+
+@click.command('traces')
+@click.option('--limit', default=20, show_default=True, type=int, help='Traces to list.')
+@click.option('--sort', type=click.Choice(['recent', 'slowest']), default='recent', show_default=True)
+@click.option('--route', default=None, help='Only traces whose route contains this text.')
+@click.option('--export', 'trace_id', default=None, help='Write this trace to --output instead of listing.')
+@click.option('--output', default=None, help='File for --export (defaults to trace-<id>.json).')
+@with_appcontext
+def traces(limit, sort, route, trace_id, output):
+    """List recorded request traces or export one for Perfetto / chrome://tracing."""
+    from app.utils.tracing import read_traces, find_trace
+
+    path = current_app.config['TRACING_FILE']
+    if trace_id:
+        trace = find_trace(path, trace_id)
+        if trace is None:
+            raise click.ClickException(f"Trace {trace_id} not found in {path}")
+        output = output or f"trace-{trace_id}.json"
+        with open(output, 'w') as trace_file:
+            json.dump(trace, trace_file)
+        click.echo(f"Wrote {output}; open it in https://ui.perfetto.dev or chrome://tracing")
+        return
+
+    recorded = [t['otherData'] for t in read_traces(path)]
+    if route:
+        recorded = [t for t in recorded if route in (t.get('route') or '')]
+    if sort == 'slowest':
+        recorded.sort(key=lambda t: t['duration_ms'], reverse=True)
+    else:
+        recorded.reverse()
+    for t in recorded[:limit]:
+        click.echo(
+            f"{t['trace_id']}  {t['recorded_at'][:19]}  {t['duration_ms']:>10.1f} ms  "
+            f"{t['status'] or '-':>3}  {t['spans']:>5} spans  {t['route']}"
+        )
+
 def register_commands(app):
     """Register CLI commands"""
     app.cli.add_command(init_db)
     app.cli.add_command(drop_db)
     app.cli.add_command(recreate_db)
+    app.cli.add_command(startup_profile)
+    app.cli.add_command(build_apispec)
+    app.cli.add_command(serve)
+    app.cli.add_command(run_scheduler)
+    app.cli.add_command(plan_report)
+    app.cli.add_command(verify_predicates)
+    app.cli.add_command(gen_synthetic)
+    app.cli.add_command(bench_services)
+    app.cli.add_command(load_test)
+    app.cli.add_command(traces)
@@ -1,19 +1,101 @@
 import os
+import tempfile
 from datetime import timedelta
 
 class Config:
     FLASK_APP = os.environ.get('FLASK_APP')
     FLASK_ENV = os.environ.get('FLASK_ENV')
     DEBUG = os.environ.get('DEBUG', False)
+
+    # Logging: records are queued and written to stdout by a background thread. Up to
+    # LOG_QUEUE_SIZE records wait in the queue; beyond that new records are dropped and counted.
+    # LOG_FORMAT 'text' keeps the one-line format, 'json' adds route, trace id and `extra=` fields
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+
+    # Production server (`flask serve`): gunicorn workers forked from a preloaded app
+    WEB_BIND = os.environ.get('WEB_BIND', '0.0.0.0:5002')
+    WEB_WORKERS = int(os.environ.get('WEB_WORKERS', (os.cpu_count() or 1) * 2 + 1))
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 4))
+    WEB_TIMEOUT = int(os.environ.get('WEB_TIMEOUT', 120))
+    WEB_GRACEFUL_TIMEOUT = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))
+    WEB_KEEPALIVE = int(os.environ.get('WEB_KEEPALIVE', 5))
+    WEB_MAX_REQUESTS = int(os.environ.get('WEB_MAX_REQUESTS', 1000))
+    WEB_MAX_REQUESTS_JITTER = int(os.environ.get('WEB_MAX_REQUESTS_JITTER', 100))
+
     SQLALCHEMY_ENGINE_OPTIONS = {
+        # SQLAlchemy's default; a warning is logged at `flask serve` when WEB_THREADS and their
+        # dashboard bundle fan-out (WEB_THREADS * (1 + DASHBOARD_BUNDLE_WORKERS)) exceed the pool
+        "pool_size": int(os.environ.get('DB_POOL_SIZE', 5)),
         "pool_pre_ping": True,
         "pool_recycle": 3600,
-        "pool_timeout": 60,
-        "max_overflow": 10,
+        "pool_timeout": int(os.environ.get('DB_POOL_TIMEOUT', 60)),
+        "max_overflow": int(os.environ.get('DB_MAX_OVERFLOW', 10)),
         "connect_args": {
             "timeout": 60
         }
     }
+    # Connection pool telemetry (checkout waits, timeouts) and sizing from the
+    # worker model (WEB_THREADS, DASHBOARD_BUNDLE_WORKERS, scheduler) instead of the values above
+    DB_POOL_STATS_ENABLED = os.environ.get('DB_POOL_STATS_ENABLED', 'true').lower() == 'true'
+    DB_POOL_ADAPTIVE = os.environ.get('DB_POOL_ADAPTIVE', 'false').lower() == 'true'
+    # Slow query log: statements slower than SLOW_QUERY_THRESHOLD_MS are appended, with their
+    # route and service method, to a rotating JSON lines file read by /api/admin/db/slow-queries.
+    # SLOW_QUERY_EXPLAIN also captures the estimated plan, once per statement and worker.
+    # Bound parameters hold patient and user data, so they are written only with
+    # SLOW_QUERY_CAPTURE_PARAMETERS, in plain text
+    SLOW_QUERY_LOG_ENABLED = os.environ.get('SLOW_QUERY_LOG_ENABLED', 'false').lower() == 'true'
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 500))
+    SLOW_QUERY_EXPLAIN = os.environ.get('SLOW_QUERY_EXPLAIN', 'false').lower() == 'true'
+    SLOW_QUERY_CAPTURE_PARAMETERS = os.environ.get('SLOW_QUERY_CAPTURE_PARAMETERS', 'false').lower() == 'true'
+    SLOW_QUERY_LOG_FILE = os.environ.get(
+        'SLOW_QUERY_LOG_FILE',
+        os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'logs', 'slow_queries.jsonl')
+    )
+    SLOW_QUERY_LOG_MAX_BYTES = int(os.environ.get('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024))
+    SLOW_QUERY_LOG_BACKUP_COUNT = int(os.environ.get('SLOW_QUERY_LOG_BACKUP_COUNT', 5))
+    # Prometheus metrics at /metrics. Under `flask serve` also set PROMETHEUS_MULTIPROC_DIR to
+    # a directory the workers share, so every worker's values are merged into each scrape.
+    # With METRICS_TOKEN set, scrapes must send it as `Authorization: Bearer <token>`
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'false').lower() == 'true'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    # Tracing: TRACING_SAMPLE_RATE of requests record nested route, service and SQL spans,
+    # appended in the Chrome trace format to TRACING_FILE (see `flask traces`)
+    TRACING_ENABLED = os.environ.get('TRACING_ENABLED', 'false').lower() == 'true'
+    TRACING_SAMPLE_RATE = float(os.environ.get('TRACING_SAMPLE_RATE', 0.01))
+    TRACING_FILE = os.environ.get(
+        'TRACING_FILE',
+        os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'logs', 'traces.jsonl')
+    )
+    TRACING_MAX_BYTES = int(os.environ.get('TRACING_MAX_BYTES', 50 * 1024 * 1024))
+    TRACING_BACKUP_COUNT = int(os.environ.get('TRACING_BACKUP_COUNT', 5))
+    # CPU profiling: a Super Admin request sent with `X-Profile: 1` has its stack sampled every
+    # PROFILING_INTERVAL_MS; /api/admin/profile samples the whole worker. The latest
+    # PROFILING_MAX_FILES profiles are kept in PROFILING_DIR
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILING_INTERVAL_MS = float(os.environ.get('PROFILING_INTERVAL_MS', 5))
+    PROFILING_MAX_SECONDS = int(os.environ.get('PROFILING_MAX_SECONDS', 60))
+    PROFILING_DIR = os.environ.get(
+        'PROFILING_DIR',
+        os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'logs', 'profiles')
+    )
+    PROFILING_MAX_FILES = int(os.environ.get('PROFILING_MAX_FILES', 200))
+    # Memory profiling: requests sent with `X-Memory-Profile: 1` by a Super Admin, and
+    # MEMORY_PROFILING_SAMPLE_RATE of all requests, run under tracemalloc; peak and retained
+    # memory with the top allocation sites go to MEMORY_PROFILING_FILE (/api/admin/memory/*).
+    # A profiled request slows its worker down, so keep the sample rate low
+    MEMORY_PROFILING_ENABLED = os.environ.get('MEMORY_PROFILING_ENABLED', 'false').lower() == 'true'
+    MEMORY_PROFILING_SAMPLE_RATE = float(os.environ.get('MEMORY_PROFILING_SAMPLE_RATE', 0))
+    MEMORY_PROFILING_FRAMES = int(os.environ.get('MEMORY_PROFILING_FRAMES', 40))
+    MEMORY_PROFILING_TOP = int(os.environ.get('MEMORY_PROFILING_TOP', 10))
+    MEMORY_PROFILING_WARN_KB = int(os.environ.get('MEMORY_PROFILING_WARN_KB', 100 * 1024))
+    MEMORY_PROFILING_FILE = os.environ.get(
+        'MEMORY_PROFILING_FILE',
+        os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'logs', 'memory_profiles.jsonl')
+    )
+    MEMORY_PROFILING_MAX_BYTES = int(os.environ.get('MEMORY_PROFILING_MAX_BYTES', 10 * 1024 * 1024))
+    MEMORY_PROFILING_BACKUP_COUNT = int(os.environ.get('MEMORY_PROFILING_BACKUP_COUNT', 5))
     SQLALCHEMY_DATABASE_URI = os.environ.get('SQLALCHEMY_DATABASE_URI')
     SQLALCHEMY_TRACK_MODIFICATIONS = os.environ.get('SQLALCHEMY_TRACK_MODIFICATIONS', False)
     SECRET_KEY = os.environ.get('SECRET_KEY')
@@ -22,6 +104,70 @@ class Config:
     JWT_REFRESH_TOKEN_EXPIRES = os.environ.get('JWT_REFRESH_TOKEN_EXPIRES')
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS')
 
+    # Read replica for dashboard/performance reads; they fall back to the primary when the
+    # replica is unreachable or its newest performance row trails the primary by more than
+    # REPLICA_MAX_LAG_SECONDS. Health is re-checked every REPLICA_CHECK_INTERVAL seconds.
+    REPLICA_DATABASE_URI = os.environ.get('REPLICA_DATABASE_URI')
+    REPLICA_MAX_LAG_SECONDS = int(os.environ.get('REPLICA_MAX_LAG_SECONDS', 300))
+    REPLICA_CHECK_INTERVAL = int(os.environ.get('REPLICA_CHECK_INTERVAL', 30))
+
+    # Fast start: probe the database in the background, start the scheduler after
+    # SCHEDULER_START_DELAY seconds and build the Swagger spec on first request
+    FAST_START = os.environ.get('FAST_START', 'false').lower() == 'true'
+    # Web workers run with the scheduler off; jobs run in `flask run-scheduler`
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', 'true').lower() == 'true'
+    SCHEDULER_START_DELAY = int(os.environ.get('SCHEDULER_START_DELAY', 30))
+
+    # Swagger: 'flasgger' parses route docstrings at runtime and serves /api/docs,
+    # 'static' serves the artifact written by `flask build-apispec` and the same /api/docs UI
+    # (flasgger's bundled swagger-ui assets) without loading flasgger
+    SWAGGER_MODE = os.environ.get('SWAGGER_MODE', 'flasgger').lower()
+    SWAGGER_SPEC_FILE = os.environ.get(
+        'SWAGGER_SPEC_FILE',
+        os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static', 'apispec_1.json')
+    )
+    SWAGGER_SPEC_MAX_AGE = int(os.environ.get('SWAGGER_SPEC_MAX_AGE', 3600))
+
+    # JSON responses: 'fast' uses orjson when installed, 'default' uses Flask's provider.
+    # JSON_DATETIME_FORMAT 'http' keeps Flask's date format, 'iso' emits ISO 8601
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER', 'fast').lower()
+    JSON_DATETIME_FORMAT = os.environ.get('JSON_DATETIME_FORMAT', 'http').lower()
+
+    # Response compression (brotli when installed, otherwise gzip) above COMPRESS_MIN_SIZE bytes
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))
+
+    # Dashboard bundle: sections computed concurrently per request, each on its own connection
+    DASHBOARD_BUNDLE_WORKERS = int(os.environ.get('DASHBOARD_BUNDLE_WORKERS', 4))
+
+    # Conditional GET: ETag/Last-Modified from the version of the performance, CMT and case manager data,
+    # which is looked up at most once per DATA_VERSION_TTL seconds per process
+    CONDITIONAL_GET_ENABLED = os.environ.get('CONDITIONAL_GET_ENABLED', 'true').lower() == 'true'
+    DATA_VERSION_TTL = int(os.environ.get('DATA_VERSION_TTL', 60))
+
+    # Service result cache: an LRU of CACHE_MAX_ENTRIES per process in front of an optional
+    # shared store, CACHE_BACKEND 'sqlite' (CACHE_SQLITE_PATH, shared by the workers of a host)
+    # or 'redis' (CACHE_REDIS_URL, needs the redis package); 'memory' uses the LRU only.
+    # Entries are fresh for CACHE_TTL seconds, then served for CACHE_STALE_TTL more while
+    # being recomputed in the background
+    CACHE_ENABLED = os.environ.get('CACHE_ENABLED', 'true').lower() == 'true'
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory').lower()
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 1000))
+    CACHE_TTL = int(os.environ.get('CACHE_TTL', 300))
+    CACHE_STALE_TTL = int(os.environ.get('CACHE_STALE_TTL', 900))
+    CACHE_REFRESH_WORKERS = int(os.environ.get('CACHE_REFRESH_WORKERS', 2))
+    CACHE_SQLITE_PATH = os.environ.get(
+        'CACHE_SQLITE_PATH', os.path.join(tempfile.gettempdir(), 'cmt-api-cache.sqlite')
+    )
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
+    # Scheduled jobs: hour (server local time) at which morning traffic starts,
+    # and the share of the overnight window after which a job run is flagged
+    JOB_TRAFFIC_START_HOUR = int(os.environ.get('JOB_TRAFFIC_START_HOUR', 6))
+    JOB_WINDOW_WARN_RATIO = float(os.environ.get('JOB_WINDOW_WARN_RATIO', 0.8))
+
     def __init__(self):
         self.SECRET_KEY = self.SECRET_KEY or 'dev-secret-key'
         self.SQLALCHEMY_DATABASE_URI = self.SQLALCHEMY_DATABASE_URI or os.environ.get('DATABASE_URL')
@@ -0,0 +1,183 @@
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from flask import current_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql import Select, CompoundSelect
+
+logger = logging.getLogger(__name__)
+
+REPLICA_BIND = 'replica'
+
+# SQLite has no schemas; tables of every schema live in the database file itself
+SQLITE_SCHEMA_MAP = {'dbo': None, 'cms': None, 'user': None}
+
+_use_replica = ContextVar('use_replica', default=False)
+# Errors of the replica during the current read_replica scope, collected by _on_replica_error
+_replica_errors = ContextVar('replica_errors', default=None)
+_status_lock = threading.Lock()
+_check_lock = threading.Lock()
+_status_cache = {}
+
+class RoutingSession(Session):
+    """
+    Session that sends SELECTs issued inside a read_replica scope to the
+    replica bind. Flushes, DML and textual SQL always go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and _use_replica.get() and not self._flushing
+                and isinstance(clause, (Select, CompoundSelect))):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def configure_replica(app):
+    """
+    Add the replica bind and the SQLite schema mapping before the engines are
+    created; call after the pool options are final.
+    """
+    options = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    primary_uri = app.config.get('SQLALCHEMY_DATABASE_URI')
+    if primary_uri and make_url(primary_uri).get_backend_name() == 'sqlite':
+        options = {**options, 'execution_options': {'schema_translate_map': SQLITE_SCHEMA_MAP}}
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    replica_uri = app.config['REPLICA_DATABASE_URI']
+    if not replica_uri:
+        return False
+    # Imported here since the utils package imports the models, which import this module
+    from app.utils.db_pool import uses_queue_pool
+
+    # Binds do not inherit SQLALCHEMY_ENGINE_OPTIONS, so the pool settings are copied
+    replica = {key: value for key, value in options.items() if key != 'execution_options'}
+    replica['url'] = replica_uri
+    if 'poolclass' in replica and not uses_queue_pool(replica_uri):
+        del replica['poolclass']
+    if make_url(replica_uri).get_backend_name() == 'sqlite':
+        replica['execution_options'] = {'schema_translate_map': SQLITE_SCHEMA_MAP}
+    app.config['SQLALCHEMY_BINDS'] = {**(app.config.get('SQLALCHEMY_BINDS') or {}), REPLICA_BIND: replica}
+    logger.info('Read replica bind configured')
+    return True
+
+def _on_replica_error(context):
+    # The services log and swallow their errors, so replica failures are noted
+    # here, where they are raised, for read_replica to retry on the primary
+    errors = _replica_errors.get()
+    if errors is not None and (context.is_disconnect or isinstance(context.sqlalchemy_exception, OperationalError)):
+        errors.append(str(context.original_exception))
+
+def register_replica_events(app):
+    """Watch the replica engine for connection and operational errors; call after db.init_app"""
+    with app.app_context():
+        from app.extensions import db
+        engine = db.engines.get(REPLICA_BIND)
+        if engine is not None:
+            event.listen(engine, 'handle_error', _on_replica_error)
+
+def _data_version(engine):
+    # Imported here since the models import the extensions, which import this module
+    from app.models import CaseManagerPerformance
+    with engine.connect() as connection:
+        return connection.execute(select(func.max(CaseManagerPerformance.updated_date))).scalar()
+
+def _check_replica():
+    from app.extensions import db
+
+    engines = db.engines
+    if REPLICA_BIND not in engines:
+        return {'configured': False, 'healthy': False}
+
+    status = {'configured': True, 'healthy': False, 'lag_seconds': None, 'error': None,
+              'checked_at': datetime.utcnow().isoformat()}
+    try:
+        replica_version = _data_version(engines[REPLICA_BIND])
+        primary_version = _data_version(engines[None])
+    except Exception as e:
+        status['error'] = str(e)
+        logger.warning(f"Read replica check failed, reads stay on the primary: {str(e)}")
+        return status
+
+    # Lag is how far the replica's newest performance row trails the primary's
+    if primary_version is None:
+        lag = 0.0
+    elif replica_version is None:
+        lag = None
+    else:
+        lag = max(0.0, (primary_version - replica_version).total_seconds())
+    status['lag_seconds'] = lag
+    status['healthy'] = lag is not None and lag <= current_app.config['REPLICA_MAX_LAG_SECONDS']
+    if not status['healthy']:
+        logger.warning(f"Read replica lagging ({lag} s behind), reads stay on the primary")
+    return status
+
+def replica_status(refresh=False):
+    """Replica health and lag, re-checked at most once per REPLICA_CHECK_INTERVAL seconds"""
+    interval = current_app.config['REPLICA_CHECK_INTERVAL']
+    with _status_lock:
+        cached = _status_cache.get('status')
+    if cached and not refresh and time.monotonic() - cached[0] < interval:
+        return cached[1]
+
+    # One thread re-checks; the others keep using the last known status meanwhile
+    if not _check_lock.acquire(blocking=cached is None or refresh):
+        return cached[1]
+    try:
+        with _status_lock:
+            cached = _status_cache.get('status')
+        if cached and not refresh and time.monotonic() - cached[0] < interval:
+            return cached[1]
+        status = _check_replica()
+        with _status_lock:
+            _status_cache['status'] = (time.monotonic(), status)
+        return status
+    finally:
+        _check_lock.release()
+
+def _mark_replica_unhealthy(error):
+    """Send reads to the primary until the next check of the replica"""
+    status = {'configured': True, 'healthy': False, 'lag_seconds': None, 'error': error,
+              'checked_at': datetime.utcnow().isoformat()}
+    with _status_lock:
+        _status_cache['status'] = (time.monotonic(), status)
+    logger.warning(f"Read replica failed, reads stay on the primary until it is re-checked: {error}")
+
+def read_replica(f):
+    """
+    Run the reads of the decorated function on the replica while it is
+    healthy, else on the primary. When the replica fails during the call it is
+    marked unhealthy and the call is run once more on the primary.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if _use_replica.get() or not current_app.config['REPLICA_DATABASE_URI']:
+            return f(*args, **kwargs)
+        if not replica_status()['healthy']:
+            return f(*args, **kwargs)
+
+        errors = []
+        token = _use_replica.set(True)
+        errors_token = _replica_errors.set(errors)
+        try:
+            result = f(*args, **kwargs)
+        except OperationalError:
+            if not errors:
+                raise
+        finally:
+            _replica_errors.reset(errors_token)
+            _use_replica.reset(token)
+        if not errors:
+            return result
+
+        from app.extensions import db
+        _mark_replica_unhealthy(errors[0])
+        db.session.rollback()
+        return f(*args, **kwargs)
+    return decorated_function
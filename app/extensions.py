@@ -2,9 +2,11 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from flask_marshmallow import Marshmallow
+from .db_routing import RoutingSession
 
 
-db = SQLAlchemy()
+# Reads inside @read_replica are routed to the replica bind when one is configured
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
 ma = Marshmallow()
 
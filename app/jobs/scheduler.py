@@ -1,7 +1,25 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 import os
+from datetime import datetime
 from app.utils.db_utils import execute_sql_file
+from app.services.job_run_service import JobRunService
+from app.utils.conditional import invalidate_data_version
+from app.utils.cache import invalidate_cache
+
+# job id: (name, FlaskScheduler method, CronTrigger fields)
+JOBS = {
+    # Daily performance job at midnight
+    'daily_performance_calculation': (
+        'Daily Case Manager Performance', 'run_daily_performance_query',
+        {'hour': 0, 'minute': 0, 'second': 0}
+    ),
+    # Monthly performance job at midnight on last day
+    'monthly_performance_calculation': (
+        'Monthly Case Manager Performance', 'run_monthly_performance_query',
+        {'day': 'last', 'hour': 0, 'minute': 0, 'second': 0}
+    ),
+}
 
 class FlaskScheduler:
     def __init__(self):
@@ -12,54 +30,63 @@ class FlaskScheduler:
             'utils', 'scripts'
         )
 
+    def _run_sql_job(self, job_id, job_name, filename):
+        """Execute a SQL script and record the run in the job run history"""
+        with self.app.app_context():
+            sql_path = os.path.join(self.scripts_dir, filename)
+            run_id = JobRunService.start_run(job_id, job_name)
+            try:
+                statements = execute_sql_file(sql_path)
+            except Exception as e:
+                JobRunService.finish_run(run_id, error=str(e))
+                raise
+            JobRunService.finish_run(run_id, statements=statements)
+            invalidate_data_version()
+            invalidate_cache()
+
     def run_daily_performance_query(self):
         """Run the daily case manager performance query"""
-        with self.app.app_context():
-            sql_path = os.path.join(
-                self.scripts_dir,
-                'Case_Manager_Performance_Query_v1.3.sql'
-            )
-            execute_sql_file(sql_path)
+        self._run_sql_job(
+            'daily_performance_calculation',
+            'Daily Case Manager Performance',
+            'Case_Manager_Performance_Query_v1.3.sql'
+        )
 
     def run_monthly_performance_query(self):
         """Run the monthly case manager performance query"""
-        with self.app.app_context():
-            sql_path = os.path.join(
-                self.scripts_dir,
-                'Case_Manager_All_Performance_Query_v1.3.sql'
-            )
-            execute_sql_file(sql_path)
+        self._run_sql_job(
+            'monthly_performance_calculation',
+            'Monthly Case Manager Performance',
+            'Case_Manager_All_Performance_Query_v1.3.sql'
+        )
 
     def init_scheduler(self, app):
         """Initialize the scheduler with jobs"""
         self.app = app
-        
-        # Daily performance job at midnight
-        self.scheduler.add_job(
-            self.run_daily_performance_query,
-            # trigger=CronTrigger(minute='*/2'),
-            trigger=CronTrigger(hour=0, minute=0, second=0),
-            id='daily_performance_calculation',
-            name='Daily Case Manager Performance',
-            replace_existing=True
-        )
 
-        # Monthly performance job at midnight on last day
-        self.scheduler.add_job(
-            self.run_monthly_performance_query,
-            trigger=CronTrigger(
-                day='last',  # Run on last day of month
-                hour=0,
-                minute=0,
-                second=0
-            ),
-            id='monthly_performance_calculation',
-            name='Monthly Case Manager Performance',
-            replace_existing=True
-        )
-        
+        for job_id, (name, method, cron) in JOBS.items():
+            self.scheduler.add_job(
+                getattr(self, method),
+                trigger=CronTrigger(**cron),
+                id=job_id,
+                name=name,
+                replace_existing=True
+            )
+
         self.scheduler.start()
         return self.scheduler
 
+    def next_run_time(self, job_id, now=None):
+        """
+        Next start of a job, projected from its definition. The web workers
+        run no scheduler (jobs run in `flask run-scheduler`), so this does not
+        ask a live one.
+        """
+        job = JOBS.get(job_id)
+        if job is None:
+            return None
+        trigger = CronTrigger(**job[2], timezone=self.scheduler.timezone)
+        return trigger.get_next_fire_time(None, now or datetime.now(trigger.timezone))
+
 # Create singleton instance
 flask_scheduler = FlaskScheduler()
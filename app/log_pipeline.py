@@ -0,0 +1,174 @@
+"""
+Non-blocking logging: request threads put records on a bounded in-memory
+queue and a single listener thread writes them to stdout.
+
+A log call formats its message and attaches the structured fields (route,
+trace id, pid) in the calling thread, then only enqueues; the write to a
+slow stdout (a container log driver, a full pipe) happens on the listener.
+When the queue is full records are dropped rather than blocking the
+request, and the number dropped is logged once the queue has room again.
+
+Threads do not survive fork, so each forked process (gunicorn workers)
+gets its own queue and listener.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from flask import g, has_request_context, request
+
+TEXT_FORMAT = '[%(asctime)s] %(levelname)s in %(module)s: %(message)s'
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_pipeline = None
+
+class RequestContextFilter(logging.Filter):
+    """Adds the route and trace id of the current request, in the thread that logs"""
+
+    def filter(self, record):
+        record.route = None
+        record.trace_id = None
+        if has_request_context():
+            record.route = f"{request.method} {request.endpoint or request.path}"
+            root = g.get('trace_root')
+            if root is not None:
+                record.trace_id = root.trace.trace_id
+        return True
+
+class BoundedQueueHandler(QueueHandler):
+    """QueueHandler that drops records when the queue is full instead of raising or blocking"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._unreported = 0
+        self._dropped_lock = threading.Lock()
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+                self._unreported += 1
+            return
+        if self._unreported:
+            with self._dropped_lock:
+                unreported, self._unreported = self._unreported, 0
+            self._report_dropped(unreported)
+
+    def prepare(self, record):
+        # Like QueueHandler.prepare, but keeps the traceback out of the message
+        # so formatters can render it separately
+        prepared = logging.makeLogRecord(vars(record))
+        prepared.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            prepared.exc_text = logging.Formatter().formatException(record.exc_info)
+        prepared.msg = prepared.message
+        prepared.args = None
+        prepared.exc_info = None
+        return prepared
+
+    def _report_dropped(self, count):
+        notice = logging.LogRecord(
+            __name__, logging.WARNING, __file__, 0,
+            f"Log queue full, dropped {count} records", None, None
+        )
+        RequestContextFilter().filter(notice)
+        try:
+            self.queue.put_nowait(notice)
+        except queue.Full:
+            with self._dropped_lock:
+                self._unreported += count
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: timestamp, level, logger, message, context and `extra=` fields"""
+
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'pid': record.process,
+            'thread': record.threadName,
+            'route': getattr(record, 'route', None),
+            'trace_id': getattr(record, 'trace_id', None),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+class _Pipeline:
+    def __init__(self, level, log_format, queue_size):
+        self.formatter = JsonFormatter() if log_format == 'json' else logging.Formatter(TEXT_FORMAT)
+        self.queue_size = queue_size
+        self.handler = BoundedQueueHandler(queue.Queue(maxsize=queue_size))
+        self.handler.addFilter(RequestContextFilter())
+        self.listener = None
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            handler.close()
+        root.addHandler(self.handler)
+        root.setLevel(level)
+
+    def start(self):
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(self.formatter)
+        self.listener = QueueListener(self.handler.queue, stream)
+        self.listener.start()
+
+    def stop(self):
+        """Write out the queued records and stop the listener"""
+        if self.listener is not None:
+            listener, self.listener = self.listener, None
+            listener.stop()
+            for handler in listener.handlers:
+                handler.flush()
+
+    def after_fork(self):
+        # The parent's listener thread does not exist here and its queue may have been
+        # locked mid-operation at fork time, so start over with a fresh one
+        self.listener = None
+        self.handler.queue = queue.Queue(maxsize=self.queue_size)
+        self.handler.dropped = 0
+        self.handler._unreported = 0
+        self.handler._dropped_lock = threading.Lock()
+        self.start()
+
+def configure_logging(level='INFO', log_format='text', queue_size=10000):
+    """
+    Route the root logger through the queue (idempotent). `log_format` is
+    'text' (the historical one-line format) or 'json' (one object per line
+    with the structured fields).
+    """
+    global _pipeline
+    if _pipeline is not None:
+        return _pipeline
+    _pipeline = _Pipeline(level.upper() if isinstance(level, str) else level, log_format, queue_size)
+    _pipeline.start()
+    atexit.register(_pipeline.stop)
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_pipeline.after_fork)
+    return _pipeline
+
+def dropped_records():
+    """Records dropped by this process because the queue was full"""
+    return _pipeline.handler.dropped if _pipeline is not None else 0
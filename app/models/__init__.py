@@ -5,6 +5,7 @@ from .cmt import CMT
 from .case_manager import CaseManager, CaseManagerClaims
 from .performance import CaseManagerPerformance
 from .appointments import DrugPickup, ViralLoad
+from .job_run import JobRun, JobRunStatement
 
 __all__ = [
     'User',
@@ -18,5 +19,7 @@ __all__ = [
     'DrugPickup',
     'ViralLoad',
     'CaseManager',
-    'CaseManagerClaims'
+    'CaseManagerClaims',
+    'JobRun',
+    'JobRunStatement'
 ]
@@ -3,7 +3,13 @@ from datetime import datetime
 
 class DrugPickup(db.Model):
     __tablename__ = 'DrugPickupAppointment'
-    __table_args__ = {'schema': 'dbo'}
+    __table_args__ = (
+        db.Index('IX_DrugPickupAppointment_estimatedNextAppointmentPharmacy', 'estimatedNextAppointmentPharmacy',
+                 mssql_include=['CaseManagerId', 'State']),
+        db.Index('IX_DrugPickupAppointment_CaseManagerId', 'CaseManagerId',
+                 mssql_include=['estimatedNextAppointmentPharmacy', 'PharmacyLastPickupdate']),
+        {'schema': 'dbo'}
+    )
 
     id = db.Column('pk', db.Integer, primary_key=True)  # Add primary key
     state = db.Column('State', db.String(100))
@@ -28,7 +34,12 @@ class DrugPickup(db.Model):
 
 class ViralLoad(db.Model):
     __tablename__ = 'VLAppointment'
-    __table_args__ = {'schema': 'dbo'}
+    __table_args__ = (
+        db.Index('IX_VLAppointment_CaseManagerId', 'CaseManagerId',
+                 mssql_include=['DateofCurrentViralLoad', 'CurrentViralLoad', 'lastDateOfSampleCollection']),
+        db.Index('IX_VLAppointment_PepID_DatimCode', 'PepID', 'DatimCode', mssql_include=['State']),
+        {'schema': 'dbo'}
+    )
 
     id = db.Column('pk', db.Integer, primary_key=True)  # Add primary key
     state = db.Column('State', db.String(100))
@@ -3,7 +3,12 @@ from app import db
 from datetime import datetime
 class CaseManager(db.Model):
     __tablename__ = 'case_managers'
-    __table_args__ = {'schema': 'cms'}
+    __table_args__ = (
+        db.Index('IX_case_managers_id', 'id', mssql_include=['cm_id', 'cmt', 'state', 'facilities']),
+        db.Index('IX_case_managers_cmt_state_facilities', 'cmt', 'state', 'facilities',
+                 mssql_include=['cm_id', 'id']),
+        {'schema': 'cms'}
+    )
     cm_id = db.Column(db.Integer, primary_key=True)
     id = db.Column(db.String(100), nullable=False)
     fullname = db.Column(db.String(100), nullable=False)
@@ -0,0 +1,42 @@
+from app.extensions import db
+from datetime import datetime
+
+class JobRun(db.Model):
+    __tablename__ = 'job_runs'
+    __table_args__ = (
+        db.Index('IX_job_runs_job_id_started_at', 'job_id', 'started_at'),
+        {'schema': 'cms'}
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    job_id = db.Column(db.String(100), nullable=False)
+    job_name = db.Column(db.String(200))
+    status = db.Column(db.String(20), nullable=False)  # running, succeeded, failed
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    duration_ms = db.Column(db.Float)
+    rows_affected = db.Column(db.Integer)
+    statement_count = db.Column(db.Integer)
+    error = db.Column(db.Text)
+
+    statements = db.relationship(
+        'JobRunStatement',
+        backref='job_run',
+        order_by='JobRunStatement.position',
+        lazy='selectin'
+    )
+
+
+class JobRunStatement(db.Model):
+    __tablename__ = 'job_run_statements'
+    __table_args__ = (
+        db.Index('IX_job_run_statements_job_run_id', 'job_run_id'),
+        {'schema': 'cms'}
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    job_run_id = db.Column(db.Integer, db.ForeignKey('cms.job_runs.id'), nullable=False)
+    position = db.Column(db.Integer, nullable=False)
+    statement = db.Column(db.String(400), nullable=False)
+    duration_ms = db.Column(db.Float, nullable=False)
+    rows_affected = db.Column(db.Integer)
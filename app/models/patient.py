@@ -1,9 +1,41 @@
 from app import db
+from app.sql_functions import date_add_days
 from datetime import datetime
+from sqlalchemy import and_, or_, case, cast, func, try_cast
 
 class Patient(db.Model):
     __tablename__ = 'CMPatientLineList'
-    __table_args__ = {'schema': 'dbo'}
+    # Indexes created by the migrations in migrations/versions, declared here for create_all and autogenerate
+    __table_args__ = (
+        db.Index('IX_CMPatientLineList_caseManagerId', 'caseManagerId',
+                 mssql_include=['currentArtStatus', 'state']),
+        db.Index('IX_CMPatientLineList_pepId_datimCode', 'pepId', 'datimCode',
+                 mssql_include=['currentAge', 'currentAgeMonths', 'sex', 'currentPregnancyStatus']),
+        db.Index('IX_CMPatientLineList_state_currentArtStatus', 'state', 'currentArtStatus',
+                 mssql_include=['outcomes', 'pharmacyLastPickupdate', 'daysOfArvRefill', 'currentAge',
+                                'currentAgeMonths', 'sex', 'currentPregnancyStatus']),
+        db.Index('IX_CMPatientLineList_pharmacyLastPickupdate', 'pharmacyLastPickupdate',
+                 mssql_include=['state', 'currentArtStatus', 'caseManagerId']),
+        db.Index('IX_CMPatientLineList_active_state', 'state',
+                 mssql_include=['daysOnArt', 'artStartDate', 'currentViralLoad', 'dateofCurrentViralLoad',
+                                'lastDateOfSampleCollection', 'caseManagerId'],
+                 mssql_where=db.text("currentArtStatus = 'Active'"),
+                 sqlite_where=db.text("currentArtStatus = 'Active'")),
+        db.Index('IX_CMPatientLineList_iitDueDate', 'iitDueDate',
+                 mssql_include=['state', 'currentArtStatus', 'outcomes', 'caseManagerId']),
+        db.Index('IX_CMPatientLineList_active_state_daysOnArtInt', 'state', 'daysOnArtInt',
+                 mssql_include=['currentViralLoad', 'dateofCurrentViralLoad', 'lastDateOfSampleCollection',
+                                'caseManagerId'],
+                 mssql_where=db.text("currentArtStatus = 'Active'"),
+                 sqlite_where=db.text("currentArtStatus = 'Active'")),
+        db.Index('IX_CMPatientLineList_pediatric_state_caseManagerId', 'state', 'caseManagerId',
+                 mssql_include=['currentArtStatus', 'pepId', 'datimCode'],
+                 mssql_where=db.text('isPediatric = 1'), sqlite_where=db.text('isPediatric = 1')),
+        db.Index('IX_CMPatientLineList_pmtct_state_caseManagerId', 'state', 'caseManagerId',
+                 mssql_include=['currentArtStatus', 'pepId', 'datimCode'],
+                 mssql_where=db.text('isPmtct = 1'), sqlite_where=db.text('isPmtct = 1')),
+        {'schema': 'dbo'}
+    )
     
     id = db.Column('uniquePatientId', db.String(100), primary_key=True)
     pep_id = db.Column('pepId', db.String(50), nullable=False)
@@ -33,6 +65,32 @@ class Patient(db.Model):
     date_of_current_viral_load = db.Column('dateofCurrentViralLoad', db.DateTime)
     last_date_of_sample_collection = db.Column('lastDateOfSampleCollection', db.DateTime)
     
+    # Persisted, indexed typed copies of the above (see migration 5c2e1f7a9d34);
+    # filter on these instead of casting daysOnArt / computing the IIT date per row
+    days_on_art_int = db.Column('daysOnArtInt', db.Integer, db.Computed(
+        try_cast(days_on_art, db.Integer), persisted=True
+    ))
+    iit_due_date = db.Column('iitDueDate', db.DateTime, db.Computed(
+        date_add_days(
+            pharmacy_last_pickup_date,
+            cast(try_cast(days_of_arv_refill, db.Float), db.Integer) + 28
+        ),
+        persisted=True
+    ))
+    
+    # Persisted, indexed cohort flags (see migration 8b7d3e0c6f12)
+    is_pediatric = db.Column('isPediatric', db.Boolean, db.Computed(
+        cast(case((or_(current_age.between(0, 19), current_age_months > 0), 1), else_=0), db.Boolean),
+        persisted=True
+    ))
+    is_pmtct = db.Column('isPmtct', db.Boolean, db.Computed(
+        cast(case((and_(
+            func.lower(sex) == 'f',
+            func.lower(current_pregnancy_status).in_(['pregnant', 'breastfeeding'])
+        ), 1), else_=0), db.Boolean),
+        persisted=True
+    ))
+    
     # Status Information
     outcomes = db.Column('outcomes', db.String(100))
     outcomes_date = db.Column('outcomesDate', db.DateTime)
@@ -8,6 +8,7 @@ from app.routes.report_routes import bp as report_bp
 from app.routes.home import bp as home_bp
 from app.routes.facility_routes import bp as facility_bp
 from app.routes.performance_routes import bp as performance_bp
+from app.routes.admin_routes import bp as admin_bp
 
 __all__ = [
     'auth_bp',
@@ -19,5 +20,6 @@ __all__ = [
     'report_bp',
     'home_bp',
     'facility_bp',
-    'performance_bp'
+    'performance_bp',
+    'admin_bp'
 ]
@@ -0,0 +1,676 @@
+from flask import Blueprint, Response, jsonify, request, current_app
+from flask_jwt_extended import jwt_required
+from app.services import JobRunService
+from app.utils.rbac import admin_required
+from app.utils.db_pool import get_pool_stats
+from app.utils.slow_queries import top_offenders
+from app.utils.memory_profiling import endpoint_summary, read_profiles
+from app.utils.profiling import profile_worker, load_profile, list_profiles, merge_profiles, render_profile
+from app.db_routing import replica_status
+from app.jobs.scheduler import flask_scheduler
+
+bp = Blueprint('admin', __name__, url_prefix='/api/admin')
+
+@bp.route('/jobs/runs', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_job_runs():
+    """
+    Get scheduled job run history (super admin only)
+    ---
+    tags:
+      - Admin
+    parameters:
+      - name: job_id
+        in: query
+        type: string
+        description: Only return runs of this job (e.g. daily_performance_calculation)
+      - name: status
+        in: query
+        type: string
+        enum: [running, succeeded, failed]
+      - name: limit
+        in: query
+        type: integer
+        default: 50
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Job runs retrieved successfully, newest first
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              id:
+                type: integer
+              job_id:
+                type: string
+              status:
+                type: string
+              started_at:
+                type: string
+                format: date-time
+              finished_at:
+                type: string
+                format: date-time
+              duration_ms:
+                type: number
+              rows_affected:
+                type: integer
+              statement_count:
+                type: integer
+      401:
+        description: Unauthorized - invalid or missing token
+      403:
+        description: Forbidden - insufficient permissions
+    """
+    runs = JobRunService.get_runs(
+        job_id=request.args.get('job_id'),
+        status=request.args.get('status'),
+        limit=request.args.get('limit', 50, type=int)
+    )
+    return jsonify(runs), 200
+
+@bp.route('/jobs/runs/<int:run_id>', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_job_run(run_id):
+    """
+    Get a single job run with per-statement timings (super admin only)
+    ---
+    tags:
+      - Admin
+    parameters:
+      - name: run_id
+        in: path
+        type: integer
+        required: true
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Job run retrieved successfully
+      404:
+        description: Job run not found
+    """
+    run = JobRunService.get_run(run_id)
+    if not run:
+        return jsonify({"error": "Job run not found"}), 404
+    return jsonify(run), 200
+
+@bp.route('/jobs/metrics', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_job_metrics():
+    """
+    Get duration statistics and traffic window warnings for scheduled jobs (super admin only)
+    ---
+    tags:
+      - Admin
+    parameters:
+      - name: days
+        in: query
+        type: integer
+        default: 30
+        description: Look-back window in days
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Job metrics retrieved successfully
+        schema:
+          type: object
+          properties:
+            window_days:
+              type: integer
+            jobs:
+              type: array
+              items:
+                type: object
+                properties:
+                  job_id:
+                    type: string
+                  runs:
+                    type: integer
+                  failed:
+                    type: integer
+                  duration_ms:
+                    type: object
+                  trend_ms_per_day:
+                    type: number
+                  next_run_time:
+                    type: string
+                    format: date-time
+                  warnings:
+                    type: array
+                    items:
+                      type: string
+            overlapping_runs:
+              type: array
+              items:
+                type: object
+    """
+    metrics = JobRunService.get_metrics(
+        days=request.args.get('days', 30, type=int),
+        next_run_time=flask_scheduler.next_run_time
+    )
+    return jsonify(metrics), 200
+
+@bp.route('/db/pool', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_db_pool_stats():
+    """
+    Get connection pool state and checkout wait statistics of the serving worker (super admin only)
+    ---
+    tags:
+      - Admin
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Pool statistics retrieved successfully; counters are per worker process
+        schema:
+          type: object
+          properties:
+            pid:
+              type: integer
+            adaptive:
+              type: boolean
+            pools:
+              type: object
+              additionalProperties:
+                type: object
+                properties:
+                  size:
+                    type: integer
+                  checked_out:
+                    type: integer
+                  overflow:
+                    type: integer
+                  max_overflow:
+                    type: integer
+                  timeout_s:
+                    type: number
+                  recommended_pool_size:
+                    type: integer
+                  stats:
+                    type: object
+                    properties:
+                      checkouts:
+                        type: integer
+                      timeouts:
+                        type: integer
+                      peak_in_use:
+                        type: integer
+                      wait_ms:
+                        type: object
+    """
+    return jsonify(get_pool_stats()), 200
+
+@bp.route('/db/replica', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_db_replica_status():
+    """
+    Get read replica health and lag as seen by the serving worker (super admin only)
+    ---
+    tags:
+      - Admin
+    parameters:
+      - name: refresh
+        in: query
+        type: boolean
+        description: Re-check the replica now instead of using the cached result
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Replica status retrieved successfully
+        schema:
+          type: object
+          properties:
+            configured:
+              type: boolean
+            healthy:
+              type: boolean
+              description: False means replica reads currently fall back to the primary
+            lag_seconds:
+              type: number
+            error:
+              type: string
+            checked_at:
+              type: string
+              format: date-time
+    """
+    refresh = request.args.get('refresh', 'false').lower() == 'true'
+    return jsonify(replica_status(refresh=refresh)), 200
+
+@bp.route('/db/slow-queries', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_slow_queries():
+    """
+    Get the slowest statements recorded by the slow query log, grouped by statement (super admin only)
+    ---
+    tags:
+      - Admin
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        default: 20
+      - name: sort
+        in: query
+        type: string
+        enum: [total, max, avg, count]
+        default: total
+        description: Rank by total, maximum or average duration, or by occurrences
+      - name: hours
+        in: query
+        type: integer
+        description: Only consider statements recorded in the last hours
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Slow statements retrieved successfully, worst first
+        schema:
+          type: object
+          properties:
+            enabled:
+              type: boolean
+            threshold_ms:
+              type: number
+            statements:
+              type: array
+              items:
+                type: object
+                properties:
+                  fingerprint:
+                    type: string
+                  statement:
+                    type: string
+                  count:
+                    type: integer
+                  total_ms:
+                    type: number
+                  avg_ms:
+                    type: number
+                  max_ms:
+                    type: number
+                  max_rowcount:
+                    type: integer
+                  routes:
+                    type: array
+                    items:
+                      type: string
+                  services:
+                    type: array
+                    items:
+                      type: string
+                  slowest_parameters:
+                    type: string
+                  first_seen:
+                    type: string
+                    format: date-time
+                  last_seen:
+                    type: string
+                    format: date-time
+                  plan:
+                    type: object
+      400:
+        description: Invalid sort
+    """
+    sort = request.args.get('sort', 'total')
+    if sort not in ('total', 'max', 'avg', 'count'):
+        return jsonify({"error": "sort must be one of total, max, avg, count"}), 400
+
+    config = current_app.config
+    statements = top_offenders(
+        config['SLOW_QUERY_LOG_FILE'],
+        limit=request.args.get('limit', 20, type=int),
+        sort=sort,
+        hours=request.args.get('hours', type=int)
+    )
+    return jsonify({
+        'enabled': config['SLOW_QUERY_LOG_ENABLED'],
+        'threshold_ms': config['SLOW_QUERY_THRESHOLD_MS'],
+        'statements': statements
+    }), 200
+
+def _profile_response(profile, fmt):
+    if fmt == 'json':
+        return jsonify(profile), 200
+    body, mimetype = render_profile(profile, fmt)
+    return Response(body, mimetype=mimetype), 200
+
+@bp.route('/profile', methods=['GET'])
+@jwt_required()
+@admin_required
+def profile_worker_cpu():
+    """
+    Sample the stacks of every thread of the serving worker for some seconds (super admin only)
+    ---
+    tags:
+      - Admin
+    parameters:
+      - name: seconds
+        in: query
+        type: number
+        default: 10
+        description: Sampling time, at most PROFILING_MAX_SECONDS
+      - name: format
+        in: query
+        type: string
+        enum: [svg, collapsed, json]
+        default: svg
+        description: Flamegraph SVG, collapsed stacks text or the stored profile
+      - name: include_idle
+        in: query
+        type: boolean
+        description: Also count threads waiting for work
+    security:
+      - Bearer: []
+    produces:
+      - image/svg+xml
+      - text/plain
+      - application/json
+    responses:
+      200:
+        description: Profile of the worker over the sampling time
+      400:
+        description: Invalid seconds or format
+      404:
+        description: Profiling is disabled
+    """
+    config = current_app.config
+    if not config['PROFILING_ENABLED']:
+        return jsonify({"error": "Profiling is disabled"}), 404
+    fmt = request.args.get('format', 'svg')
+    seconds = request.args.get('seconds', 10, type=float)
+    if fmt not in ('svg', 'collapsed', 'json'):
+        return jsonify({"error": "format must be one of svg, collapsed, json"}), 400
+    if not 0 < seconds <= config['PROFILING_MAX_SECONDS']:
+        return jsonify({"error": f"seconds must be between 0 and {config['PROFILING_MAX_SECONDS']}"}), 400
+
+    include_idle = request.args.get('include_idle', 'false').lower() == 'true'
+    profile = profile_worker(config, seconds, include_idle=include_idle)
+    return _profile_response(profile, fmt)
+
+@bp.route('/profiles', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_profiles():
+    """
+    List stored CPU profiles, newest first (super admin only)
+    ---
+    tags:
+      - Admin
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        default: 50
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Stored profiles, without their stacks
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              id:
+                type: string
+              kind:
+                type: string
+                enum: [request, worker]
+              route:
+                type: string
+              recorded_at:
+                type: string
+                format: date-time
+              pid:
+                type: integer
+              duration_ms:
+                type: number
+              interval_ms:
+                type: number
+              samples:
+                type: integer
+    """
+    profiles = list_profiles(current_app.config['PROFILING_DIR'], limit=request.args.get('limit', 50, type=int))
+    return jsonify(profiles), 200
+
+@bp.route('/profiles/merged', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_merged_profile():
+    """
+    Sum the stored request profiles, optionally of one route, into one profile (super admin only)
+    ---
+    tags:
+      - Admin
+    parameters:
+      - name: route
+        in: query
+        type: string
+        description: Route as listed by /api/admin/profiles, e.g. "GET performance.get_case_managers_performance"
+      - name: limit
+        in: query
+        type: integer
+        default: 200
+        description: Latest profiles to include
+      - name: format
+        in: query
+        type: string
+        enum: [svg, collapsed, json]
+        default: svg
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Merged profile
+      400:
+        description: Invalid format
+    """
+    fmt = request.args.get('format', 'svg')
+    if fmt not in ('svg', 'collapsed', 'json'):
+        return jsonify({"error": "format must be one of svg, collapsed, json"}), 400
+    profile = merge_profiles(
+        current_app.config['PROFILING_DIR'],
+        route=request.args.get('route'),
+        limit=request.args.get('limit', 200, type=int)
+    )
+    return _profile_response(profile, fmt)
+
+@bp.route('/profiles/<profile_id>', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_profile(profile_id):
+    """
+    Get a stored CPU profile, e.g. the one named by a response's X-Profile-Id (super admin only)
+    ---
+    tags:
+      - Admin
+    parameters:
+      - name: profile_id
+        in: path
+        type: string
+        required: true
+      - name: format
+        in: query
+        type: string
+        enum: [svg, collapsed, json]
+        default: svg
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Profile retrieved successfully
+      400:
+        description: Invalid format
+      404:
+        description: Profile not found
+    """
+    fmt = request.args.get('format', 'svg')
+    if fmt not in ('svg', 'collapsed', 'json'):
+        return jsonify({"error": "format must be one of svg, collapsed, json"}), 400
+    profile = load_profile(current_app.config['PROFILING_DIR'], profile_id)
+    if profile is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return _profile_response(profile, fmt)
+
+@bp.route('/memory/endpoints', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_memory_by_endpoint():
+    """
+    Get peak and retained memory of profiled requests and their top allocation sites, per endpoint (super admin only)
+    ---
+    tags:
+      - Admin
+    parameters:
+      - name: sort
+        in: query
+        type: string
+        enum: [peak, retained]
+        default: peak
+        description: Rank by the largest peak or by the average memory left allocated
+      - name: hours
+        in: query
+        type: integer
+        description: Only consider requests profiled in the last hours, e.g. since a fix was deployed
+      - name: sites
+        in: query
+        type: integer
+        default: 10
+        description: Allocation sites per endpoint
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Memory profile summary, largest first
+        schema:
+          type: object
+          properties:
+            enabled:
+              type: boolean
+            sample_rate:
+              type: number
+            endpoints:
+              type: array
+              items:
+                type: object
+                properties:
+                  endpoint:
+                    type: string
+                  requests:
+                    type: integer
+                  peak_kb:
+                    type: object
+                    properties:
+                      avg:
+                        type: number
+                      p95:
+                        type: number
+                      max:
+                        type: number
+                  retained_kb_avg:
+                    type: number
+                  top_sites:
+                    type: array
+                    items:
+                      type: object
+                      properties:
+                        site:
+                          type: string
+                          description: File and line of the allocation
+                        app_frame:
+                          type: string
+                          description: Innermost app line that led to it
+                        total_kb:
+                          type: number
+                        max_kb:
+                          type: number
+                        requests:
+                          type: integer
+      400:
+        description: Invalid sort
+    """
+    sort = request.args.get('sort', 'peak')
+    if sort not in ('peak', 'retained'):
+        return jsonify({"error": "sort must be one of peak, retained"}), 400
+
+    config = current_app.config
+    endpoints = endpoint_summary(
+        config['MEMORY_PROFILING_FILE'],
+        hours=request.args.get('hours', type=int),
+        sort=sort,
+        sites=request.args.get('sites', 10, type=int)
+    )
+    return jsonify({
+        'enabled': config['MEMORY_PROFILING_ENABLED'],
+        'sample_rate': config['MEMORY_PROFILING_SAMPLE_RATE'],
+        'endpoints': endpoints
+    }), 200
+
+@bp.route('/memory/requests', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_memory_requests():
+    """
+    Get the latest memory profiled requests with their allocation sites at the peak and at the end (super admin only)
+    ---
+    tags:
+      - Admin
+    parameters:
+      - name: endpoint
+        in: query
+        type: string
+        description: Only requests of this endpoint, e.g. performance.get_single_case_manager_performance
+      - name: limit
+        in: query
+        type: integer
+        default: 20
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Profiled requests, newest first
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              recorded_at:
+                type: string
+                format: date-time
+              endpoint:
+                type: string
+              path:
+                type: string
+              status:
+                type: integer
+              duration_ms:
+                type: number
+              peak_kb:
+                type: number
+              retained_kb:
+                type: number
+              peak_sites:
+                type: array
+                items:
+                  type: object
+              retained_sites:
+                type: array
+                items:
+                  type: object
+    """
+    profiles = read_profiles(current_app.config['MEMORY_PROFILING_FILE'], endpoint=request.args.get('endpoint'))
+    limit = request.args.get('limit', 20, type=int)
+    return jsonify(profiles[::-1][:limit]), 200
@@ -5,6 +5,7 @@ from app.schemas.case_manager_schema import case_manager_schema, case_managers_s
 from app.schemas.patient_schema import patients_schema
 from app.utils.rbac import role_required
 from app.utils.validators import validate_date_range
+from app.utils.fields import parse_fields
 from app.models import CaseManagerClaims
 
 bp = Blueprint('case_manager', __name__, url_prefix='/api/case-managers')
@@ -18,6 +19,11 @@ def get_case_managers():
     ---
     tags:
       - Case Managers
+    parameters:
+      - name: fields
+        in: query
+        type: string
+        description: Comma separated columns to return, e.g. id,fullname
     security:
       - Bearer: []
     responses:
@@ -47,7 +53,8 @@ def get_case_managers():
         description: Unauthorized - invalid or missing token
     """
     current_user = UserService.get_user_by_id(get_jwt_identity())
-    case_managers = CaseManagerService.get_all_case_managers(current_user)
+    fields = parse_fields(CaseManagerService.CASE_MANAGER_FIELDS)
+    case_managers = CaseManagerService.get_all_case_managers(current_user, fields)
     return jsonify(case_managers)
 
 @bp.route('/<int:cm_id>/patients', methods=['GET'])
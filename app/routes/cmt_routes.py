@@ -3,12 +3,15 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.services import CMTService, UserService
 from app.utils.rbac import role_required
 from app.schemas.cmt_schema import cmt_schema, cmts_schema
+from app.utils.conditional import conditional_on_data_version
+from app.utils.fields import parse_fields
 
 bp = Blueprint('cmt', __name__, url_prefix='/api/cmt')
 
 "Get CMT List"
 @bp.route('/list', methods=['GET'])
 @jwt_required()
+@conditional_on_data_version
 def get_cmt_list():
     current_user = UserService.get_user_by_id(get_jwt_identity())
     cmts = CMTService.get_cmt_list(current_user)
@@ -17,12 +20,18 @@ def get_cmt_list():
 
 @bp.route('/', methods=['GET'])
 @jwt_required()
+@conditional_on_data_version
 def get_cmts():
     """
     Get all CMTs with case managers and patient counts
     ---
     tags:
       - CMT
+    parameters:
+      - name: fields
+        in: query
+        type: string
+        description: Comma separated keys to return, e.g. name,state,patient_count. Counts not selected are not computed.
     security:
       - Bearer: []
     responses:
@@ -51,11 +60,13 @@ def get_cmts():
         description: Unauthorized - invalid or missing token
     """
     current_user = UserService.get_user_by_id(get_jwt_identity())
-    cmts = CMTService.get_all_cmt(current_user)
+    fields = parse_fields(CMTService.CMT_FIELDS)
+    cmts = CMTService.get_all_cmt(current_user, fields)
     return jsonify(cmts)
 
 @bp.route('/<int:cmt_id>', methods=['GET'])
 @jwt_required()
+@conditional_on_data_version
 def get_cmt_performance(cmt_id):
     """
     Get a single CMT with performance metrics
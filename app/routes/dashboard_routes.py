@@ -1,18 +1,21 @@
+import logging
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime
 from sqlalchemy import func
 from app.services import DashboardService, UserService,PerformanceService
 from app.schemas.performance_schema import performance_schema
 from app.models import User
-from app.utils.validators import validate_date_range
+from app.utils.validators import validate_date_range, parse_date_range
+from app.utils.conditional import conditional_on_data_version
 
+logger = logging.getLogger(__name__)
 
 bp = Blueprint('dashboard', __name__, url_prefix='/api/dashboard')
 
 @bp.route('/stats', methods=['GET'])
 @jwt_required()
 @validate_date_range
+@conditional_on_data_version
 def get_dashboard_stats():
     """
     Get dashboard statistics
@@ -67,12 +70,11 @@ def get_dashboard_stats():
       401:
         description: Unauthorized - invalid or missing token
     """
-    start_date = request.args.get('start')
-    end_date = request.args.get('end')
+    start_date, end_date = parse_date_range()
     pediatrics = request.args.get('pediatrics', 'false').lower() == 'true'
     pmtct = request.args.get('pmtct', 'false').lower() == 'true'
     current_user = UserService.get_user_by_id(get_jwt_identity())
-    print(current_user)
+    logger.debug(f"Dashboard stats for user {current_user['user_id'] if current_user else None}")
     stats = DashboardService.get_stats(
         start_date,
         end_date,
@@ -85,6 +87,7 @@ def get_dashboard_stats():
 
 @bp.route('/top3-cmts', methods=['GET'])
 @jwt_required()
+@conditional_on_data_version
 def get_top_cmt():
     """
     Get top 3 performing CMTs
@@ -152,6 +155,7 @@ def get_top_cmt():
 
 @bp.route('/top3-case-managers', methods=['GET'])
 @jwt_required()
+@conditional_on_data_version
 def get_top3_case_managers():
     """
     Get top 3 performing case managers
@@ -221,6 +225,7 @@ def get_top3_case_managers():
 
 @bp.route('/appointment-trends', methods=['GET'])
 @jwt_required()
+@conditional_on_data_version
 def get_trends():
     """
     Get appointment trends data
@@ -292,16 +297,8 @@ def get_trends():
               type: string
     """
     try:
-        start_date = request.args.get('start')
-        end_date = request.args.get('end')
-        
-        # Convert dates only if both parameters are provided
-        if start_date and end_date:
-            start_date = datetime.strptime(start_date, '%Y-%m-%d')
-            end_date = datetime.strptime(end_date, '%Y-%m-%d')
-        else:
-            start_date = None
-            end_date = None
+        # Dates are converted only if both parameters are provided
+        start_date, end_date = parse_date_range()
         
         pediatrics = request.args.get('pediatrics', 'false').lower() == 'true'
         pmtct = request.args.get('pmtct', 'false').lower() == 'true'
@@ -315,5 +312,96 @@ def get_trends():
         )
         return jsonify(trends)
     except Exception as e:
-        print(f"Error in get_trends: {str(e)}")
+        logger.error(f"Error in get_trends: {str(e)}", exc_info=True)
         return jsonify({"error": str(e)}), 500
+
+
+@bp.route('/bundle', methods=['GET'])
+@jwt_required()
+@validate_date_range
+@conditional_on_data_version
+def get_dashboard_bundle():
+    """
+    Get several dashboard sections in one request
+    ---
+    tags:
+      - Dashboard
+    parameters:
+      - name: sections
+        in: query
+        type: string
+        description: Comma separated sections to compute (stats, trends, top_cmts, top_case_managers). Default is all.
+        example: "stats,top_cmts"
+      - name: start
+        in: query
+        type: string
+        format: date
+        description: Start date for stats and trends (YYYY-MM-DD)
+        example: "2024-01-01"
+      - name: end
+        in: query
+        type: string
+        format: date
+        description: End date for stats and trends (YYYY-MM-DD)
+        example: "2024-12-31"
+      - name: pediatrics
+        in: query
+        type: boolean
+        description: Filter data for pediatrics patients (ages 0-19). Default is false.
+      - name: pmtct
+        in: query
+        type: boolean
+        description: Filter data for pregnant or breastfeeding patients. Default is false.
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Dashboard sections retrieved successfully
+        schema:
+          type: object
+          properties:
+            stats:
+              type: object
+            trends:
+              type: object
+            top_cmts:
+              type: array
+              items:
+                type: object
+            top_case_managers:
+              type: array
+              items:
+                type: object
+            errors:
+              type: object
+              description: Error message per section that could not be computed
+      400:
+        description: Bad request - invalid date range or unknown section
+      401:
+        description: Unauthorized - invalid or missing token
+    """
+    sections = [s.strip() for s in request.args.get('sections', '').split(',') if s.strip()]
+    unknown = [s for s in sections if s not in DashboardService.BUNDLE_SECTIONS]
+    if unknown:
+        return jsonify({
+            "error": f"Unknown sections: {', '.join(unknown)}",
+            "allowed": list(DashboardService.BUNDLE_SECTIONS)
+        }), 400
+
+    start_date, end_date = parse_date_range()
+
+    pediatrics = request.args.get('pediatrics', 'false').lower() == 'true'
+    pmtct = request.args.get('pmtct', 'false').lower() == 'true'
+    current_user = UserService.get_user_by_id(get_jwt_identity())
+    if not current_user:
+        return jsonify({"error": "User not found"}), 404
+
+    bundle = DashboardService.get_bundle(
+        start_date,
+        end_date,
+        current_user,
+        sections=sections,
+        pediatrics_filter=pediatrics,
+        pmtct_filter=pmtct
+    )
+    return jsonify(bundle), 200
@@ -1,5 +1,6 @@
-from flask import Blueprint, jsonify
-from app.swagger_config import api
+import hmac
+from flask import Blueprint, jsonify, current_app, abort, request
+from app.utils.metrics import metrics_response
 
 bp = Blueprint('home', __name__)
 
@@ -16,4 +17,14 @@ def health():
     return jsonify({
         "status": "healthy",
         "message": "API is operational"
-    })
\ No newline at end of file
+    })
+
+@bp.route('/metrics')
+def metrics():
+    if not current_app.config['METRICS_ENABLED']:
+        abort(404)
+    token = current_app.config['METRICS_TOKEN']
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return jsonify({"error": "Unauthorized"}), 401
+    body, content_type = metrics_response(current_app._get_current_object())
+    return current_app.response_class(body, content_type=content_type)
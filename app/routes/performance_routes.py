@@ -4,18 +4,26 @@ from app.services import UserService, PerformanceService
 from app.schemas.performance_schema import performance_schema  # Update import
 from app.utils.rbac import role_required
 from app.utils.validators import validate_date_range
+from app.utils.conditional import conditional_on_data_version
+from app.utils.fields import parse_fields
 
 bp = Blueprint('performance', __name__, url_prefix='/api/performance')
 
 @bp.route('/case-managers', methods=['GET'])
 @jwt_required()
 #@role_required(['Super Admin', 'facility_backstop', 'Admin'])
+@conditional_on_data_version
 def get_case_managers():
     """
     Get performance data for all case managers
     ---
     tags:
       - Performance
+    parameters:
+      - name: fields
+        in: query
+        type: string
+        description: Comma separated columns to return, e.g. final_score,case_manager.fullname. Plain names select performance columns.
     security:
       - Bearer: []
     responses:
@@ -61,21 +69,29 @@ def get_case_managers():
     pediatrics = request.args.get('pediatrics', 'false').lower() == 'true'
     pmtct = request.args.get('pmtct', 'false').lower() == 'true'
     current_user = UserService.get_user_by_id(get_jwt_identity())
+    fields = parse_fields(PerformanceService.CASE_MANAGER_FIELDS, default='performance')
     performance_data = PerformanceService.get_case_managers_performance(
         current_user,
         pediatrics_filter=pediatrics,
-        pmtct_filter=pmtct
+        pmtct_filter=pmtct,
+        fields=fields
     )
     return jsonify(performance_data), 200
 
 @bp.route('/cmts', methods=['GET'])
 @jwt_required()
+@conditional_on_data_version
 def get_cmt_performance():
     """
     Get performance data for all CMTs
     ---
     tags:
       - Performance
+    parameters:
+      - name: fields
+        in: query
+        type: string
+        description: Comma separated keys to return, e.g. cmt,state,average_score
     security:
       - Bearer: []
     responses:
@@ -121,15 +137,18 @@ def get_cmt_performance():
     pediatrics = request.args.get('pediatrics', 'false').lower() == 'true'
     pmtct = request.args.get('pmtct', 'false').lower() == 'true'
     current_user = UserService.get_user_by_id(get_jwt_identity())
+    fields = parse_fields(PerformanceService.CMT_FIELDS)
     performance_data = PerformanceService.get_cmt_performance(
         current_user,
         pediatrics_filter=pediatrics,
-        pmtct_filter=pmtct
+        pmtct_filter=pmtct,
+        fields=fields
     )
     return jsonify(performance_data), 200
 
 @bp.route('/case-managers/<string:case_manager_id>', methods=['GET'])
 @jwt_required()
+@conditional_on_data_version
 def get_case_manager_performance(case_manager_id):
     """
     Get performance data for a specific case manager
@@ -143,6 +162,10 @@ def get_case_manager_performance(case_manager_id):
         required: true
         description: The case manager identifier
         example: "123"
+      - name: fields
+        in: query
+        type: string
+        description: Comma separated columns to return per section, e.g. performance.final_score,patients.pep_id
     security:
       - Bearer: []
     responses:
@@ -192,13 +215,15 @@ def get_case_manager_performance(case_manager_id):
               example: "Case manager not found"
     """
     current_user = UserService.get_user_by_id(get_jwt_identity())
-    performance_data = PerformanceService.get_single_case_manager_performance(case_manager_id, current_user)
+    fields = parse_fields(PerformanceService.CASE_MANAGER_DETAIL_FIELDS, default='performance')
+    performance_data = PerformanceService.get_single_case_manager_performance(case_manager_id, current_user, fields)
     if performance_data:
         return jsonify(performance_data), 200
     return jsonify({'message': 'Case manager not found'}), 404
 
 @bp.route('/cmts/<string:cmt_name>', methods=['GET'])
 @jwt_required()
+@conditional_on_data_version
 def get_cmt_performance_by_name(cmt_name):
     """
     Get performance data for a specific CMT by name
@@ -212,6 +237,10 @@ def get_cmt_performance_by_name(cmt_name):
         required: true
         description: The CMT name
         example: "CMT Lagos"
+      - name: fields
+        in: query
+        type: string
+        description: Comma separated keys to return, e.g. cmt,average_score
     security:
       - Bearer: []
     responses:
@@ -261,7 +290,8 @@ def get_cmt_performance_by_name(cmt_name):
               example: "CMT not found"
     """
     current_user = UserService.get_user_by_id(get_jwt_identity())
-    performance_data = PerformanceService.get_single_cmt_performance(cmt_name, current_user)
+    fields = parse_fields(PerformanceService.CMT_FIELDS)
+    performance_data = PerformanceService.get_single_cmt_performance(cmt_name, current_user, fields)
     if performance_data:
         return jsonify(performance_data), 200
     return jsonify({'message': 'CMT not found'}), 404
@@ -0,0 +1,30 @@
+from app.schemas import ma
+from app.models import JobRun, JobRunStatement
+
+class JobRunStatementSchema(ma.SQLAlchemySchema):
+    class Meta:
+        model = JobRunStatement
+
+    position = ma.auto_field()
+    statement = ma.auto_field()
+    duration_ms = ma.auto_field()
+    rows_affected = ma.auto_field()
+
+class JobRunSchema(ma.SQLAlchemySchema):
+    class Meta:
+        model = JobRun
+
+    id = ma.auto_field()
+    job_id = ma.auto_field()
+    job_name = ma.auto_field()
+    status = ma.auto_field()
+    started_at = ma.auto_field()
+    finished_at = ma.auto_field()
+    duration_ms = ma.auto_field()
+    rows_affected = ma.auto_field()
+    statement_count = ma.auto_field()
+    error = ma.auto_field()
+    statements = ma.Nested(JobRunStatementSchema, many=True)
+
+job_run_schema = JobRunSchema()
+job_runs_schema = JobRunSchema(many=True, exclude=('statements',))
@@ -0,0 +1,91 @@
+import logging
+from gunicorn.app.base import BaseApplication
+from app.extensions import db
+from app.utils.metrics import mark_worker_dead, reset_multiprocess_dir
+from app.utils.db_pool import connection_demand
+
+logger = logging.getLogger(__name__)
+
+class PreloadedApplication(BaseApplication):
+    """
+    Gunicorn application serving an already created Flask app.
+
+    The app is loaded once in the master and workers are forked from it, so
+    imported modules and the parsed route table are shared copy-on-write.
+    `kill -HUP <master pid>` replaces the workers gracefully; since the app is
+    preloaded, deploying new code needs `kill -USR2` (re-exec the master) followed
+    by `kill -TERM` on the old master once the new one is serving.
+    """
+
+    def __init__(self, application, options=None):
+        self.application = application
+        self.options = options or {}
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+def _dispose_engines(app):
+    """Drop pooled connections inherited from the master; each worker opens its own"""
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+def build_options(app, bind=None, workers=None, threads=None):
+    """Gunicorn settings from the WEB_* config values, overridable per call"""
+    config = app.config
+    threads = threads or config['WEB_THREADS']
+
+    def post_fork(server, worker):
+        _dispose_engines(app)
+
+    def child_exit(server, worker):
+        mark_worker_dead(worker.pid)
+
+    def when_ready(server):
+        logger.info(
+            f"Serving on {server.cfg.bind} with {server.cfg.workers} workers "
+            f"x {server.cfg.threads} threads"
+        )
+
+    return {
+        'bind': bind or config['WEB_BIND'],
+        'workers': workers or config['WEB_WORKERS'],
+        'threads': threads,
+        'worker_class': 'gthread' if threads > 1 else 'sync',
+        'preload_app': True,
+        'timeout': config['WEB_TIMEOUT'],
+        'graceful_timeout': config['WEB_GRACEFUL_TIMEOUT'],
+        'keepalive': config['WEB_KEEPALIVE'],
+        'max_requests': config['WEB_MAX_REQUESTS'],
+        'max_requests_jitter': config['WEB_MAX_REQUESTS_JITTER'],
+        'accesslog': '-',
+        'post_fork': post_fork,
+        'child_exit': child_exit,
+        'when_ready': when_ready,
+    }
+
+def serve(app, bind=None, workers=None, threads=None):
+    """Run the app under gunicorn until the master is stopped"""
+    options = build_options(app, bind=bind, workers=workers, threads=threads)
+
+    engine_options = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    pool_capacity = engine_options.get('pool_size', 5) + engine_options.get('max_overflow', 10)
+    demand = connection_demand({**app.config, 'WEB_THREADS': options['threads']})
+    if demand > pool_capacity:
+        logger.warning(
+            f"{options['threads']} threads per worker, each fanning out to "
+            f"{app.config['DASHBOARD_BUNDLE_WORKERS']} more connections on dashboard bundle requests, "
+            f"may need {demand} connections but the pool holds at most {pool_capacity}; "
+            f"requests will queue on pool checkout"
+        )
+
+    # Close connections opened while creating the app so workers do not share sockets
+    _dispose_engines(app)
+    reset_multiprocess_dir()
+    PreloadedApplication(app, options).run()
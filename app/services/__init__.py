@@ -7,6 +7,7 @@ from .report_service import ReportService
 from .facility_service import FacilityService
 from .performance_service import PerformanceService
 from .case_manager_mobile_service import CaseManagerMobileService
+from .job_run_service import JobRunService
 
 __all__ = [
     'UserService',
@@ -17,5 +18,6 @@ __all__ = [
     'ReportService',
     'FacilityService',
     'PerformanceService',
-    'CaseManagerMobileService'
+    'CaseManagerMobileService',
+    'JobRunService'
 ]
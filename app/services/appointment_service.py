@@ -3,7 +3,9 @@ from schemas.appointment_schema import (
     appointments_schema, drug_pickups_schema, viral_loads_schema
 )
 from app import db
+from app.utils.tracing import traced_service
 
+@traced_service
 class AppointmentService:
     @staticmethod
     # def get_appointments(patient_id, start_date=None, end_date=None):
@@ -1,12 +1,17 @@
 from datetime import datetime, timedelta
-from sqlalchemy import and_, func, cast, Date, text
+from sqlalchemy import and_, func
 
 from app import db
+from app.db_routing import read_replica
+from app.utils.predicates import days_before_until, today, now
 from app.models import Patient, DrugPickup, ViralLoad, CaseManager
+from app.utils.tracing import traced_service
 
 
+@traced_service
 class CaseManagerMobileService:
     @staticmethod
+    @read_replica
     def get_stats(case_manager_id: str) -> dict:
         """Return key stats for a specific case manager.
 
@@ -45,8 +50,6 @@ class CaseManagerMobileService:
         tx_cur = patient_base.filter(Patient.current_art_status == "Active").count()
 
         # IIT approximation similar to dashboard logic when no explicit range is provided
-        total_days_to_add = cast(cast(Patient.days_of_arv_refill, db.Integer), db.Integer) + 28
-        iit_date = func.dateadd(text('day'), total_days_to_add, Patient.pharmacy_last_pickup_date)
         iit = patient_base.filter(
             Patient.current_art_status != "Active",
             (Patient.outcomes == None) | (Patient.outcomes == ""),
@@ -58,25 +61,22 @@ class CaseManagerMobileService:
 
         # Viral load metrics (last 12 months window for results/collections)
         vl_base = ViralLoad.query.filter(ViralLoad.case_manager == case_manager_id)
-        today = func.cast(func.getdate(), Date)
-        twelve_months_ago = func.dateadd(text('day'), -365, today)
+        reference = today()
 
         vl_eligible = vl_base.count()
 
         vl_results = patient_base.filter(
             Patient.current_art_status == 'Active',
-            cast(Patient.days_on_art, db.Integer) >= 180,
+            Patient.days_on_art_int >= 180,
             Patient.current_viral_load != None,
-            and_(Patient.date_of_current_viral_load >= twelve_months_ago,
-                 Patient.date_of_current_viral_load <= today),
+            days_before_until(Patient.date_of_current_viral_load, reference, 365),
         ).count()
 
         vl_suppressed = patient_base.filter(
             Patient.current_art_status == 'Active',
-            cast(Patient.days_on_art, db.Integer) >= 180,
+            Patient.days_on_art_int >= 180,
             Patient.current_viral_load != None,
-            and_(Patient.date_of_current_viral_load >= twelve_months_ago,
-                 Patient.date_of_current_viral_load <= today),
+            days_before_until(Patient.date_of_current_viral_load, reference, 365),
             Patient.current_viral_load < 1000.0,
         ).count()
 
@@ -97,10 +97,11 @@ class CaseManagerMobileService:
         # Appointment stats from DrugPickup for this CM
         appt_base = db.session.query(DrugPickup).filter(DrugPickup.case_manager == case_manager_id)
         appt_total = appt_base.count()
+        current_time = now()
         appt_upcoming = appt_base.filter(DrugPickup.next_appointment_date != None,
-                                         DrugPickup.next_appointment_date >= func.getdate()).count()
+                                         DrugPickup.next_appointment_date >= current_time).count()
         appt_past_due = appt_base.filter(DrugPickup.next_appointment_date != None,
-                                         DrugPickup.next_appointment_date < func.getdate()).count()
+                                         DrugPickup.next_appointment_date < current_time).count()
 
         return {
             'total_patients': total_patients or 0,
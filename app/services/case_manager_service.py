@@ -1,16 +1,26 @@
 from app.models import CaseManager, State
 from app.schemas.case_manager_schema import (
-    case_manager_schema, case_managers_schema, 
+    CaseManagerSchema, case_manager_schema, case_managers_schema, 
 )
 from app import db
 from sqlalchemy import func
 from sqlalchemy.orm import noload
+from app.utils.fields import load_only_fields
+from app.utils.cache import invalidate_cache
+from app.utils.conditional import invalidate_data_version
+from app.utils.tracing import traced_service
 
+@traced_service
 class CaseManagerService:
+    # Columns selectable with ?fields= on the case manager list
+    CASE_MANAGER_FIELDS = {None: list(CaseManagerSchema().fields)}
+
     @staticmethod
-    def get_all_case_managers(user=None):
-        """Get all case managers."""
+    def get_all_case_managers(user=None, fields=None):
+        """Get all case managers, restricted to the selected columns if `fields` is given."""
+        names = fields[None] if fields else CaseManagerService.CASE_MANAGER_FIELDS[None]
         query = db.session.query(CaseManager).options(
+            load_only_fields(CaseManager, names),
             noload(CaseManager.assigned_patients),
             noload(CaseManager.performance_metrics),
             noload(CaseManager.drug_pickup_appointments),
@@ -23,6 +33,8 @@ class CaseManagerService:
             elif 'Admin' in user['roles']:
                 query = query.join(State, State.id == user['state_id']).filter(CaseManager.state == State.name)
 
+        if fields:
+            return CaseManagerSchema(many=True, only=names).dump(query.all())
         return case_managers_schema.dump(query.all())
 
     @staticmethod
@@ -31,6 +43,9 @@ class CaseManagerService:
         for key, value in data.items():
             setattr(case_manager, key, value)
         db.session.commit()
+        # Case managers feed the dashboard, performance and CMT results
+        invalidate_data_version()
+        invalidate_cache()
         return case_manager_schema.dump(case_manager)
 
     @staticmethod
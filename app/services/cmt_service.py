@@ -1,14 +1,27 @@
+import logging
 from app.models import CMT, CaseManager, Patient, State, CaseManagerPerformance
-from app.schemas.cmt_schema import cmt_schema, cmts_schema
+from app.schemas.cmt_schema import CMTSchema, cmt_schema, cmts_schema
 from app import db
+from app.db_routing import read_replica
 from sqlalchemy import func, and_, distinct
 from sqlalchemy.orm import selectinload
 from datetime import datetime
+from app.utils.fields import available_fields, load_only_fields
+from app.utils.cache import cached, invalidate_cache
+from app.utils.conditional import invalidate_data_version
+from app.utils.tracing import traced_service
 
+logger = logging.getLogger(__name__)
+
+@traced_service
 class CMTService:
+    # Keys selectable with ?fields= on the CMT list
+    CMT_FIELDS = {None: [*available_fields(CMT), 'case_manager_count', 'patient_count']}
 
     "Get CMT List"
     @staticmethod
+    @cached()
+    @read_replica
     def get_cmt_list(user=None):
         """Get all CMTs with case managers and patient counts."""
         query = db.session.query(CMT)
@@ -22,8 +35,17 @@ class CMTService:
         
 
     @staticmethod
-    def get_all_cmt(user=None):
-        query = db.session.query(CMT)
+    @cached()
+    @read_replica
+    def get_all_cmt(user=None, fields=None):
+        names = fields[None] if fields else CMTService.CMT_FIELDS[None]
+        columns = [name for name in names if name in available_fields(CMT)]
+        schema = CMTSchema(only=columns)
+
+        # The identifying columns are always loaded since the counts filter on them
+        query = db.session.query(CMT).options(
+            load_only_fields(CMT, columns, 'name', 'state', 'facility_name')
+        )
 
         # Apply role filters
         if 'Super Admin' not in user['roles']:
@@ -37,32 +59,34 @@ class CMTService:
         result = []
 
         for cmt in cmts:
+            cmt_data = schema.dump(cmt)
+
             # Count case managers linked to this exact CMT
-            case_manager_count = (
-                db.session.query(func.count(CaseManager.cm_id))
-                .filter(
-                    CaseManager.cmt == cmt.name,
-                    CaseManager.state == cmt.state,
-                    CaseManager.facilities == cmt.facility_name
+            if 'case_manager_count' in names:
+                case_manager_count = (
+                    db.session.query(func.count(CaseManager.cm_id))
+                    .filter(
+                        CaseManager.cmt == cmt.name,
+                        CaseManager.state == cmt.state,
+                        CaseManager.facilities == cmt.facility_name
+                    )
+                    .scalar()
                 )
-                .scalar()
-            )
+                cmt_data['case_manager_count'] = case_manager_count or 0
 
             # Count patients linked to those case managers
-            patient_count = (
-                db.session.query(func.count(Patient.id))
-                .join(CaseManager, CaseManager.cm_id == Patient.case_manager_id)
-                .filter(
-                    CaseManager.cmt == cmt.name,
-                    CaseManager.state == cmt.state,
-                    CaseManager.facilities == cmt.facility_name
+            if 'patient_count' in names:
+                patient_count = (
+                    db.session.query(func.count(Patient.id))
+                    .join(CaseManager, CaseManager.cm_id == Patient.case_manager_id)
+                    .filter(
+                        CaseManager.cmt == cmt.name,
+                        CaseManager.state == cmt.state,
+                        CaseManager.facilities == cmt.facility_name
+                    )
+                    .scalar()
                 )
-                .scalar()
-            )
-
-            cmt_data = cmt_schema.dump(cmt)
-            cmt_data['case_manager_count'] = case_manager_count or 0
-            cmt_data['patient_count'] = patient_count or 0
+                cmt_data['patient_count'] = patient_count or 0
 
             result.append(cmt_data)
 
@@ -82,6 +106,8 @@ class CMTService:
             )
             db.session.add(cmt)
             db.session.commit()
+            invalidate_data_version()
+            invalidate_cache('CMTService')
             return cmt_schema.dump(cmt)
         except Exception as e:
             db.session.rollback()
@@ -93,6 +119,8 @@ class CMTService:
         return all(key in data for key in required)
 
     @staticmethod
+    @cached()
+    @read_replica
     def get_single_cmt(cmt_id, user=None):
         """
         Get a single CMT with all its details and performance metrics
@@ -127,7 +155,7 @@ class CMTService:
                 )
             ).all()
 
-            print(f"Case managers for CMT {cmt.name}: {[cm.id for cm in case_managers]}")
+            logger.debug(f"Case managers for CMT {cmt.name}: {[cm.id for cm in case_managers]}")
 
             # Get patient count
             total_patient_count = 0
@@ -139,7 +167,7 @@ class CMTService:
                         # CaseManager.facilities == cmt.facility_name
                         Patient.case_manager_id == case_manager.cm_id
                     )).count()
-                print(f"Patient count for Case Manager {case_manager.id}: {patient_count}")
+                logger.debug(f"Patient count for Case Manager {case_manager.id}: {patient_count}")
                 total_patient_count += patient_count
                             # Get performance metrics
             performance = db.session.query(
@@ -3,14 +3,25 @@ from operator import or_
 import re
 from app.models import DrugPickup, ViralLoad, CaseManager, CMT, Patient, Facility, CaseManagerPerformance, State
 from app import db
-from sqlalchemy import func, and_, or_, case, literal, literal_column, text, cast, Date, Integer, Float
+from app.db_routing import read_replica
+from app.utils.predicates import within_days_before, at_least_days_before, today
+from sqlalchemy import func, and_, or_, case, false, literal_column
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+from flask import current_app
 import logging
 from .performance_service import PerformanceService
+from app.utils.cache import cached
+from app.utils.tracing import traced_service
+from app.utils.profiling import profiled_thread
 
 logger = logging.getLogger(__name__)
 
+@traced_service
 class DashboardService:
+    BUNDLE_SECTIONS = ('stats', 'trends', 'top_cmts', 'top_case_managers')
+
     @staticmethod
     def _get_date_range_from_next_appointment():
         """Get min and max dates from DrugPickup.next_appointment_date field"""
@@ -30,15 +41,8 @@ class DashboardService:
             pediatrics_filter: Boolean, if True filters for pediatrics/adolescents
         """
         if pediatrics_filter:
-            query = query.filter(
-                or_(
-                    and_(
-                        Patient.current_age >= 0,
-                        Patient.current_age <= 19
-                    ),
-                    Patient.current_age_months > 0
-                )
-            )
+            # isPediatric: currentAge 0-19 or currentAgeMonths > 0
+            query = query.filter(Patient.is_pediatric == True)
         return query
 
     @staticmethod
@@ -50,18 +54,46 @@ class DashboardService:
             pmtct_filter: Boolean, if True filters for PMTCT cohort
         """
         if pmtct_filter:
-            query = query.filter(
-                and_(
-                    func.lower(Patient.sex) == 'F',
-                    func.lower(Patient.current_pregnancy_status).in_(
-                        ['pregnant', 'breastfeeding']
-                    )
-                )
-            )
+            # isPmtct: sex 'f' and pregnancy status pregnant/breastfeeding, case-insensitive
+            query = query.filter(Patient.is_pmtct == True)
         return query
 
     @staticmethod
-    def get_stats(start_date, end_date, user, pediatrics_filter=False, pmtct_filter=False):
+    def scope_filters(user, pediatrics_filter=False, pmtct_filter=False):
+        """
+        Resolve the user's state scope and the cohort criteria once, for all
+        the queries of one or more dashboard sections.
+        Args:
+            user: The current user with role and access information
+            pediatrics_filter: Boolean, if True limits patients to pediatrics (0-19 years)
+            pmtct_filter: Boolean, if True limits patients to the PMTCT cohort
+        Returns:
+            dict: 'scoped' if the user only sees one state, 'state' its name,
+                  'cohort' the criteria on Patient for the requested cohorts
+        """
+        scoped = 'Super Admin' not in user['roles'] and ('State' in user['roles'] or 'Admin' in user['roles'])
+        state = None
+        if scoped:
+            state = db.session.query(State.name).filter(State.id == user['state_id']).scalar()
+        cohort = []
+        if pediatrics_filter:
+            cohort.append(Patient.is_pediatric == True)
+        if pmtct_filter:
+            cohort.append(Patient.is_pmtct == True)
+        return {'scoped': scoped, 'state': state, 'cohort': cohort}
+
+    @staticmethod
+    def _in_scope(column, filters):
+        """Criteria limiting a state name column to the user's state, none for users who see all states"""
+        if not filters['scoped']:
+            return []
+        # An unknown state id matched no rows through the State join this replaces
+        return [column == filters['state']] if filters['state'] is not None else [false()]
+
+    @staticmethod
+    @cached(derived=('filters',))
+    @read_replica
+    def get_stats(start_date, end_date, user, pediatrics_filter=False, pmtct_filter=False, filters=None):
         try:
             #logger.info(f"Getting stats for user {str(user.user_id)} from {start_date} to {end_date}")
             
@@ -70,60 +102,38 @@ class DashboardService:
                 start_date, end_date = DashboardService._get_date_range_from_next_appointment()
                 logger.info(f"Using date range from next_appointment_date: {start_date} to {end_date}")
 
-            # Get base query for patients based on user role
-            patient_query = Patient.query
-            if 'Super Admin' not in user['roles']:
-                if 'State' in user['roles']:
-                    patient_query = patient_query.join(State, State.id == user['state_id']).filter(Patient.state == State.name)
-                elif 'Admin' in user['roles']:
-                    patient_query = patient_query.join(State, State.id == user['state_id']).filter(Patient.state == State.name)
-
-            # Apply cohort filters if requested
-            patient_query = DashboardService._apply_pediatrics_filter(patient_query, pediatrics_filter)
-            patient_query = DashboardService._apply_pmtct_filter(patient_query, pmtct_filter)
-
-            vl_query = ViralLoad.query
-            if 'Super Admin' not in user['roles']:
-                if 'State' in user['roles']:
-                    vl_query = vl_query.join(State, State.id == user['state_id']).filter(ViralLoad.state == State.name)
-                elif 'Admin' in user['roles']:
-                    vl_query = vl_query.join(State, State.id == user['state_id']).filter(ViralLoad.state == State.name)
+            if filters is None:
+                filters = DashboardService.scope_filters(user, pediatrics_filter, pmtct_filter)
+
+            # Get base query for patients based on user role and cohort
+            patient_query = Patient.query.filter(
+                *DashboardService._in_scope(Patient.state, filters),
+                *filters['cohort']
+            )
+
+            vl_query = ViralLoad.query.filter(*DashboardService._in_scope(ViralLoad.state, filters))
             
             # Apply cohort filters to viral load query if requested
-            if pediatrics_filter or pmtct_filter:
+            if filters['cohort']:
                 vl_query = vl_query.join(
                     Patient,
                     and_(
                         Patient.pep_id == ViralLoad.pep_id,
                         Patient.datim_code == ViralLoad.datim_code
                     )
-                )
-                vl_query = DashboardService._apply_pediatrics_filter(vl_query, pediatrics_filter)
-                vl_query = DashboardService._apply_pmtct_filter(vl_query, pmtct_filter)
+                ).filter(*filters['cohort'])
             
-            # Convert dates for SQL Server compatibility
-            current_date = func.cast(func.getdate(), Date)
-            art_start = cast(Patient.art_start_date, Date)
-
             # TX_CUR: Active patients
             tx_cur = patient_query.filter(
                 Patient.current_art_status == "Active"
             ).count()
 
-            
-            total_days_to_add = cast(cast(Patient.days_of_arv_refill, Float), Integer) + 28
-            iit_date = func.dateadd(
-                text('day'),
-                total_days_to_add,
-                Patient.pharmacy_last_pickup_date
-            )
-            
 
-            # IIT: Inactive patients
+            # IIT: Inactive patients whose refill ran out (plus 28 days) in the range
             iit = patient_query.filter(
                 Patient.current_art_status != "Active",
                 or_(Patient.outcomes == "", Patient.outcomes.is_(None)),
-                iit_date.between(start_date, end_date)
+                Patient.iit_due_date.between(start_date, end_date)
             ).count()
 
             # Drug Pickup Appointments
@@ -135,7 +145,7 @@ class DashboardService:
             # Viral Load Stats with corrected query
             vl_eligible = patient_query.filter(
                 Patient.current_art_status == 'Active',
-                cast(Patient.days_on_art, Integer) >= 180,
+                Patient.days_on_art_int >= 180,
                 ).count()
             
             vl_eligible2 = vl_query.count()
@@ -144,54 +154,32 @@ class DashboardService:
            
             vl_results = patient_query.filter(
                 Patient.current_art_status == 'Active',
-                cast(Patient.days_on_art, Integer) >= 180,
+                Patient.days_on_art_int >= 180,
                     # Handle NULL or empty string cases properly
                 and_(
                         Patient.current_viral_load != None,  
                         # Patient.current_viral_load != ''
                     ),
-                    # Fix date comparison
-                func.datediff(
-                        text('day'),
-                        Patient.date_of_current_viral_load,
-                        literal(end_date)
-                    ) >= 0,
-                func.datediff(
-                        text('day'),
-                        Patient.date_of_current_viral_load,
-                        literal(end_date)
-                    ) <= 365
+                # Result dated within the 365 days up to end_date
+                within_days_before(Patient.date_of_current_viral_load, end_date, 365)
             ).count()
 
             # Viral Load Suppressed
             vl_suppressed = patient_query.filter(
                 Patient.current_art_status == 'Active',
-                cast(Patient.days_on_art, Integer) >= 180,
+                Patient.days_on_art_int >= 180,
                     # Handle NULL or empty string cases properly
                 and_(
                         Patient.current_viral_load != None,  
                         # Patient.current_viral_load != ''
                     ),
-                    # Fix date comparison
-                func.datediff(
-                        text('day'),
-                        Patient.date_of_current_viral_load,
-                        literal(end_date)
-                    ) >= 0,
-                func.datediff(
-                        text('day'),
-                        Patient.date_of_current_viral_load,
-                        literal(end_date)
-                    ) <= 365,
+                # Result dated within the 365 days up to end_date
+                within_days_before(Patient.date_of_current_viral_load, end_date, 365),
                 Patient.current_viral_load < 1000.0
                 ).count()
             vl_collected = patient_query.filter(
                 Patient.current_art_status == 'Active',
-                func.datediff(
-                            text('day'),
-                            art_start,
-                            current_date
-                        ) >= 180,
+                at_least_days_before(Patient.art_start_date, today(), 180),
                     # Handle NULL or empty string cases properly
                 
                 Patient.last_date_of_sample_collection.between(start_date, end_date)
@@ -213,15 +201,20 @@ class DashboardService:
             raise
 
     @staticmethod
-    def get_trends(start_date, end_date, user, pediatrics_filter=False, pmtct_filter=False):
+    @cached(derived=('filters',))
+    @read_replica
+    def get_trends(start_date, end_date, user, pediatrics_filter=False, pmtct_filter=False, filters=None):
         # Get date range from next_appointment_date field if not provided
         if not start_date or not end_date:
             start_date, end_date = DashboardService._get_date_range_from_next_appointment()
             logger.info(f"Using trend date range from next_appointment_date: {start_date} to {end_date}")
 
-        appointments = DashboardService._get_appointment_trends(start_date, end_date, user, pediatrics_filter, pmtct_filter)
-        viral_loads = DashboardService._get_viral_load_trends(start_date, end_date, user, pediatrics_filter, pmtct_filter)
-        total_visits = DashboardService._get_visit_trends(start_date, end_date, user, pediatrics_filter, pmtct_filter)
+        if filters is None:
+            filters = DashboardService.scope_filters(user, pediatrics_filter, pmtct_filter)
+
+        appointments = DashboardService._get_appointment_trends(start_date, end_date, filters)
+        viral_loads = DashboardService._get_viral_load_trends(start_date, end_date, filters)
+        total_visits = DashboardService._get_visit_trends(start_date, end_date, filters)
         
         return {
             'drug_pickups': appointments, 
@@ -230,7 +223,7 @@ class DashboardService:
         }
 
     @staticmethod
-    def _get_appointment_trends(start_date, end_date, user, pediatrics_filter=False, pmtct_filter=False):
+    def _get_appointment_trends(start_date, end_date, filters):
         # Calculate the number of weeks between start and end dates
         total_days = (end_date - start_date).days
         num_weeks = (total_days // 7) + (1 if total_days % 7 > 0 else 0)
@@ -272,18 +265,8 @@ class DashboardService:
                 expected_appointment.between(week_start, week_end)
             )
             
-            # Apply user role-based filtering
-            if 'Super Admin' not in user['roles']:
-                if 'State' in user['roles']:
-                    query = query.join(State, State.id == user['state_id']).filter(Patient.state == State.name)
-                elif 'Admin' in user['roles']:
-                    query = query.join(State, State.id == user['state_id']).filter(Patient.state == State.name)
-            
-            # Apply cohort filters if requested
-            if pediatrics_filter:
-                query = DashboardService._apply_pediatrics_filter(query, pediatrics_filter)
-            if pmtct_filter:
-                query = DashboardService._apply_pmtct_filter(query, pmtct_filter)
+            # Apply user role-based and cohort filtering
+            query = query.filter(*DashboardService._in_scope(Patient.state, filters), *filters['cohort'])
             
             count = query.scalar() or 0  # Get count or default to 0
             appt_results.append({
@@ -296,7 +279,7 @@ class DashboardService:
         return appt_results
     
     @staticmethod
-    def _get_viral_load_trends(start_date, end_date, user, pediatrics_filter=False, pmtct_filter=False):
+    def _get_viral_load_trends(start_date, end_date, filters):
         # Calculate the number of weeks between start and end dates
         total_days = (end_date - start_date).days
         num_weeks = (total_days // 7) + (1 if total_days % 7 > 0 else 0)
@@ -340,18 +323,8 @@ class DashboardService:
 
             
             
-            # Apply user role-based filtering
-            if 'Super Admin' not in user['roles']:
-                if 'State' in user['roles']:
-                    query = query.join(State, State.id == user['state_id']).filter(Patient.state == State.name)
-                elif 'Admin' in user['roles']:
-                    query = query.join(State, State.id == user['state_id']).filter(Patient.state == State.name)
-
-            # Apply cohort filters if requested
-            if pediatrics_filter:
-                query = DashboardService._apply_pediatrics_filter(query, pediatrics_filter)
-            if pmtct_filter:
-                query = DashboardService._apply_pmtct_filter(query, pmtct_filter)
+            # Apply user role-based and cohort filtering
+            query = query.filter(*DashboardService._in_scope(Patient.state, filters), *filters['cohort'])
 
             count = query.scalar() or 0  # Get count or default to 0
             vl_results.append({
@@ -364,7 +337,7 @@ class DashboardService:
         return vl_results
 
     @staticmethod
-    def _get_visit_trends(start_date, end_date, user, pediatrics_filter=False, pmtct_filter=False):
+    def _get_visit_trends(start_date, end_date, filters):
         # Calculate the number of weeks between start and end dates
         total_days = (end_date - start_date).days
         num_weeks = (total_days // 7) + (1 if total_days % 7 > 0 else 0)
@@ -394,18 +367,8 @@ class DashboardService:
                 Patient.pharmacy_last_pickup_date.between(week_start, week_end)
             )
             
-            # Apply user role-based filtering
-            if 'Super Admin' not in user['roles']:
-                if 'State' in user['roles']:
-                    query = query.join(State, State.id == user['state_id']).filter(Patient.state == State.name)
-                elif 'Admin' in user['roles']:
-                    query = query.join(State, State.id == user['state_id']).filter(Patient.state == State.name)
-
-            # Apply cohort filters if requested
-            if pediatrics_filter:
-                query = DashboardService._apply_pediatrics_filter(query, pediatrics_filter)
-            if pmtct_filter:
-                query = DashboardService._apply_pmtct_filter(query, pmtct_filter)
+            # Apply user role-based and cohort filtering
+            query = query.filter(*DashboardService._in_scope(Patient.state, filters), *filters['cohort'])
 
             count = query.scalar() or 0  # Get count or default to 0
             visit_results.append({
@@ -418,18 +381,23 @@ class DashboardService:
         return visit_results
     
     @staticmethod
-    def get_top_case_managers(user, pediatrics_filter=False, pmtct_filter=False):
+    @cached(derived=('filters',))
+    @read_replica
+    def get_top_case_managers(user, pediatrics_filter=False, pmtct_filter=False, filters=None):
         """
         Get top 3 unique case managers based on their highest final score.
         Uses window functions for better performance.
         Args:
             user: The current user with role and access information
             pediatrics_filter: Boolean, if True filters for case managers managing pediatrics patients (0-19 years)
+            filters: scope_filters() of the above, when already built
         Returns:
             List[dict]: Top 3 unique case managers with their performance data
         """
         try:
             logger.info(f"Getting top case managers for user {str(user['user_id'])}")
+            if filters is None:
+                filters = DashboardService.scope_filters(user, pediatrics_filter, pmtct_filter)
             
             # Use ROW_NUMBER window function to rank case managers by their highest score
             ranked_subquery = db.session.query(
@@ -445,22 +413,14 @@ class DashboardService:
             )
             
             # Apply cohort filters if requested - only include case managers with matching patients
-            if pediatrics_filter or pmtct_filter:
+            if filters['cohort']:
                 ranked_subquery = ranked_subquery.join(
                     Patient,
                     Patient.case_manager_id == CaseManager.cm_id
-                )
-                ranked_subquery = DashboardService._apply_pediatrics_filter(ranked_subquery, pediatrics_filter)
-                ranked_subquery = DashboardService._apply_pmtct_filter(ranked_subquery, pmtct_filter)
-                ranked_subquery = ranked_subquery.distinct()
+                ).filter(*filters['cohort']).distinct()
             
             # Apply state filter if needed
-            if 'Super Admin' not in user['roles']:
-                if 'Admin' in user['roles'] or 'State' in user['roles']:
-                    ranked_subquery = ranked_subquery.join(
-                        State,
-                        State.name == CaseManager.state
-                    ).filter(State.id == user['state_id'])
+            ranked_subquery = ranked_subquery.filter(*DashboardService._in_scope(CaseManager.state, filters))
             
             ranked_subquery = ranked_subquery.subquery()
             
@@ -499,17 +459,22 @@ class DashboardService:
             return []
     
     @staticmethod
-    def get_top_cmts(user, pediatrics_filter=False, pmtct_filter=False):
+    @cached(derived=('filters',))
+    @read_replica
+    def get_top_cmts(user, pediatrics_filter=False, pmtct_filter=False, filters=None):
         """
         Get top 3 CMTs based on their aggregated final scores.
         Args:
             user: The current user with role and access information
             pediatrics_filter: Boolean, if True filters for CMTs managing pediatrics patients (0-19 years)
+            filters: scope_filters() of the above, when already built
         Returns:
             List[dict]: Top 3 CMTs with their performance data
         """
         try:
             logger.info(f"Getting top CMTs for user {str(user['user_id'])}")
+            if filters is None:
+                filters = DashboardService.scope_filters(user, pediatrics_filter, pmtct_filter)
             
             # Use a subquery to get the highest score for each unique case manager
             # This ensures we don't double-count case managers who have multiple roles
@@ -525,14 +490,11 @@ class DashboardService:
             )
             
             # Apply cohort filters if requested - only include CMTs with matching patients
-            if pediatrics_filter or pmtct_filter:
+            if filters['cohort']:
                 unique_cm_subquery = unique_cm_subquery.join(
                     Patient,
                     Patient.case_manager_id == CaseManager.cm_id
-                )
-                unique_cm_subquery = DashboardService._apply_pediatrics_filter(unique_cm_subquery, pediatrics_filter)
-                unique_cm_subquery = DashboardService._apply_pmtct_filter(unique_cm_subquery, pmtct_filter)
-                unique_cm_subquery = unique_cm_subquery.distinct()
+                ).filter(*filters['cohort']).distinct()
             
             unique_cm_subquery = unique_cm_subquery.group_by(
                 CaseManager.cmt,
@@ -554,13 +516,7 @@ class DashboardService:
             )
             
             # Apply user filters based on role
-            if 'Super Admin' not in user['roles']:
-                if 'Admin' in user['roles'] or 'State' in user['roles']:
-                    # Join with State table to filter by state_id
-                    query = query.join(
-                        State,
-                        State.name == unique_cm_subquery.c.state
-                    ).filter(State.id == user['state_id'])
+            query = query.filter(*DashboardService._in_scope(unique_cm_subquery.c.state, filters))
             
             # Order by final score and limit to top 3
             query = query.order_by(
@@ -588,3 +544,61 @@ class DashboardService:
         except Exception as e:
             logger.error(f"Error getting top CMTs: {str(e)}", exc_info=True)
             return []
+
+    @staticmethod
+    def _run_section(app, func, *args, **kwargs):
+        """Run a section in its own app context, and so its own session and connection"""
+        with app.app_context(), profiled_thread():
+            return func(*args, **kwargs)
+
+    @staticmethod
+    @read_replica
+    def get_bundle(start_date, end_date, user, sections=None, pediatrics_filter=False, pmtct_filter=False):
+        """
+        Compute several dashboard sections for one user in a single call.
+        The scope and cohort filters are built once and the sections run
+        concurrently, each on its own pooled connection. Sections are cached
+        under the same keys as their own endpoints.
+        Args:
+            start_date, end_date: datetime bounds, or None to use the appointment date range
+            user: The current user with role and access information
+            sections: iterable of BUNDLE_SECTIONS names, defaults to all of them
+        Returns:
+            dict: one key per requested section, plus 'errors' for sections that failed
+        """
+        sections = [s for s in DashboardService.BUNDLE_SECTIONS if not sections or s in sections]
+        cohort = {
+            'pediatrics_filter': pediatrics_filter,
+            'pmtct_filter': pmtct_filter,
+            'filters': DashboardService.scope_filters(user, pediatrics_filter, pmtct_filter)
+        }
+        tasks = {
+            'stats': (DashboardService.get_stats, (start_date, end_date, user)),
+            'trends': (DashboardService.get_trends, (start_date, end_date, user)),
+            'top_cmts': (DashboardService.get_top_cmts, (user,)),
+            'top_case_managers': (DashboardService.get_top_case_managers, (user,)),
+        }
+
+        app = current_app._get_current_object()
+        workers = max(1, min(current_app.config['DASHBOARD_BUNDLE_WORKERS'], len(sections)))
+        bundle = {}
+        errors = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Each section runs in a copy of this context, so trace spans nest under the request
+            futures = {
+                section: executor.submit(
+                    contextvars.copy_context().run,
+                    DashboardService._run_section, app, tasks[section][0], *tasks[section][1], **cohort
+                )
+                for section in sections
+            }
+            for section, future in futures.items():
+                try:
+                    bundle[section] = future.result()
+                except Exception as e:
+                    logger.error(f"Error computing dashboard section {section}: {str(e)}", exc_info=True)
+                    errors[section] = str(e)
+
+        if errors:
+            bundle['errors'] = errors
+        return bundle
@@ -4,7 +4,9 @@ from app.schemas.facility_schema import (
     states_schema
 )
 from app import db
+from app.utils.tracing import traced_service
 
+@traced_service
 class FacilityService:
     @staticmethod
     def get_facilities(state_id=None):
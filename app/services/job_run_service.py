@@ -0,0 +1,204 @@
+from app.models import JobRun, JobRunStatement
+from app.schemas.job_run_schema import job_run_schema, job_runs_schema
+from app import db
+from flask import current_app
+from datetime import datetime, timedelta
+import logging
+from app.utils.tracing import traced_service
+from app.utils.telemetry import percentile
+
+logger = logging.getLogger(__name__)
+
+@traced_service
+class JobRunService:
+    @staticmethod
+    def start_run(job_id, job_name=None):
+        """
+        Record the start of a scheduled job run and return its id, or None
+        when it cannot be recorded (e.g. cms.job_runs has not been created);
+        the job itself must run regardless.
+        """
+        try:
+            run = JobRun(
+                job_id=job_id,
+                job_name=job_name,
+                status='running',
+                started_at=datetime.utcnow()
+            )
+            db.session.add(run)
+            db.session.commit()
+            logger.info(f"Job {job_id} started (run {run.id})")
+            return run.id
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error recording start of job {job_id}, running it without history: {str(e)}")
+            return None
+
+    @staticmethod
+    def finish_run(run_id, statements=None, error=None):
+        """
+        Record the end of a scheduled job run.
+        Args:
+            run_id: id returned by start_run
+            statements: per-statement timings returned by execute_sql_file
+            error: error message if the job failed
+        """
+        if run_id is None:
+            # The start of the run could not be recorded
+            return None
+        try:
+            run = db.session.get(JobRun, run_id)
+            if not run:
+                logger.warning(f"Job run {run_id} not found, cannot record its result")
+                return None
+
+            statements = statements or []
+            run.finished_at = datetime.utcnow()
+            run.duration_ms = round((run.finished_at - run.started_at).total_seconds() * 1000, 3)
+            run.status = 'failed' if error else 'succeeded'
+            run.error = error
+            run.statement_count = len(statements)
+            run.rows_affected = sum(s['rows_affected'] or 0 for s in statements)
+            for statement in statements:
+                db.session.add(JobRunStatement(job_run_id=run.id, **statement))
+            db.session.commit()
+
+            logger.info(
+                f"Job {run.job_id} {run.status} in {run.duration_ms:.0f} ms "
+                f"({run.statement_count} statements, {run.rows_affected} rows)"
+            )
+            return run.id
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error recording job run {run_id}: {str(e)}", exc_info=True)
+            return None
+
+    @staticmethod
+    def get_runs(job_id=None, status=None, limit=50):
+        """Get the most recent job runs, newest first"""
+        query = JobRun.query
+        if job_id:
+            query = query.filter(JobRun.job_id == job_id)
+        if status:
+            query = query.filter(JobRun.status == status)
+        runs = query.order_by(JobRun.started_at.desc()).limit(limit).all()
+        return job_runs_schema.dump(runs)
+
+    @staticmethod
+    def get_run(run_id):
+        """Get a single job run with its per-statement timings"""
+        run = db.session.get(JobRun, run_id)
+        return job_run_schema.dump(run) if run else None
+
+    @staticmethod
+    def _trend_ms_per_day(runs):
+        """Least squares slope of run duration over time, in milliseconds per day"""
+        points = [
+            (r.started_at.timestamp() / 86400, r.duration_ms)
+            for r in runs if r.duration_ms is not None
+        ]
+        if len(points) < 2:
+            return None
+        mean_x = sum(x for x, _ in points) / len(points)
+        mean_y = sum(y for _, y in points) / len(points)
+        variance = sum((x - mean_x) ** 2 for x, _ in points)
+        if not variance:
+            return None
+        covariance = sum((x - mean_x) * (y - mean_y) for x, y in points)
+        return round(covariance / variance, 3)
+
+    @staticmethod
+    def _traffic_window_ms(next_run_time):
+        """Milliseconds between the next scheduled start and the start of morning traffic"""
+        traffic_hour = current_app.config['JOB_TRAFFIC_START_HOUR']
+        traffic_start = next_run_time.replace(hour=traffic_hour, minute=0, second=0, microsecond=0)
+        if traffic_start <= next_run_time:
+            traffic_start += timedelta(days=1)
+        return (traffic_start - next_run_time).total_seconds() * 1000
+
+    @staticmethod
+    def _overlapping_runs(runs):
+        """Pairs of runs of different jobs whose execution windows overlapped"""
+        overlaps = []
+        ordered = sorted(runs, key=lambda r: r.started_at)
+        for i, run in enumerate(ordered):
+            run_end = run.finished_at or datetime.utcnow()
+            for other in ordered[i + 1:]:
+                if other.started_at >= run_end:
+                    break
+                if other.job_id != run.job_id:
+                    overlaps.append({
+                        'run_id': run.id,
+                        'job_id': run.job_id,
+                        'overlapping_run_id': other.id,
+                        'overlapping_job_id': other.job_id,
+                        'started_at': other.started_at.isoformat()
+                    })
+        return overlaps
+
+    @staticmethod
+    def get_metrics(days=30, next_run_time=None):
+        """
+        Summarise job run history per job.
+        Args:
+            days: size of the look-back window
+            next_run_time: callable returning a job's next start from its id, used to
+                project the run against the traffic window
+        Returns:
+            dict: per-job duration statistics, trend, projection against the
+            morning traffic window and any overlapping runs
+        """
+        since = datetime.utcnow() - timedelta(days=days)
+        runs = JobRun.query.filter(JobRun.started_at >= since).order_by(JobRun.started_at).all()
+        warn_ratio = current_app.config['JOB_WINDOW_WARN_RATIO']
+
+        runs_by_job = {}
+        for run in runs:
+            runs_by_job.setdefault(run.job_id, []).append(run)
+
+        jobs = []
+        for job_id, job_runs in runs_by_job.items():
+            succeeded = [r for r in job_runs if r.status == 'succeeded']
+            durations = [r.duration_ms for r in succeeded if r.duration_ms is not None]
+            last_run = job_runs[-1]
+            p95 = percentile(sorted(durations), 95)
+
+            job_metrics = {
+                'job_id': job_id,
+                'job_name': last_run.job_name,
+                'runs': len(job_runs),
+                'succeeded': len(succeeded),
+                'failed': len([r for r in job_runs if r.status == 'failed']),
+                'running': len([r for r in job_runs if r.status == 'running']),
+                'last_run': job_runs_schema.dump([last_run])[0],
+                'duration_ms': {
+                    'avg': round(sum(durations) / len(durations), 3) if durations else None,
+                    'p95': p95,
+                    'max': max(durations) if durations else None,
+                },
+                'trend_ms_per_day': JobRunService._trend_ms_per_day(succeeded),
+                'next_run_time': None,
+                'traffic_window_ms': None,
+                'warnings': []
+            }
+
+            next_run = next_run_time(job_id) if next_run_time else None
+            if next_run:
+                window_ms = JobRunService._traffic_window_ms(next_run)
+                job_metrics['next_run_time'] = next_run.isoformat()
+                job_metrics['traffic_window_ms'] = window_ms
+                if p95 is not None and p95 >= window_ms:
+                    job_metrics['warnings'].append('overlaps_traffic_window')
+                elif p95 is not None and p95 >= window_ms * warn_ratio:
+                    job_metrics['warnings'].append('approaching_traffic_window')
+
+            if last_run.status == 'failed':
+                job_metrics['warnings'].append('last_run_failed')
+
+            jobs.append(job_metrics)
+
+        return {
+            'window_days': days,
+            'jobs': jobs,
+            'overlapping_runs': JobRunService._overlapping_runs(runs)
+        }
@@ -2,7 +2,9 @@ from app.models import Patient, DrugPickup, ViralLoad
 from app.schemas.patient_schema import patient_schema, patients_schema
 from app.schemas.appointment_schema import drug_pickups_schema, viral_loads_schema
 from app import db
+from app.utils.tracing import traced_service
 
+@traced_service
 class PatientService:
     @staticmethod
     def get_filtered_patients(user):
@@ -1,29 +1,36 @@
 from app.models import CaseManagerPerformance, CaseManager, State, CMT, Patient
 from app import db
-from sqlalchemy import func, and_, or_, distinct
+from app.db_routing import read_replica
+from sqlalchemy import func, and_, distinct
 from sqlalchemy.inspection import inspect
+from sqlalchemy.orm import noload
 from datetime import datetime
+from app.utils.fields import available_fields, load_only_fields, dump_fields, select_fields
 import logging
+from app.utils.cache import cached
+from app.utils.tracing import traced_service
 
 
 logger = logging.getLogger(__name__)
 
+@traced_service
 class PerformanceService:
+    # Sections selectable with ?fields= on the case manager and CMT endpoints
+    CASE_MANAGER_FIELDS = {'performance': CaseManagerPerformance, 'case_manager': CaseManager}
+    CASE_MANAGER_DETAIL_FIELDS = {**CASE_MANAGER_FIELDS, 'patients': Patient}
+    CMT_FIELDS = {None: [
+        'cmt', 'state', 'facility_name', 'case_managers_count', 'tx_cur', 'iit', 'transferred_out',
+        'dead', 'discontinued', 'appointments', 'viral_load', 'average_score'
+    ]}
+
     @staticmethod
     def _apply_pediatrics_filter(query, pediatrics_filter: bool = False):
         """
         Apply pediatrics/adolescents filter (0–19 years or age in months > 0)
         """
         if pediatrics_filter:
-            query = query.filter(
-                or_(
-                    and_(
-                        Patient.current_age >= 0,
-                        Patient.current_age <= 19
-                    ),
-                    Patient.current_age_months > 0
-                )
-            )
+            # isPediatric: currentAge 0-19 or currentAgeMonths > 0
+            query = query.filter(Patient.is_pediatric == True)
         return query
 
     @staticmethod
@@ -32,31 +39,35 @@ class PerformanceService:
         Apply PMTCT filter: female patients who are pregnant or breastfeeding.
         """
         if pmtct_filter:
-            query = query.filter(
-                and_(
-                    func.lower(Patient.sex) == 'f',
-                    func.lower(Patient.current_pregnancy_status).in_(
-                        ['pregnant', 'breastfeeding']
-                    )
-                )
-            )
+            # isPmtct: sex 'f' and pregnancy status pregnant/breastfeeding, case-insensitive
+            query = query.filter(Patient.is_pmtct == True)
         return query
 
     @staticmethod
-    def get_case_managers_performance(user, pediatrics_filter: bool = False, pmtct_filter: bool = False):
+    @cached()
+    @read_replica
+    def get_case_managers_performance(user, pediatrics_filter: bool = False, pmtct_filter: bool = False, fields=None):
         """
         Get All case managers based on their final score.
         Args:
             user: The current user with role and access information
+            fields: parsed ?fields= selection over CASE_MANAGER_FIELDS, None for all columns
         Returns:
             List[dict]:  case managers with their performance data
         """
         try:
             logger.info(f"Getting case managers for user {str(user['user_id'])}")
-            
+            performance_fields = fields['performance'] if fields else available_fields(CaseManagerPerformance)
+            case_manager_fields = fields['case_manager'] if fields else available_fields(CaseManager)
+
+            # Only the selected columns are fetched, and the patients relationship is never used here
             query = db.session.query(CaseManagerPerformance, CaseManager).join(
                 CaseManager,
                 CaseManagerPerformance.CaseManagerID == CaseManager.id
+            ).options(
+                load_only_fields(CaseManagerPerformance, performance_fields),
+                load_only_fields(CaseManager, case_manager_fields),
+                noload(CaseManager.assigned_patients)
             )
 
             # Apply user filters based on role
@@ -82,17 +93,9 @@ class PerformanceService:
 
             case_managers = []
             for perf, cm in results:
-                performance_data = {
-                    column.name: getattr(perf, column.name)
-                    for column in CaseManagerPerformance.__table__.columns
-                }
-                case_manager_data = {
-                    column.name: getattr(cm, column.name)
-                    for column in CaseManager.__table__.columns
-                }
                 case_managers.append({
-                    'performance': performance_data,
-                    'case_manager': case_manager_data
+                    'performance': dump_fields(perf, performance_fields),
+                    'case_manager': dump_fields(cm, case_manager_fields)
                 })
 
             return case_managers
@@ -102,10 +105,12 @@ class PerformanceService:
             return []
 
     @staticmethod
-    def get_cmt_performance(user, pediatrics_filter: bool = False, pmtct_filter: bool = False):
+    @cached()
+    @read_replica
+    def get_cmt_performance(user, pediatrics_filter: bool = False, pmtct_filter: bool = False, fields=None):
         """Get aggregated performance data by CMT.
         Cohort filters (pediatrics / PMTCT) are used only to decide which CMTs to include,
-        not to recompute cohort-restricted metrics.
+        not to recompute cohort-restricted metrics. `fields` selects keys of CMT_FIELDS.
         """
         try:
             logger.info(f"Getting CMT performance for user {str(user['user_id'])}")
@@ -197,6 +202,8 @@ class PerformanceService:
                     'average_score': round(result.average_score or 0, 2)
                 })
 
+            if fields:
+                return [select_fields(item, fields[None]) for item in cmt_performance]
             return cmt_performance
 
         except Exception as e:
@@ -204,15 +211,25 @@ class PerformanceService:
             return []
 
     @staticmethod
-    def get_single_case_manager_performance(case_manager_id, user):
-        """Get all performance data records for a single case manager"""
+    @cached()
+    @read_replica
+    def get_single_case_manager_performance(case_manager_id, user, fields=None):
+        """Get all performance data records for a single case manager, restricted to ?fields= if given"""
         try:
             logger.info(f"Getting performance for case manager {case_manager_id}")
-            
+            performance_fields = fields['performance'] if fields else available_fields(CaseManagerPerformance)
+            case_manager_fields = fields['case_manager'] if fields else available_fields(CaseManager)
+            patient_fields = fields['patients'] if fields else available_fields(Patient)
+
             query = db.session.query(CaseManagerPerformance, CaseManager).join(
                 CaseManager,
                 CaseManagerPerformance.CaseManagerID == CaseManager.id
-            ).filter(CaseManager.id == case_manager_id)
+            ).filter(CaseManager.id == case_manager_id).options(
+                load_only_fields(CaseManagerPerformance, performance_fields),
+                # cm_id is needed below to look up the patients
+                load_only_fields(CaseManager, case_manager_fields, 'cm_id'),
+                noload(CaseManager.assigned_patients)
+            )
 
             # Apply user role filters
             if 'Super Admin' not in user['roles']:
@@ -229,38 +246,24 @@ class PerformanceService:
             # Get the first performance record and case manager (all results are for the same case manager)
             perf, cm = results[0]
             
-            # Get patients for this case manager - explicitly select all columns
-            patients = db.session.query(Patient).filter(
+            # Get patients for this case manager - only the selected columns
+            patients = db.session.query(Patient).options(
+                load_only_fields(Patient, patient_fields)
+            ).filter(
                 Patient.case_manager_id == cm.cm_id
             ).all()
             
-            # Manually serialize patients - use __dict__ to get all loaded attributes
             patients_data = []
             for patient in patients:
-                patient_data = {}
-                # Get all attributes from the patient instance
-                # This includes all loaded column values
-                for key, value in patient.__dict__.items():
-                    # Skip SQLAlchemy internal attributes
-                    if key.startswith('_'):
-                        continue
-                    
-                    # Handle datetime objects - convert to ISO format string
+                patient_data = dump_fields(patient, patient_fields)
+                # Handle datetime objects - convert to ISO format string
+                for key, value in patient_data.items():
                     if isinstance(value, datetime):
-                        patient_data[key] = value.isoformat() if value else None
-                    else:
-                        patient_data[key] = value
+                        patient_data[key] = value.isoformat()
                 patients_data.append(patient_data)
 
-            performance_data = {
-                column.name: getattr(perf, column.name)
-                for column in CaseManagerPerformance.__table__.columns
-            }
-            
-            case_manager_data = {
-                column.name: getattr(cm, column.name)
-                for column in CaseManager.__table__.columns
-            }
+            performance_data = dump_fields(perf, performance_fields)
+            case_manager_data = dump_fields(cm, case_manager_fields)
 
             logger.info(f"Found performance data for case manager {case_manager_id} with {len(patients_data)} patients")
             
@@ -275,8 +278,10 @@ class PerformanceService:
             return None
 
     @staticmethod
-    def get_single_cmt_performance(cmt_name, user):
-        """Get performance data for a single CMT"""
+    @cached()
+    @read_replica
+    def get_single_cmt_performance(cmt_name, user, fields=None):
+        """Get performance data for a single CMT, restricted to the CMT_FIELDS keys in `fields` if given"""
         try:
             logger.info(f"Getting performance for CMT {cmt_name}")
             
@@ -321,7 +326,7 @@ class PerformanceService:
             total_appointments = result.total_appointments_scheduled or 1
             total_results = result.total_vl_results or 1
 
-            return {
+            return select_fields({
                 'cmt': result.cmt,
                 'state': result.state,
                 'case_managers_count': result.total_case_managers,
@@ -343,7 +348,7 @@ class PerformanceService:
                     'suppression_rate': ((result.total_vl_suppressed or 0) / total_results) * 100
                 },
                 'average_score': round(result.average_score or 0, 2)
-            }
+            }, fields[None] if fields else None)
 
         except Exception as e:
             logger.error(f"Error getting CMT performance: {str(e)}", exc_info=True)
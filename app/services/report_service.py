@@ -3,7 +3,9 @@ from app.schemas.report_schema import cmt_report_schema, case_manager_report_sch
 from sqlalchemy import func, case
 from app import db
 from datetime import datetime
+from app.utils.tracing import traced_service
 
+@traced_service
 class ReportService:
     @staticmethod
     def generate_cmt_report(start_date, end_date, state_id=None):
@@ -5,9 +5,11 @@ from app.schemas.case_manager_schema import case_manager_schema
 from app.extensions import db
 from datetime import timedelta
 import logging
+from app.utils.tracing import traced_service
 
 logger = logging.getLogger(__name__)
 
+@traced_service
 class UserService:
     @staticmethod
     def get_users():
@@ -47,9 +49,8 @@ class UserService:
                     expires_delta=timedelta(days=1)  # Optional: Set token expiration
                 )
                 user_data = user_schema.dump(user)
-                print(user_data['roles'])
+                logger.debug(f"User {user.id} authenticated with roles {user_data['roles']}")
                 if 'CaseManager' in user_data['roles']:
-                    print('CaseManager found')
                     case_manager_id = CaseManagerClaims.query.filter_by(user_id=user.id, claim_type='CaseManagerExternalId').first().claim_value
                     if case_manager_id:
                         case_manager = CaseManager.query.filter_by(id=case_manager_id).first()
@@ -59,7 +60,6 @@ class UserService:
                             'case_manager': case_manager_schema.dump(case_manager)
                         }
                 else:
-                    print('CaseManager not found')
                     return {
                         'access_token': access_token,
                         'user': user_schema.dump(user),
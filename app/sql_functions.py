@@ -0,0 +1,102 @@
+"""
+Dialect-portable date functions for queries and computed columns.
+
+SQL Server is the production database; SQLite (local runs, benchmarks, CI)
+and PostgreSQL get equivalent expressions, so nothing outside this module
+calls GETDATE()/DATEADD()/DATEDIFF() directly. On SQLite datetimes are
+rendered in SQLAlchemy's storage format ('YYYY-MM-DD HH:MM:SS.ffffff') so
+they compare correctly with stored values and bound parameters.
+"""
+from sqlalchemy import DateTime, Integer
+from sqlalchemy.exc import CompileError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.elements import TryCast
+from sqlalchemy.sql.functions import FunctionElement
+
+SQLITE_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%f'
+
+class date_add_days(FunctionElement):
+    """date_add_days(value, days): value moved by a (possibly negative) number of days"""
+    type = DateTime()
+    inherit_cache = True
+
+class date_diff_days(FunctionElement):
+    """date_diff_days(start, end): calendar day boundaries between start and end, as DATEDIFF(day, ...)"""
+    type = Integer()
+    inherit_cache = True
+
+class current_day(FunctionElement):
+    """current_day(): midnight of the current (server local) day"""
+    type = DateTime()
+    inherit_cache = True
+
+def _unsupported(element, compiler, **kw):
+    raise CompileError(f"{type(element).__name__} is not supported by the {compiler.dialect.name} dialect")
+
+def _arguments(element, compiler, **kw):
+    return [compiler.process(argument, **kw) for argument in element.clauses]
+
+def _sqlite_datetime(value, *modifiers):
+    # strftime's %f has millisecond precision; pad it to SQLAlchemy's six digits
+    arguments = ', '.join((f"'{SQLITE_DATETIME_FORMAT}'", value, *modifiers))
+    return f"(strftime({arguments}) || '000')"
+
+compiles(date_add_days)(_unsupported)
+compiles(date_diff_days)(_unsupported)
+compiles(current_day)(_unsupported)
+
+@compiles(date_add_days, 'mssql')
+def _date_add_days_mssql(element, compiler, **kw):
+    value, days = _arguments(element, compiler, **kw)
+    return f"DATEADD(day, {days}, {value})"
+
+@compiles(date_add_days, 'sqlite')
+def _date_add_days_sqlite(element, compiler, **kw):
+    value, days = _arguments(element, compiler, **kw)
+    # A NULL number of days makes the modifier, and so the result, NULL as on SQL Server
+    return _sqlite_datetime(value, f"(({days}) || ' days')")
+
+@compiles(date_add_days, 'postgresql')
+def _date_add_days_postgresql(element, compiler, **kw):
+    value, days = _arguments(element, compiler, **kw)
+    return f"({value} + make_interval(days => {days}))"
+
+@compiles(date_diff_days, 'mssql')
+def _date_diff_days_mssql(element, compiler, **kw):
+    start, end = _arguments(element, compiler, **kw)
+    return f"DATEDIFF(day, {start}, {end})"
+
+@compiles(date_diff_days, 'sqlite')
+def _date_diff_days_sqlite(element, compiler, **kw):
+    start, end = _arguments(element, compiler, **kw)
+    return f"CAST(julianday(date({end})) - julianday(date({start})) AS INTEGER)"
+
+@compiles(date_diff_days, 'postgresql')
+def _date_diff_days_postgresql(element, compiler, **kw):
+    start, end = _arguments(element, compiler, **kw)
+    return f"(CAST({end} AS DATE) - CAST({start} AS DATE))"
+
+@compiles(current_day, 'mssql')
+def _current_day_mssql(element, compiler, **kw):
+    return "CAST(CAST(GETDATE() AS date) AS datetime)"
+
+@compiles(current_day, 'sqlite')
+def _current_day_sqlite(element, compiler, **kw):
+    return _sqlite_datetime("'now'", "'localtime'", "'start of day'")
+
+@compiles(current_day, 'postgresql')
+def _current_day_postgresql(element, compiler, **kw):
+    return "CAST(CURRENT_DATE AS TIMESTAMP)"
+
+# TRY_CAST is SQL Server only in SQLAlchemy. SQLite's CAST never fails (non-numeric
+# text becomes 0); PostgreSQL casts only text that looks like a number, else NULL.
+@compiles(TryCast, 'sqlite')
+def _try_cast_sqlite(element, compiler, **kw):
+    return compiler.visit_cast(element, **kw)
+
+@compiles(TryCast, 'postgresql')
+def _try_cast_postgresql(element, compiler, **kw):
+    value = compiler.process(element.clause, **kw)
+    pattern = r'^\s*[-+]?[0-9]+\s*$' if element.type._type_affinity is Integer \
+        else r'^\s*[-+]?[0-9]+(\.[0-9]+)?\s*$'
+    return f"CASE WHEN CAST({value} AS TEXT) ~ '{pattern}' THEN {compiler.visit_cast(element, **kw)} END"
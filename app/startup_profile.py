@@ -0,0 +1,68 @@
+import re
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+# Third-party packages whose import cost dominates worker boot time
+PROFILED_IMPORTS = ['flasgger', 'flask_restx', 'jsonschema', 'marshmallow']
+
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$')
+
+class StartupProfile:
+    """Collects wall time per create_app phase"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append({
+                'phase': name,
+                'duration_ms': round((time.perf_counter() - started) * 1000, 3)
+            })
+
+    def deferred(self, name):
+        """Record a phase that was moved off the startup path"""
+        self.phases.append({'phase': name, 'duration_ms': None, 'deferred': True})
+
+    def finish(self):
+        self.total_ms = round((time.perf_counter() - self.started) * 1000, 3)
+
+    def to_dict(self):
+        return {
+            'phases': self.phases,
+            'total_ms': getattr(self, 'total_ms', None)
+        }
+
+def measure_import_times(modules):
+    """
+    Measure the cold import time of each module in a fresh interpreter.
+    Args:
+        modules: list of importable module names
+    Returns:
+        List[dict]: cumulative import time in milliseconds per module, None if it failed
+    """
+    results = []
+    for module in modules:
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            capture_output=True, text=True
+        )
+        cumulative_us = None
+        for line in proc.stderr.splitlines():
+            match = _IMPORTTIME_LINE.match(line)
+            # Top-level entries have a single space of indentation
+            if match and match.group(4) == module and len(match.group(3)) == 1:
+                cumulative_us = int(match.group(2))
+        results.append({
+            'module': module,
+            'cumulative_ms': round(cumulative_us / 1000, 3) if cumulative_us is not None else None,
+            'error': proc.stderr.strip().splitlines()[-1] if proc.returncode else None
+        })
+    return results
@@ -1,61 +1,76 @@
-from flasgger import Swagger
-from flask import jsonify
+import importlib.util
+import json
+import os
+from flask import jsonify, send_file, send_from_directory
 
-def setup_swagger(app):
-    """Setup Swagger documentation for the Flask app"""
-    
-    # Swagger configuration
-    swagger_config = {
-        "headers": [],
-        "specs": [
-            {
-                "endpoint": 'apispec_1',
-                "route": '/api/apispec_1.json',
-                "rule_filter": lambda rule: True,  # all in
-                "model_filter": lambda tag: True,  # all in
-            }
-        ],
-        "static_url_path": "/api/flasgger_static",
-        "swagger_ui": True,
-        "specs_route": "/api/docs"
-    }
-    
-    # Swagger template
-    swagger_template = {
-        "swagger": "2.0",
-        "info": {
-            "title": "CMT API",
-            "description": "A comprehensive API for Case Management Team (CMT) operations",
-            "version": "1.0.0",
-            "contact": {
-                "name": "API Support",
-                "email": "support@example.com"
-            }
-        },
-        "securityDefinitions": {
-            "Bearer": {
-                "type": "apiKey",
-                "name": "Authorization",
-                "in": "header",
-                "description": "JWT Authorization header using the Bearer scheme. Example: \"Bearer {token}\""
-            }
-        },
-        "security": [
-            {
-                "Bearer": []
-            }
-        ],
-        "consumes": [
-            "application/json"
-        ],
-        "produces": [
-            "application/json"
-        ]
-    }
-    
-    # Initialize Swagger
-    swagger = Swagger(app, config=swagger_config, template=swagger_template)
-    
+# Swagger configuration
+SWAGGER_CONFIG = {
+    "headers": [],
+    "specs": [
+        {
+            "endpoint": 'apispec_1',
+            "route": '/api/apispec_1.json',
+            "rule_filter": lambda rule: True,  # all in
+            "model_filter": lambda tag: True,  # all in
+        }
+    ],
+    "static_url_path": "/api/flasgger_static",
+    "swagger_ui": True,
+    "specs_route": "/api/docs"
+}
+
+# Swagger UI page of the lazy and static modes, on flasgger's bundled swagger-ui assets
+DOCS_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>{title}</title>
+  <link rel="stylesheet" href="{static}/swagger-ui.css">
+</head>
+<body>
+  <div id="swagger-ui"></div>
+  <script src="{static}/swagger-ui-bundle.js"></script>
+  <script>
+    SwaggerUIBundle({{url: "{spec}", dom_id: "#swagger-ui", deepLinking: true}});
+  </script>
+</body>
+</html>
+"""
+
+# Swagger template
+SWAGGER_TEMPLATE = {
+    "swagger": "2.0",
+    "info": {
+        "title": "CMT API",
+        "description": "A comprehensive API for Case Management Team (CMT) operations",
+        "version": "1.0.0",
+        "contact": {
+            "name": "API Support",
+            "email": "support@example.com"
+        }
+    },
+    "securityDefinitions": {
+        "Bearer": {
+            "type": "apiKey",
+            "name": "Authorization",
+            "in": "header",
+            "description": "JWT Authorization header using the Bearer scheme. Example: \"Bearer {token}\""
+        }
+    },
+    "security": [
+        {
+            "Bearer": []
+        }
+    ],
+    "consumes": [
+        "application/json"
+    ],
+    "produces": [
+        "application/json"
+    ]
+}
+
+def register_health_check(app):
     # Add a simple health check endpoint for testing
     @app.route('/api/health')
     def health_check():
@@ -81,5 +96,81 @@ def setup_swagger(app):
             "status": "healthy",
             "message": "API is operational"
         })
-    
-    return swagger 
\ No newline at end of file
+
+def register_docs_page(app):
+    """Serve the Swagger UI at /api/docs from flasgger's assets, without importing flasgger"""
+    spec = importlib.util.find_spec('flasgger')
+    if spec is None or not spec.submodule_search_locations:
+        return
+    assets = os.path.join(spec.submodule_search_locations[0], 'ui3', 'static')
+    static_url = SWAGGER_CONFIG['static_url_path']
+    page = DOCS_PAGE.format(
+        title=SWAGGER_TEMPLATE['info']['title'],
+        static=static_url,
+        spec=SWAGGER_CONFIG['specs'][0]['route']
+    )
+
+    def docs():
+        return page
+
+    def docs_static(filename):
+        return send_from_directory(assets, filename, max_age=app.config['SWAGGER_SPEC_MAX_AGE'])
+
+    app.add_url_rule(SWAGGER_CONFIG['specs_route'], 'apidocs', docs)
+    app.add_url_rule(f'{static_url}/<path:filename>', 'swagger_static', docs_static)
+
+def build_apispec(app):
+    """Parse the route docstrings of the app into a Swagger spec dict"""
+    # flasgger (and jsonschema) are imported only when a spec is actually built
+    from flasgger import Swagger
+
+    swagger = Swagger(config=SWAGGER_CONFIG, template=SWAGGER_TEMPLATE)
+    swagger.app = app
+    with app.test_request_context():
+        return swagger.get_apispecs('apispec_1')
+
+def setup_lazy_swagger(app):
+    """Serve the spec and the Swagger UI without loading flasgger at startup; the spec is built on the first request"""
+    spec_cache = {}
+
+    def apispec():
+        if 'spec' not in spec_cache:
+            spec_cache['spec'] = build_apispec(app)
+        return jsonify(spec_cache['spec'])
+
+    app.add_url_rule('/api/apispec_1.json', 'apispec_1', apispec)
+    register_docs_page(app)
+    register_health_check(app)
+
+def write_apispec(app, path):
+    """Build the spec once and write it to a static JSON artifact"""
+    spec = build_apispec(app)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as spec_file:
+        json.dump(spec, spec_file, sort_keys=True, separators=(',', ':'))
+    return spec
+
+def setup_static_swagger(app, path):
+    """Serve a prebuilt spec artifact and the Swagger UI; flasgger is never imported"""
+    path = os.path.abspath(path)
+    max_age = app.config['SWAGGER_SPEC_MAX_AGE']
+
+    def apispec():
+        # send_file adds ETag/Last-Modified and answers If-None-Match with 304
+        return send_file(path, mimetype='application/json', max_age=max_age, conditional=True)
+
+    app.add_url_rule('/api/apispec_1.json', 'apispec_1', apispec)
+    register_docs_page(app)
+    register_health_check(app)
+
+def setup_swagger(app):
+    """Setup Swagger documentation for the Flask app"""
+    from flasgger import Swagger
+
+    # Initialize Swagger
+    swagger = Swagger(app, config=SWAGGER_CONFIG, template=SWAGGER_TEMPLATE)
+    register_health_check(app)
+
+    return swagger
@@ -1,10 +1,11 @@
 from .validators import validate_date_range
-from .rbac import role_required, facility_access_required
+from .rbac import role_required, facility_access_required, admin_required
 from .error_handler import register_error_handlers
 
 __all__ = [
     'validate_date_range',
     'role_required',
     'facility_access_required',
+    'admin_required',
     'register_error_handlers'
 ]
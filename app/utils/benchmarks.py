@@ -0,0 +1,169 @@
+"""
+Service-level benchmarks with regression gates.
+
+Each hot service method is run against the current database (normally one
+filled by app.utils.synthetic) and measured for wall time, SQL statement
+count and peak Python memory. Results are compared with a stored baseline:
+time and memory may grow by a relative threshold, the statement count,
+being deterministic, may not grow at all. The services log and swallow
+their errors, so a broken query returns an empty result and looks fast:
+empty results fail the run, and the result size may not shrink.
+"""
+import gc
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event, select, func
+from app import db
+from app.models import CaseManager, CMT, Patient
+from app.services import DashboardService, PerformanceService, CMTService, CaseManagerMobileService
+from app.utils.predicates import day_start
+
+SUPER_ADMIN = {'user_id': 0, 'roles': ['Super Admin'], 'state_id': None, 'facility_id': None}
+
+# Dashboard windows are the 12 weeks up to the reference date
+WINDOW_DAYS = 84
+
+SERVICE_BENCHMARKS = {
+    'dashboard.get_stats': lambda c: DashboardService.get_stats(c['start'], c['end'], c['user']),
+    'dashboard.get_stats[pediatrics]': lambda c: DashboardService.get_stats(
+        c['start'], c['end'], c['user'], pediatrics_filter=True),
+    'dashboard.get_stats[pmtct]': lambda c: DashboardService.get_stats(
+        c['start'], c['end'], c['user'], pmtct_filter=True),
+    'dashboard.get_trends': lambda c: DashboardService.get_trends(c['start'], c['end'], c['user']),
+    'dashboard.get_top_case_managers': lambda c: DashboardService.get_top_case_managers(c['user']),
+    'dashboard.get_top_cmts': lambda c: DashboardService.get_top_cmts(c['user']),
+    'performance.get_case_managers_performance': lambda c: PerformanceService.get_case_managers_performance(
+        c['user']),
+    'performance.get_cmt_performance': lambda c: PerformanceService.get_cmt_performance(c['user']),
+    'performance.get_single_case_manager_performance':
+        lambda c: PerformanceService.get_single_case_manager_performance(c['case_manager_id'], c['user']),
+    'performance.get_single_cmt_performance':
+        lambda c: PerformanceService.get_single_cmt_performance(c['cmt_name'], c['user']),
+    'cmt.get_all_cmt': lambda c: CMTService.get_all_cmt(c['user']),
+    'cmt.get_single_cmt': lambda c: CMTService.get_single_cmt(c['cmt_id'], c['user']),
+    'mobile.get_stats': lambda c: CaseManagerMobileService.get_stats(c['case_manager_id']),
+}
+
+# Metrics allowed to grow by the threshold, or by this absolute amount on small values;
+# anything else must not grow
+NOISE_FLOOR = {'wall_ms': 5.0, 'peak_kb': 64.0}
+
+class StatementCounter:
+    """Counts the statements executed on every engine while active"""
+
+    def __init__(self):
+        self.count = 0
+
+    def _count(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc_info):
+        for engine in db.engines.values():
+            event.remove(engine, 'before_cursor_execute', self._count)
+
+def benchmark_context(reference=None):
+    """Sample arguments for the service calls, taken from the data"""
+    end = day_start(reference or datetime.now())
+    case_manager = db.session.execute(
+        select(CaseManager.id, CaseManager.cmt).order_by(CaseManager.cm_id).limit(1)
+    ).first()
+    cmt = db.session.execute(select(CMT.id).order_by(CMT.id).limit(1)).scalar()
+    return {
+        'user': SUPER_ADMIN,
+        'start': end - timedelta(days=WINDOW_DAYS),
+        'end': end,
+        'case_manager_id': case_manager.id if case_manager else None,
+        'cmt_name': case_manager.cmt if case_manager else None,
+        'cmt_id': cmt,
+        'patients': db.session.execute(select(func.count()).select_from(Patient)).scalar()
+    }
+
+def _result_size(result):
+    if isinstance(result, (list, dict)):
+        return len(result)
+    return 0 if result is None else 1
+
+def measure(call, context, repeat=5):
+    """Median/min wall time over `repeat` runs, then statements and peak memory of one traced run"""
+    call(context)  # warm-up: connections, compiled statement cache, mapper configuration
+    timings = []
+    for _ in range(repeat):
+        db.session.remove()
+        gc.collect()
+        started = time.perf_counter()
+        call(context)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    # tracemalloc slows the call down, so the traced run is not timed
+    db.session.remove()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        with StatementCounter() as statements:
+            result = call(context)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    db.session.remove()
+
+    return {
+        'wall_ms': round(statistics.median(timings), 2),
+        'wall_ms_min': round(min(timings), 2),
+        'statements': statements.count,
+        'peak_kb': round(peak / 1024, 1),
+        'result_size': _result_size(result)
+    }
+
+def run_benchmarks(repeat=5, only=None, reference=None):
+    """Measure every (or the selected) service benchmark on the current data"""
+    context = benchmark_context(reference)
+    names = [name for name in SERVICE_BENCHMARKS if not only or name in only]
+    # Cached results would measure the cache, not the services
+    config = current_app.config
+    cache_enabled, config['CACHE_ENABLED'] = config['CACHE_ENABLED'], False
+    try:
+        results = {name: measure(SERVICE_BENCHMARKS[name], context, repeat) for name in names}
+    finally:
+        config['CACHE_ENABLED'] = cache_enabled
+    return {'patients': context['patients'], 'results': results}
+
+def empty_results(results):
+    """Benchmarks of {benchmark: metrics} whose service returned nothing"""
+    return [name for name, metrics in results.items() if not metrics['result_size']]
+
+def compare(baseline, current, threshold=0.25):
+    """
+    Regressions of `current` against `baseline`, both {size: {benchmark: metrics}}.
+    Returns [{'size', 'benchmark', 'metric', 'baseline', 'current', 'change'}].
+    """
+    regressions = []
+    for size, results in current.items():
+        for name, metrics in results.items():
+            previous = baseline.get(size, {}).get(name)
+            if previous is None:
+                continue
+            for metric in ('wall_ms', 'statements', 'peak_kb', 'result_size'):
+                allowed = previous[metric]
+                if metric in NOISE_FLOOR:
+                    allowed = max(allowed * (1 + threshold), allowed + NOISE_FLOOR[metric])
+                # The same data must give the same result, a smaller one means rows went missing
+                shrunk = metric == 'result_size' and metrics[metric] < previous[metric]
+                if shrunk or (metric != 'result_size' and metrics[metric] > allowed):
+                    regressions.append({
+                        'size': size,
+                        'benchmark': name,
+                        'metric': metric,
+                        'baseline': previous[metric],
+                        'current': metrics[metric],
+                        'change': round(metrics[metric] / previous[metric] - 1, 3) if previous[metric] else None
+                    })
+    return regressions
@@ -0,0 +1,420 @@
+"""
+Two-tier cache of service results.
+
+Tier 1 is an LRU in each process. Tier 2, optional, is a store shared by
+processes: a SQLite file for the workers of one host (CACHE_BACKEND
+'sqlite') or a Redis-compatible server (CACHE_BACKEND 'redis', needs the
+`redis` package). A miss in the LRU is looked up in the shared store, and
+a value computed by one worker is then found by the others.
+
+Keys are built from the method, its arguments with the `user` replaced by
+the user's data scope, and the performance data version. The scope is
+what the services filter on: Super Admins see everything, State and Admin
+users see their state, so every State and Admin user of Lagos shares the
+entries for Lagos. A new data version (a scheduled job finished) moves
+every worker to new keys within DATA_VERSION_TTL.
+
+An entry is fresh for CACHE_TTL seconds. For CACHE_STALE_TTL seconds more
+it is still served, while one background thread per key recomputes it.
+Values are stored as JSON, with datetimes, dates and decimals tagged so they
+come back with their type: callers never share a mutable cached object, and
+what is read from the shared store is only ever parsed, never executed.
+Results JSON cannot represent (tuples aside, which come back as lists) are
+not cached.
+"""
+import hashlib
+import inspect
+import json
+import logging
+import os
+import random
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from functools import wraps
+from flask import current_app
+from app.utils.conditional import get_data_version
+from app.utils.metrics import record_cache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Share of writes to the SQLite store that also purge its expired entries
+SQLITE_PURGE_RATE = 0.01
+
+# Part of every key: entries written in another format are never read
+FORMAT_VERSION = 2
+
+TYPE_TAG = '__cache_type__'
+_DECODERS = {'datetime': datetime.fromisoformat, 'date': date.fromisoformat, 'decimal': Decimal}
+
+# fresh_until and stale_until ahead of the payload in the Redis values
+_DEADLINES = struct.Struct('!dd')
+
+def principal_scope(user):
+    """The part of a user the services filter on: 'all', 'state:<id>', or the user for other roles"""
+    if not user:
+        return 'anonymous'
+    roles = user.get('roles') or []
+    if 'Super Admin' in roles:
+        return 'all'
+    if 'State' in roles or 'Admin' in roles:
+        return f"state:{user.get('state_id')}"
+    return f"user:{user.get('user_id')}"
+
+def _normalize(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return sorted(_normalize(item) for item in value)
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in value.items()}
+    return value
+
+def _tag(value):
+    if isinstance(value, datetime):
+        return {TYPE_TAG: 'datetime', 'value': value.isoformat()}
+    if isinstance(value, date):
+        return {TYPE_TAG: 'date', 'value': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {TYPE_TAG: 'decimal', 'value': str(value)}
+    raise TypeError(f"{type(value).__name__} is not cacheable")
+
+def _untag(value):
+    if isinstance(value, list):
+        return [_untag(item) for item in value]
+    if isinstance(value, dict):
+        kind = value.get(TYPE_TAG)
+        if kind is not None:
+            if kind not in _DECODERS:
+                raise ValueError(f"unknown cached type {kind!r}")
+            return _DECODERS[kind](value['value'])
+        return {key: _untag(item) for key, item in value.items()}
+    return value
+
+def dumps(value):
+    """JSON bytes of a service result; TypeError when it holds anything but JSON types, datetimes and decimals"""
+    if orjson is not None:
+        return orjson.dumps(value, default=_tag, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    return json.dumps(value, default=_tag, separators=(',', ':')).encode('utf-8')
+
+def loads(payload):
+    """The service result of dumps(); ValueError when the payload is not one"""
+    return _untag(orjson.loads(payload) if orjson is not None else json.loads(payload))
+
+def make_key(namespace, signature, args, kwargs, data_version, derived=()):
+    """
+    '<namespace>:<scope>:<digest>' of a call, with the `user` argument replaced
+    by its scope and the `derived` arguments left out
+    """
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    arguments = {name: value for name, value in bound.arguments.items() if name not in derived}
+    scope = principal_scope(arguments.pop('user', None))
+    material = json.dumps([_normalize(arguments), data_version, FORMAT_VERSION], sort_keys=True, default=str)
+    return f"{namespace}:{scope}:{hashlib.sha1(material.encode('utf-8')).hexdigest()}"
+
+class MemoryLRU:
+    """Process-local tier: at most `max_entries` entries, least recently used evicted first"""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, payload, fresh_until, stale_until):
+        with self._lock:
+            self._entries[key] = (payload, fresh_until, stale_until)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+class SQLiteStore:
+    """Shared tier in a SQLite file; each thread of each process opens its own connection"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache_entries ('
+                'key TEXT PRIMARY KEY, payload BLOB NOT NULL, fresh_until REAL NOT NULL, stale_until REAL NOT NULL)'
+            )
+
+    def _connect(self):
+        # Connections must not cross a fork, so a forked worker reopens them
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key):
+        row = self._connect().execute(
+            'SELECT payload, fresh_until, stale_until FROM cache_entries WHERE key = ? AND stale_until > ?',
+            (key, time.time())
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def set(self, key, payload, fresh_until, stale_until):
+        connection = self._connect()
+        connection.execute(
+            'INSERT OR REPLACE INTO cache_entries (key, payload, fresh_until, stale_until) VALUES (?, ?, ?, ?)',
+            (key, payload, fresh_until, stale_until)
+        )
+        if random.random() < SQLITE_PURGE_RATE:
+            connection.execute('DELETE FROM cache_entries WHERE stale_until <= ?', (time.time(),))
+
+    def delete_prefix(self, prefix):
+        escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        self._connect().execute("DELETE FROM cache_entries WHERE key LIKE ? ESCAPE '\\'", (escaped + '%',))
+
+class RedisStore:
+    """Shared tier in Redis or a compatible server; entries expire with their stale deadline"""
+
+    def __init__(self, url, prefix='cmt-cache:'):
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if not raw:
+            return None
+        fresh_until, stale_until = _DEADLINES.unpack_from(raw)
+        return raw[_DEADLINES.size:], fresh_until, stale_until
+
+    def set(self, key, payload, fresh_until, stale_until):
+        ttl_ms = max(1, int((stale_until - time.time()) * 1000))
+        self.client.set(self.prefix + key, _DEADLINES.pack(fresh_until, stale_until) + payload, px=ttl_ms)
+
+    def delete_prefix(self, prefix):
+        keys = list(self.client.scan_iter(match=self.prefix + prefix + '*', count=500))
+        for start in range(0, len(keys), 500):
+            self.client.delete(*keys[start:start + 500])
+
+class ServiceCache:
+    """The two tiers with single-flight computation of misses and background refresh of stale entries"""
+
+    def __init__(self, memory, shared=None, ttl=300, stale_ttl=900, refresh_workers=2):
+        self.memory = memory
+        self.shared = shared
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.refresh_workers = refresh_workers
+        self._refresher = None
+        self._refresher_pid = None
+        self._refreshing = set()
+        self._computing = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, key):
+        entry = self.memory.get(key)
+        record_cache('service_memory', hit=entry is not None)
+        if entry is not None or self.shared is None:
+            return entry
+        try:
+            entry = self.shared.get(key)
+        except Exception as e:
+            logger.warning(f"Shared cache read failed: {str(e)}")
+            entry = None
+        record_cache('service_shared', hit=entry is not None)
+        if entry is not None:
+            self.memory.set(key, *entry)
+        return entry
+
+    def _store(self, key, value):
+        # The services return [] or None when they failed, so falsy results are not kept
+        if not value:
+            return
+        try:
+            payload = dumps(value)
+        except TypeError as e:
+            logger.warning(f"Not caching {key}: {str(e)}")
+            return
+        now = time.time()
+        entry = (payload, now + self.ttl, now + self.ttl + self.stale_ttl)
+        self.memory.set(key, *entry)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, *entry)
+            except Exception as e:
+                logger.warning(f"Shared cache write failed: {str(e)}")
+
+    def _compute(self, key, compute):
+        """Compute a missing value once per process; concurrent callers wait for the first"""
+        with self._lock:
+            pending = self._computing.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._computing[key] = threading.Event()
+        if not leader:
+            pending.wait(timeout=self.ttl)
+            entry = self.memory.get(key)
+            if entry is not None:
+                return loads(entry[0])
+            return compute()
+        try:
+            value = compute()
+            self._store(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._computing.pop(key, None)
+            pending.set()
+
+    def _refresh(self, app, key, compute):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                with app.app_context():
+                    self._store(key, compute())
+            except Exception as e:
+                logger.warning(f"Background refresh of {key} failed: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        # Pool threads do not survive fork, so a forked worker starts its own pool
+        if self._refresher_pid != os.getpid():
+            self._refresher = ThreadPoolExecutor(max_workers=self.refresh_workers, thread_name_prefix='cache-refresh')
+            self._refresher_pid = os.getpid()
+        self._refresher.submit(run)
+
+    def get_or_compute(self, key, compute):
+        entry = self._lookup(key)
+        if entry is None:
+            return self._compute(key, compute)
+        payload, fresh_until, _ = entry
+        try:
+            value = loads(payload)
+        except ValueError as e:
+            logger.warning(f"Discarding unreadable cache entry {key}: {str(e)}")
+            self.invalidate(key)
+            return self._compute(key, compute)
+        if fresh_until <= time.time():
+            self._refresh(current_app._get_current_object(), key, compute)
+        return value
+
+    def invalidate(self, namespace=''):
+        """Drop the entries of a namespace (a class, 'CMTService', or a method), or all entries"""
+        self.memory.delete_prefix(namespace)
+        if self.shared is not None:
+            try:
+                self.shared.delete_prefix(namespace)
+            except Exception as e:
+                logger.warning(f"Shared cache invalidation failed: {str(e)}")
+
+def cached(namespace=None, derived=()):
+    """
+    Cache a service method's result per data scope (see principal_scope) and
+    data version. Apply below @staticmethod. A no-op when the app has no
+    cache or CACHE_ENABLED is off. Arguments named in `derived` are computed
+    from the others (e.g. prebuilt filters) and are not part of the key.
+    """
+    def decorator(f):
+        key_namespace = namespace or f.__qualname__
+        signature = inspect.signature(f)
+
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            cache = current_app.extensions.get('service_cache')
+            if cache is None or not current_app.config['CACHE_ENABLED']:
+                return f(*args, **kwargs)
+            try:
+                key = make_key(key_namespace, signature, args, kwargs, get_data_version()[0], derived)
+            except Exception as e:
+                logger.warning(f"Calling {key_namespace} uncached, no cache key: {str(e)}")
+                return f(*args, **kwargs)
+            return cache.get_or_compute(key, lambda: f(*args, **kwargs))
+        return decorated_function
+    return decorator
+
+def invalidate_cache(namespace=''):
+    """
+    Drop cached service results from this process's LRU and from the shared
+    store. The LRUs of other processes (web workers, when called from the
+    scheduler process) keep theirs until they expire; results that depend on
+    the data move to new keys anyway once the data version changes, within
+    DATA_VERSION_TTL.
+    """
+    cache = current_app.extensions.get('service_cache')
+    if cache is not None:
+        cache.invalidate(namespace)
+
+def _shared_store(config):
+    backend = config['CACHE_BACKEND']
+    if backend == 'sqlite':
+        return SQLiteStore(config['CACHE_SQLITE_PATH'])
+    if backend == 'redis':
+        if redis is None:
+            logger.warning("CACHE_BACKEND is 'redis' but the redis package is not installed, using memory only")
+            return None
+        return RedisStore(config['CACHE_REDIS_URL'])
+    return None
+
+def register_cache(app):
+    """Create the service cache from the CACHE_* settings"""
+    config = app.config
+    if not config['CACHE_ENABLED']:
+        return None
+    try:
+        shared = _shared_store(config)
+    except Exception as e:
+        logger.warning(f"Shared cache unavailable, using memory only: {str(e)}")
+        shared = None
+    cache = ServiceCache(
+        MemoryLRU(config['CACHE_MAX_ENTRIES']),
+        shared=shared,
+        ttl=config['CACHE_TTL'],
+        stale_ttl=config['CACHE_STALE_TTL'],
+        refresh_workers=config['CACHE_REFRESH_WORKERS']
+    )
+    app.extensions['service_cache'] = cache
+    logger.info(
+        f"Service cache: {config['CACHE_MAX_ENTRIES']} entries in memory"
+        f"{', shared through ' + config['CACHE_BACKEND'] if shared is not None else ''}"
+    )
+    return cache
@@ -0,0 +1,136 @@
+import hashlib
+import logging
+import threading
+import time
+from datetime import datetime
+from functools import wraps
+from flask import current_app, request, make_response
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import func
+from app import db
+from app.utils.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+_version_lock = threading.Lock()
+_version_cache = {}
+# Fingerprinted data has no modification date: the first time this process
+# saw the current fingerprint stands in for it
+_fingerprint_seen = {}
+
+def _load_data_version():
+    # Imported here so the utils package does not import the models eagerly
+    from app.models import CaseManagerPerformance, JobRun, CaseManager, CMT
+
+    performance_updated = db.session.query(func.max(CaseManagerPerformance.updated_date)).scalar()
+    last_job_run = db.session.query(func.max(JobRun.finished_at)).filter(
+        JobRun.status == 'succeeded'
+    ).scalar()
+    cmt_count, last_cmt_id, last_cmt_created = db.session.query(
+        func.count(CMT.id), func.max(CMT.id), func.max(CMT.created_at)
+    ).one()
+
+    # Case managers are edited through the API and have no modification date;
+    # the table is small, so its rows are fingerprinted instead
+    case_managers = hashlib.sha1()
+    for row in db.session.query(
+        CaseManager.cm_id, CaseManager.id, CaseManager.fullname, CaseManager.role,
+        CaseManager.cmt, CaseManager.state, CaseManager.facilities
+    ).order_by(CaseManager.cm_id):
+        case_managers.update(repr(tuple(row)).encode('utf-8'))
+
+    fingerprint = f"{cmt_count}:{last_cmt_id}|{case_managers.hexdigest()}"
+    version = f"{performance_updated.isoformat() if performance_updated else ''}|" \
+              f"{last_job_run.isoformat() if last_job_run else ''}|{fingerprint}"
+    last_modified = max(
+        (d for d in (performance_updated, last_job_run, last_cmt_created, _fingerprint_changed_at(fingerprint)) if d),
+        default=None
+    )
+    return version, last_modified
+
+def _fingerprint_changed_at(fingerprint):
+    """
+    When this process first saw `fingerprint`. It is never earlier than the
+    write that produced it, so If-Modified-Since cannot match a response
+    served before an edit of a case manager or a deleted CMT.
+    """
+    with _version_lock:
+        if _fingerprint_seen.get('fingerprint') != fingerprint:
+            _fingerprint_seen.update(fingerprint=fingerprint, at=datetime.utcnow())
+        return _fingerprint_seen['at']
+
+def get_data_version():
+    """
+    Version of the performance data as (version string, last modified datetime).
+    It changes when the scheduled jobs run and when CMTs or case managers are
+    written. The lookup is cached in-process for DATA_VERSION_TTL seconds; the
+    write paths drop it with invalidate_data_version(), so other processes see
+    a write within DATA_VERSION_TTL.
+    """
+    ttl = current_app.config['DATA_VERSION_TTL']
+    now = time.monotonic()
+    with _version_lock:
+        cached = _version_cache.get('version')
+        if cached and now - cached[0] < ttl:
+            record_cache('data_version', hit=True)
+            return cached[1]
+
+    record_cache('data_version', hit=False)
+    value = _load_data_version()
+    with _version_lock:
+        _version_cache['version'] = (now, value)
+    return value
+
+def invalidate_data_version():
+    """Drop this process's cached data version, e.g. after a scheduled job or a write changed the data"""
+    with _version_lock:
+        _version_cache.clear()
+
+def _not_modified(version, last_modified):
+    if_modified_since = request.if_modified_since
+    if request.if_none_match:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+        return request.if_none_match.contains_weak(version)
+    if if_modified_since and last_modified:
+        return last_modified.replace(microsecond=0) <= if_modified_since.replace(tzinfo=None)
+    return False
+
+def conditional_on_data_version(f):
+    """
+    Answer GET requests with a weak ETag derived from the data version, the
+    caller and the full request path, and return 304 Not Modified without
+    calling the view when the client already holds the current representation.
+    Must be applied below @jwt_required().
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_app.config['CONDITIONAL_GET_ENABLED'] or request.method != 'GET':
+            return f(*args, **kwargs)
+
+        try:
+            version, last_modified = get_data_version()
+        except Exception as e:
+            logger.warning(f"Could not determine data version, serving without validators: {str(e)}")
+            return f(*args, **kwargs)
+
+        # Responses are filtered per user (role/state), so the caller is part of the tag
+        etag = hashlib.sha1(
+            f"{version}|{get_jwt_identity()}|{request.full_path}".encode('utf-8')
+        ).hexdigest()
+
+        not_modified = _not_modified(etag, last_modified)
+        record_cache('conditional_get', hit=not_modified)
+        if not_modified:
+            response = current_app.response_class(status=304)
+        else:
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        response.set_etag(etag, weak=True)
+        if last_modified:
+            response.last_modified = last_modified
+        # Clients may keep the response but must revalidate it on every use
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return decorated_function
@@ -0,0 +1,243 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the checkout wait histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+class PoolStats:
+    """Checkout counters and wait-time histogram of one connection pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.bucket_counts = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        # Called with (wait_ms, timed_out) after every checkout, e.g. by the metrics exporter
+        self.wait_listeners = []
+
+    def record_wait(self, wait_ms, timed_out=False):
+        with self._lock:
+            self.bucket_counts[bisect.bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+            self.wait_total_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+        for listener in self.wait_listeners:
+            listener(wait_ms, timed_out)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def record_checkout(self):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def record_checkin(self):
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def record_invalidation(self):
+        with self._lock:
+            self.invalidations += 1
+
+    def wait_percentile(self, percentile):
+        """Upper bucket bound (ms) below which `percentile` of the checkout waits fall"""
+        with self._lock:
+            counts = list(self.bucket_counts)
+        total = sum(counts)
+        if not total:
+            return None
+        threshold = total * percentile / 100
+        running = 0
+        for bound, count in zip(WAIT_BUCKETS_MS + (None,), counts):
+            running += count
+            if running >= threshold:
+                return bound
+        return None
+
+    def to_dict(self):
+        with self._lock:
+            waits = sum(self.bucket_counts)
+            histogram = [
+                {'le_ms': bound, 'count': count}
+                for bound, count in zip(WAIT_BUCKETS_MS + (None,), self.bucket_counts)
+            ]
+            data = {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'connects': self.connects,
+                'invalidations': self.invalidations,
+                'in_use': self.in_use,
+                'peak_in_use': self.peak_in_use,
+                'wait_ms': {
+                    'count': waits,
+                    'avg': round(self.wait_total_ms / waits, 3) if waits else None,
+                    'max': round(self.wait_max_ms, 3),
+                    'histogram': histogram
+                }
+            }
+        data['wait_ms']['p95_le'] = self.wait_percentile(95)
+        return data
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times how long each checkout waits for a free connection"""
+
+    def __init__(self, *args, stats=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = stats or PoolStats()
+        self._checkout = threading.local()
+
+    def _waited_ms(self):
+        # Opening a new connection is not waiting for a free one
+        return (time.perf_counter() - self._checkout.started) * 1000 - self._checkout.connect_ms
+
+    def _do_get(self):
+        if getattr(self._checkout, 'started', None) is not None:
+            # QueuePool._do_get retries by calling itself; the outermost call is timed
+            return super()._do_get()
+        self._checkout.started = time.perf_counter()
+        self._checkout.connect_ms = 0.0
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record_wait(self._waited_ms(), timed_out=True)
+            self.stats.record_timeout()
+            logger.warning(
+                f"Connection pool checkout timed out after {self._timeout}s "
+                f"({self.checkedout()} checked out, size {self.size()}, overflow {self.overflow()})"
+            )
+            raise
+        else:
+            self.stats.record_wait(self._waited_ms())
+            return connection
+        finally:
+            self._checkout.started = None
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            if getattr(self._checkout, 'started', None) is not None:
+                self._checkout.connect_ms += (time.perf_counter() - started) * 1000
+
+    def recreate(self):
+        # engine.dispose() recreates the pool; keep accumulating into the same stats
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+def _listen(pool):
+    stats = pool.stats
+    event.listen(pool, 'connect', lambda *args: stats.record_connect())
+    event.listen(pool, 'checkout', lambda *args: stats.record_checkout())
+    event.listen(pool, 'checkin', lambda *args: stats.record_checkin())
+    event.listen(pool, 'invalidate', lambda *args: stats.record_invalidation())
+
+def connection_demand(config):
+    """
+    Connections one worker process may hold at once: each request thread
+    holds one, and a dashboard bundle request holds DASHBOARD_BUNDLE_WORKERS
+    more for its sections
+    """
+    return config['WEB_THREADS'] * (1 + max(1, config['DASHBOARD_BUNDLE_WORKERS']))
+
+def adaptive_pool_options(config):
+    """
+    Pool sizing derived from the worker model of one process: every request
+    thread holds a connection, a dashboard bundle request fans out to
+    DASHBOARD_BUNDLE_WORKERS more, and the scheduler needs one of its own.
+    The checkout timeout is kept well below the worker timeout so pool
+    exhaustion surfaces as an error instead of a killed worker.
+    """
+    threads = config['WEB_THREADS']
+    scheduler = 1 if config['SCHEDULER_ENABLED'] else 0
+    return {
+        'pool_size': threads + scheduler,
+        'max_overflow': connection_demand(config) - threads,
+        'pool_timeout': max(5, config['WEB_TIMEOUT'] // 4)
+    }
+
+def uses_queue_pool(uri):
+    """Whether the dialect of a database URI pools its connections in a QueuePool by default"""
+    if not uri:
+        return False
+    try:
+        url = make_url(uri)
+        return issubclass(url.get_dialect().get_pool_class(url), QueuePool)
+    except Exception:
+        return False
+
+def configure_pool(app):
+    """Install the instrumented pool (and adaptive sizing if enabled) before the engines are created"""
+    options = dict(app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+    if app.config['DB_POOL_ADAPTIVE']:
+        options.update(adaptive_pool_options(app.config))
+        logger.info(
+            f"Adaptive pool sizing: pool_size={options['pool_size']}, "
+            f"max_overflow={options['max_overflow']}, pool_timeout={options['pool_timeout']}s"
+        )
+    if app.config['DB_POOL_STATS_ENABLED'] and uses_queue_pool(app.config.get('SQLALCHEMY_DATABASE_URI')):
+        options['poolclass'] = InstrumentedQueuePool
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+def register_pool_events(app):
+    """Attach checkout/checkin listeners to every instrumented engine pool"""
+    with app.app_context():
+        from app.extensions import db
+        for engine in db.engines.values():
+            if isinstance(engine.pool, InstrumentedQueuePool):
+                # Listeners registered on a pool are carried over when it is recreated
+                _listen(engine.pool)
+
+def pool_snapshot(engine):
+    """Live state and accumulated statistics of an engine's pool"""
+    pool = engine.pool
+    data = {'pool_class': type(pool).__name__, 'status': pool.status()}
+    if isinstance(pool, QueuePool):
+        data.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': pool.overflow(),
+            'max_overflow': pool._max_overflow,
+            'timeout_s': pool.timeout()
+        })
+    stats = getattr(pool, 'stats', None)
+    if stats is not None:
+        data['stats'] = stats.to_dict()
+        # Observed concurrency is the smallest pool that would never have made a checkout wait
+        data['recommended_pool_size'] = stats.peak_in_use
+    return data
+
+def get_pool_stats():
+    """Pool snapshots of every configured bind in this (worker) process"""
+    from app.extensions import db
+    return {
+        'pid': os.getpid(),
+        'adaptive': current_app.config['DB_POOL_ADAPTIVE'],
+        'pools': {
+            bind or 'default': pool_snapshot(engine)
+            for bind, engine in db.engines.items()
+        }
+    }
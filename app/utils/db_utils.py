@@ -1,19 +1,47 @@
+import logging
 import os
+import time
 from app import db
 from sqlalchemy import text
 
+logger = logging.getLogger(__name__)
+
+def _statement_label(command, max_length=400):
+    """First non-comment line of a SQL statement, used to identify it in job run history"""
+    lines = [
+        line.strip() for line in command.splitlines()
+        if line.strip() and not line.strip().startswith('--')
+    ]
+    label = ' '.join(lines)
+    return label[:max_length]
+
 def execute_sql_file(filepath):
-    """Execute a SQL file with proper text handling"""
+    """Execute a SQL file with proper text handling.
+
+    Returns:
+        List[dict]: one entry per executed statement with its position, label,
+        duration in milliseconds and rows affected (None when the driver reports -1)
+    """
     try:
         with open(filepath, 'r') as sql_file:
             sql_commands = sql_file.read()
+            statements = []
             # Execute each statement separately
             for command in sql_commands.split(';'):
                 if command.strip():
-                    db.session.execute(text(command))
+                    started = time.perf_counter()
+                    result = db.session.execute(text(command))
+                    duration_ms = (time.perf_counter() - started) * 1000
+                    rowcount = getattr(result, 'rowcount', -1)
+                    statements.append({
+                        'position': len(statements) + 1,
+                        'statement': _statement_label(command),
+                        'duration_ms': round(duration_ms, 3),
+                        'rows_affected': rowcount if rowcount is not None and rowcount >= 0 else None
+                    })
             db.session.commit()
-            return True
+            return statements
     except Exception as e:
         db.session.rollback()
-        print(f"Error executing SQL file: {str(e)}")
+        logger.error(f"Error executing SQL file {filepath}: {str(e)}")
         raise e
@@ -1,5 +1,6 @@
 from flask import jsonify
 from sqlalchemy.exc import SQLAlchemyError
+from .fields import FieldSelectionError
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,6 +10,10 @@ def register_error_handlers(app):
     def not_found_error(error):
         return jsonify({"error": "Resource not found"}), 404
 
+    @app.errorhandler(FieldSelectionError)
+    def field_selection_error(error):
+        return jsonify({"error": str(error)}), 400
+
     @app.errorhandler(SQLAlchemyError)
     def database_error(error):
         logger.error(f'Database error occurred: {str(error)}')
@@ -0,0 +1,73 @@
+from flask import request
+from sqlalchemy import inspect
+from sqlalchemy.orm import Load
+
+class FieldSelectionError(ValueError):
+    """Raised when ?fields= names a section or field the endpoint does not have"""
+
+def available_fields(source):
+    """Selectable names of a section: the column attributes of a model, or an explicit list"""
+    if isinstance(source, type):
+        return [prop.key for prop in inspect(source).column_attrs]
+    return list(source)
+
+def parse_fields(sections, default=None, value=None):
+    """
+    Parse a sparse fieldset such as ?fields=final_score,case_manager.fullname
+    Args:
+        sections: {section name: model class or list of names} the endpoint returns
+        default: section selected by plain (undotted) names
+        value: selection string, defaults to the `fields` query parameter
+    Returns:
+        None when no selection is given, otherwise {section: [names]} for every
+        section; sections the selection does not mention keep all their fields.
+    """
+    value = request.args.get('fields') if value is None else value
+    if not value or not value.strip():
+        return None
+
+    requested = {}
+    for name in (part.strip() for part in value.split(',')):
+        if not name:
+            continue
+        section, _, field = name.rpartition('.')
+        section = section or default
+        if section not in sections:
+            named = sorted(s for s in sections if s)
+            raise FieldSelectionError(
+                f"Unknown field section '{section or name}'. "
+                + (f"Allowed: {', '.join(named)}" if named else "Use plain field names on this endpoint")
+            )
+        requested.setdefault(section, set()).add(field)
+
+    selection = {}
+    for section, source in sections.items():
+        allowed = available_fields(source)
+        names = requested.get(section)
+        if names is None:
+            selection[section] = allowed
+            continue
+        unknown = names - set(allowed)
+        if unknown:
+            raise FieldSelectionError(
+                f"Unknown fields {', '.join(sorted(unknown))}"
+                f"{f' in {section}' if section else ''}. Allowed: {', '.join(allowed)}"
+            )
+        # Keep the model's column order so responses are stable
+        selection[section] = [name for name in allowed if name in names]
+    return selection
+
+def load_only_fields(model, names, *required):
+    """Loader option restricting the SELECT list of `model` to names, plus required columns and the primary key"""
+    keys = dict.fromkeys([*names, *required])
+    return Load(model).load_only(*[getattr(model, key) for key in keys])
+
+def dump_fields(obj, names):
+    """Selected column attributes of a model instance as a dict"""
+    return {name: getattr(obj, name) for name in names}
+
+def select_fields(data, names):
+    """Trim a computed document (e.g. an aggregate) to the selected top-level keys"""
+    if names is None:
+        return data
+    return {key: value for key, value in data.items() if key in names}
@@ -0,0 +1,67 @@
+from datetime import date
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    orjson-backed JSON provider.
+
+    Output matches Flask's default provider (sorted keys, dates as HTTP dates,
+    Decimal as string) unless JSON_DATETIME_FORMAT is 'iso', in which case
+    dates and datetimes are serialized natively by orjson in ISO 8601.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.iso_dates = app.config.get('JSON_DATETIME_FORMAT', 'http') == 'iso'
+
+    def _option(self, pretty=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if not self.iso_dates:
+            # Hand dates to default() so they keep Flask's HTTP date format
+            option |= orjson.OPT_PASSTHROUGH_DATETIME
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def _default(self, obj):
+        if isinstance(obj, date):
+            return http_date(obj)
+        return self.default(obj)
+
+    def _dumps_bytes(self, obj, pretty=False):
+        return orjson.dumps(obj, default=self._default, option=self._option(pretty))
+
+    def dumps(self, obj, **kwargs):
+        # Custom json.dumps arguments are only honoured by the standard library
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(
+            self._dumps_bytes(obj, pretty) + b'\n', mimetype=self.mimetype
+        )
+
+def init_json_provider(app):
+    """Install the fast provider when enabled and orjson is available"""
+    if app.config['JSON_PROVIDER'] != 'fast':
+        return False
+    if orjson is None:
+        return False
+    app.json = FastJSONProvider(app)
+    return True
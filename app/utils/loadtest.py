@@ -0,0 +1,266 @@
+"""
+HTTP load generator for sizing web workers and database pools.
+
+Creates synthetic users for each role (Super Admin, State, Admin,
+CaseManager), bound to states, facilities and case managers of the current
+data, and mints their access tokens. A pool of client threads then drives a
+weighted mix of the dashboard, performance, CMT, mobile and facility
+endpoints of a running instance, normally `flask serve` on a database filled
+by `flask gen-synthetic`. Reports throughput, latency percentiles and error
+rates per route.
+
+Tokens are signed with this app's JWT_SECRET_KEY and the users are written
+to this app's database, so both must be the ones the server under test uses.
+"""
+import http.client
+import logging
+import random
+import threading
+import time
+from collections import Counter, namedtuple
+from datetime import datetime, timedelta
+from urllib.parse import quote, urlsplit
+from flask_jwt_extended import create_access_token
+from sqlalchemy import select, delete
+from app.models import User, Roles, UserRoles, CaseManager, CaseManagerClaims, CMT, State, Facility
+from app.utils.predicates import day_start
+from app.utils.telemetry import percentile
+
+logger = logging.getLogger(__name__)
+
+# Synthetic users are recognised, and removed, by this email domain
+USER_EMAIL_DOMAIN = 'loadtest.invalid'
+
+# Share of traffic per role: case managers polling the mobile app outnumber dashboard users
+ROLE_WEIGHTS = {'Super Admin': 1, 'State': 3, 'Admin': 4, 'CaseManager': 8}
+
+# Dashboard windows are the 12 weeks up to the reference date
+WINDOW_DAYS = 84
+
+Route = namedtuple('Route', ['name', 'path', 'weight'])
+
+WEB_ROUTES = [
+    Route('dashboard.stats', '/api/dashboard/stats?start={start}&end={end}', 6),
+    Route('dashboard.stats[pediatrics]', '/api/dashboard/stats?start={start}&end={end}&pediatrics=true', 1),
+    Route('dashboard.appointment-trends', '/api/dashboard/appointment-trends?start={start}&end={end}', 3),
+    Route('dashboard.top3-cmts', '/api/dashboard/top3-cmts', 2),
+    Route('dashboard.top3-case-managers', '/api/dashboard/top3-case-managers', 2),
+    Route('performance.case-managers', '/api/performance/case-managers', 3),
+    Route('performance.cmts', '/api/performance/cmts', 2),
+    Route('performance.case-manager', '/api/performance/case-managers/{case_manager_id}', 2),
+    Route('performance.cmt', '/api/performance/cmts/{cmt_name}', 1),
+    Route('cmt.list', '/api/cmt/list', 1),
+    Route('cmt.all', '/api/cmt/', 2),
+    Route('cmt.single', '/api/cmt/{cmt_id}', 1),
+    Route('facilities', '/api/facilities/?state_id={state_id}', 1),
+    Route('facilities.states', '/api/facilities/states', 1),
+]
+
+ROUTES = {
+    'Super Admin': WEB_ROUTES,
+    'State': WEB_ROUTES,
+    'Admin': WEB_ROUTES,
+    'CaseManager': [Route('mobile.stats', '/api/case-managers/mobile/stats', 1)],
+}
+
+def remove_users(session):
+    """Delete the synthetic users with their roles and claims; returns how many were removed"""
+    user_ids = session.execute(
+        select(User.id).where(User.email.like(f'%@{USER_EMAIL_DOMAIN}'))
+    ).scalars().all()
+    if user_ids:
+        session.execute(delete(CaseManagerClaims).where(CaseManagerClaims.user_id.in_(user_ids)))
+        session.execute(delete(UserRoles).where(UserRoles.user_id.in_(user_ids)))
+        session.execute(delete(User).where(User.id.in_(user_ids)))
+    session.commit()
+    return len(user_ids)
+
+def _role_ids(session):
+    """Ids of the load-tested roles, creating the ones missing from user.Roles"""
+    existing = dict(session.execute(
+        select(Roles.role_name, Roles.id).where(Roles.role_name.in_(ROUTES))
+    ).all())
+    for name in ROUTES:
+        if name not in existing:
+            role = Roles(role_name=name)
+            session.add(role)
+            session.flush()
+            existing[name] = role.id
+    return existing
+
+def create_users(session, users_per_role=5, seed=42):
+    """
+    Replace the synthetic users: `users_per_role` per role, each bound to a
+    random case manager's state (State, Admin), facility (Admin) or identity
+    (CaseManager). Returns the user contexts the routes are filled from.
+    """
+    rng = random.Random(seed)
+    case_managers = session.execute(
+        select(CaseManager.id, CaseManager.cmt, CaseManager.state, CaseManager.facilities)
+    ).all()
+    if not case_managers:
+        raise ValueError('No case managers to bind users to; run `flask gen-synthetic` first')
+
+    remove_users(session)
+    role_ids = _role_ids(session)
+    state_ids = dict(session.execute(select(State.name, State.id)).all())
+    facility_ids = dict(session.execute(select(Facility.name, Facility.id)).all())
+    cmt_ids = dict(session.execute(select(CMT.name, CMT.id)).all())
+
+    users = []
+    for role in ROUTES:
+        for number in range(users_per_role):
+            case_manager = rng.choice(case_managers)
+            scoped = role in ('State', 'Admin')
+            user = User(
+                email=f"{role.lower().replace(' ', '-')}-{number + 1}@{USER_EMAIL_DOMAIN}",
+                fullname=f"Load Test {role} {number + 1}",
+                role=role,
+                state_id=state_ids.get(case_manager.state) if scoped else None,
+                facility_id=facility_ids.get(case_manager.facilities) if role == 'Admin' else None,
+                is_active=1
+            )
+            session.add(user)
+            session.flush()
+            session.add(UserRoles(role_id=role_ids[role], user_id=user.id))
+            if role == 'CaseManager':
+                session.add(CaseManagerClaims(
+                    user_id=user.id, claim_type='CaseManagerExternalId', claim_value=case_manager.id
+                ))
+            users.append({
+                'user_id': user.id,
+                'role': role,
+                'state_id': state_ids.get(case_manager.state),
+                'case_manager_id': case_manager.id,
+                'cmt_name': case_manager.cmt,
+                'cmt_id': cmt_ids.get(case_manager.cmt)
+            })
+    session.commit()
+    return users
+
+def mint_tokens(users, expires=timedelta(hours=12)):
+    """Add an access token to each user context, as UserService.authenticate issues them"""
+    for user in users:
+        user['token'] = create_access_token(identity=str(user['user_id']), expires_delta=expires)
+    return users
+
+def summarize(samples, elapsed):
+    """
+    Per-route and total throughput, latency percentiles (ms) and error rate
+    of [(route, seconds, status)] samples collected over `elapsed` seconds
+    (throughput is 0 when no time elapsed). Errors are 4xx/5xx responses and failed requests (status None).
+    """
+    by_route = {}
+    for route, seconds, status in samples:
+        by_route.setdefault(route, []).append((seconds, status))
+    if samples:
+        by_route['total'] = [(seconds, status) for _, seconds, status in samples]
+
+    summary = {}
+    for route, rows in by_route.items():
+        latencies = sorted(seconds * 1000 for seconds, _ in rows)
+        statuses = Counter(str(status) if status else 'failed' for _, status in rows)
+        errors = sum(1 for _, status in rows if not status or status >= 400)
+        summary[route] = {
+            'requests': len(rows),
+            'throughput': round(len(rows) / elapsed, 2) if elapsed > 0 else 0.0,
+            'p50_ms': round(percentile(latencies, 50), 1),
+            'p95_ms': round(percentile(latencies, 95), 1),
+            'p99_ms': round(percentile(latencies, 99), 1),
+            'max_ms': round(latencies[-1], 1),
+            'errors': errors,
+            'error_rate': round(errors / len(rows), 4),
+            'statuses': dict(statuses)
+        }
+    return summary
+
+class _Client:
+    """One keep-alive connection to the server under test, reopened after failures"""
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' \
+            else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.connection = None
+
+    def get(self, path, token):
+        if self.connection is None:
+            self.connection = self.connection_class(self.netloc, timeout=self.timeout)
+        try:
+            self.connection.request('GET', self.prefix + path, headers={
+                'Authorization': f'Bearer {token}',
+                'Accept-Encoding': 'gzip'
+            })
+            response = self.connection.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException) as e:
+            logger.debug(f"Request to {path} failed: {e}")
+            self.close()
+            return None
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+def _path(route, user, window):
+    values = {key: quote(str(value), safe='') for key, value in user.items() if value is not None}
+    return route.path.format(**{**values, **window})
+
+def run_load(base_url, users, duration=60, concurrency=16, warmup=5, role_weights=None,
+             reference=None, seed=42, timeout=30):
+    """
+    Drive the route mix from `concurrency` client threads for `warmup` +
+    `duration` seconds; requests completing during the warm-up are not
+    counted. Returns {'duration', 'concurrency', 'routes': summarize(...)}.
+    """
+    role_weights = {role: weight for role, weight in (role_weights or ROLE_WEIGHTS).items()
+                    if weight > 0 and any(user['role'] == role for user in users)}
+    if not role_weights:
+        raise ValueError('No users for any role with a positive weight')
+    users_by_role = {role: [user for user in users if user['role'] == role] for role in role_weights}
+    end = day_start(reference or datetime.now())
+    window = {
+        'start': (end - timedelta(days=WINDOW_DAYS)).strftime('%Y-%m-%d'),
+        'end': end.strftime('%Y-%m-%d')
+    }
+
+    started = time.perf_counter()
+    measured_from = started + warmup
+    deadline = measured_from + duration
+    samples = [[] for _ in range(concurrency)]
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        client = _Client(base_url, timeout)
+        roles, weights = list(role_weights), list(role_weights.values())
+        try:
+            while time.perf_counter() < deadline:
+                role = rng.choices(roles, weights=weights)[0]
+                user = rng.choice(users_by_role[role])
+                route = rng.choices(ROUTES[role], weights=[r.weight for r in ROUTES[role]])[0]
+                sent = time.perf_counter()
+                status = client.get(_path(route, user, window), user['token'])
+                received = time.perf_counter()
+                if received >= measured_from:
+                    samples[index].append((route.name, received - sent, status))
+        finally:
+            client.close()
+
+    threads = [threading.Thread(target=worker, args=(index,), daemon=True) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = min(time.perf_counter(), deadline) - measured_from
+
+    logger.info(f"Load test finished: {sum(len(s) for s in samples)} requests in {elapsed:.1f}s")
+    return {
+        'duration': round(elapsed, 1),
+        'concurrency': concurrency,
+        'routes': summarize([sample for worker_samples in samples for sample in worker_samples], elapsed)
+    }
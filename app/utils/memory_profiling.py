@@ -0,0 +1,241 @@
+"""
+Per-request memory profiles with tracemalloc, aggregated per endpoint.
+
+A profiled request (sent by a Super Admin with `X-Memory-Profile: 1`, or
+picked at MEMORY_PROFILING_SAMPLE_RATE) runs with tracemalloc tracing
+allocations from its start. While it runs, a watcher thread snapshots the
+traced memory whenever it has grown past the last snapshot, so the largest
+snapshot approximates what was allocated at the peak. When the request
+ends, that peak snapshot and a final one (what the request left allocated:
+caches, the response body, leaks) give the top allocation sites of each.
+Every site is reported with the innermost app frame that led to it, so an
+allocation inside marshmallow or SQLAlchemy is attributed to the service
+line that asked for it.
+
+tracemalloc is process wide: one request per worker is profiled at a time,
+allocations of requests running concurrently on other threads are included,
+and the worker allocates more slowly while a request is profiled.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from flask import g, request
+from app.utils.profiling import REPO_ROOT, requested_by_admin, short_path
+from app.utils.telemetry import configure_store, read_store, sampled, percentile
+
+logger = logging.getLogger(__name__)
+
+store_logger = logging.getLogger('app.memory_profiles')
+
+APP_DIR = os.path.join(REPO_ROOT, 'app') + os.sep
+
+# Snapshots during the request are taken when traced memory grew by this share since the last one
+SNAPSHOT_GROWTH = 0.2
+
+_profiling = threading.Lock()
+
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+def _app_frame(traceback):
+    """Innermost frame of the app's own code in an allocation traceback (oldest frame first)"""
+    for frame in reversed(traceback):
+        if frame.filename.startswith(APP_DIR) and frame.filename != __file__:
+            return f"{short_path(frame.filename)}:{frame.lineno}"
+    return None
+
+def top_sites(snapshot, limit=10):
+    """Largest allocation sites of a snapshot: [{'site', 'app_frame', 'size_kb', 'count'}]"""
+    if snapshot is None:
+        return []
+    sites = {}
+    for stat in snapshot.filter_traces(_SNAPSHOT_FILTERS).statistics('traceback'):
+        leaf = stat.traceback[-1]
+        key = (f"{short_path(leaf.filename)}:{leaf.lineno}", _app_frame(stat.traceback))
+        site = sites.setdefault(key, {'site': key[0], 'app_frame': key[1], 'size': 0, 'count': 0})
+        site['size'] += stat.size
+        site['count'] += stat.count
+    largest = sorted(sites.values(), key=lambda site: site['size'], reverse=True)[:limit]
+    return [
+        {'site': site['site'], 'app_frame': site['app_frame'],
+         'size_kb': round(site['size'] / 1024, 1), 'count': site['count']}
+        for site in largest
+    ]
+
+class RequestMemoryProfile:
+    """tracemalloc session of one request, with a watcher keeping the largest snapshot"""
+
+    def __init__(self, frames=40, interval=0.05):
+        self.frames = frames
+        self.interval = interval
+        self.peak_snapshot = None
+        self._peak_snapshot_size = 0
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        tracemalloc.start(self.frames)
+        self._watcher = threading.Thread(target=self._watch, name='memory-watcher', daemon=True)
+        self._watcher.start()
+        return self
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            current = tracemalloc.get_traced_memory()[0]
+            if current > self._peak_snapshot_size * (1 + SNAPSHOT_GROWTH):
+                self.peak_snapshot = tracemalloc.take_snapshot()
+                self._peak_snapshot_size = current
+
+    def stop(self, limit=10):
+        """Stop tracing; returns the peak and retained sizes and top sites"""
+        self._stop.set()
+        self._watcher.join()
+        try:
+            retained, peak = tracemalloc.get_traced_memory()
+            final = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+        # The final snapshot is the better picture of the peak when the request ended near it
+        peak_snapshot = self.peak_snapshot if self._peak_snapshot_size > retained else final
+        return {
+            'duration_ms': round((time.perf_counter() - self.started) * 1000, 3),
+            'peak_kb': round(peak / 1024, 1),
+            'retained_kb': round(retained / 1024, 1),
+            'peak_snapshot_kb': round(max(self._peak_snapshot_size, retained) / 1024, 1),
+            'peak_sites': top_sites(peak_snapshot, limit),
+            'retained_sites': top_sites(final, limit)
+        }
+
+def register_memory_profiling(app):
+    """Profile the memory of requests sent with X-Memory-Profile by a Super Admin, and a sample of all"""
+    config = app.config
+    if not config['MEMORY_PROFILING_ENABLED']:
+        return
+    try:
+        configure_store(store_logger, config['MEMORY_PROFILING_FILE'], config['MEMORY_PROFILING_MAX_BYTES'],
+                        config['MEMORY_PROFILING_BACKUP_COUNT'])
+    except OSError as e:
+        logger.warning(f"Memory profiling disabled, cannot open {config['MEMORY_PROFILING_FILE']}: {str(e)}")
+        return
+    rate = config['MEMORY_PROFILING_SAMPLE_RATE']
+
+    @app.before_request
+    def start_memory_profile():
+        if not (sampled(rate) or requested_by_admin('X-Memory-Profile')):
+            return
+        # Another request, or a benchmark, is already tracing this process
+        if tracemalloc.is_tracing() or not _profiling.acquire(blocking=False):
+            return
+        try:
+            g.memory_profile = RequestMemoryProfile(frames=config['MEMORY_PROFILING_FRAMES']).start()
+        except Exception:
+            _profiling.release()
+            raise
+
+    @app.after_request
+    def tag_memory_profile(response):
+        profile = g.get('memory_profile')
+        if profile is not None:
+            g.memory_profile_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def finish_memory_profile(exc):
+        profile = g.pop('memory_profile', None)
+        if profile is None:
+            return
+        try:
+            result = profile.stop(limit=config['MEMORY_PROFILING_TOP'])
+        finally:
+            _profiling.release()
+        entry = {
+            'recorded_at': datetime.utcnow().isoformat(),
+            'endpoint': request.endpoint or 'unmatched',
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'status': g.pop('memory_profile_status', 500),
+            'pid': os.getpid(),
+            **result
+        }
+        try:
+            store_logger.info(json.dumps(entry, default=str))
+        except Exception as e:
+            logger.warning(f"Could not write memory profile: {str(e)}")
+        if result['peak_kb'] >= config['MEMORY_PROFILING_WARN_KB']:
+            top = result['peak_sites'][0] if result['peak_sites'] else {}
+            logger.warning(
+                f"{entry['method']} {entry['endpoint']} peaked at {result['peak_kb']:.0f} KB"
+                f"{' mostly at ' + (top.get('app_frame') or top['site']) if top else ''}"
+            )
+
+    logger.info(f"Memory profiling {rate:.1%} of requests and X-Memory-Profile requests")
+
+def read_profiles(path, since=None, endpoint=None):
+    """Request profiles of the store and its backups, oldest first"""
+    profiles = [
+        profile for profile in read_store(path)
+        if (since is None or profile['recorded_at'] >= since.isoformat())
+        and (endpoint is None or profile['endpoint'] == endpoint)
+    ]
+    return sorted(profiles, key=lambda profile: profile['recorded_at'])
+
+def endpoint_summary(path, hours=None, sort='peak', sites=10):
+    """
+    Profiled requests grouped by endpoint, largest first by maximum peak or
+    by average retained memory: request count, peak and retained KB
+    statistics and the allocation sites that weigh most at the peak, summed
+    over the requests (with the number of requests each appeared in).
+    """
+    since = datetime.utcnow() - timedelta(hours=hours) if hours else None
+    groups = {}
+    for profile in read_profiles(path, since):
+        group = groups.setdefault(profile['endpoint'], {
+            'endpoint': profile['endpoint'], 'peaks': [], 'retained': [], 'sites': {},
+            'first_seen': profile['recorded_at']
+        })
+        group['peaks'].append(profile['peak_kb'])
+        group['retained'].append(profile['retained_kb'])
+        group['last_seen'] = profile['recorded_at']
+        for site in profile['peak_sites']:
+            key = (site['site'], site['app_frame'])
+            total = group['sites'].setdefault(key, {
+                'site': site['site'], 'app_frame': site['app_frame'], 'total_kb': 0.0, 'max_kb': 0.0, 'requests': 0
+            })
+            total['total_kb'] += site['size_kb']
+            total['max_kb'] = max(total['max_kb'], site['size_kb'])
+            total['requests'] += 1
+
+    summary = []
+    for group in groups.values():
+        peaks = sorted(group['peaks'])
+        top = sorted(group['sites'].values(), key=lambda site: site['total_kb'], reverse=True)[:sites]
+        for site in top:
+            site['total_kb'] = round(site['total_kb'], 1)
+        summary.append({
+            'endpoint': group['endpoint'],
+            'requests': len(peaks),
+            'peak_kb': {
+                'avg': round(sum(peaks) / len(peaks), 1),
+                'p95': percentile(peaks, 95),
+                'max': peaks[-1]
+            },
+            'retained_kb_avg': round(sum(group['retained']) / len(group['retained']), 1),
+            'first_seen': group['first_seen'],
+            'last_seen': group['last_seen'],
+            'top_sites': top
+        })
+    key = {
+        'peak': lambda entry: entry['peak_kb']['max'],
+        'retained': lambda entry: entry['retained_kb_avg']
+    }[sort]
+    return sorted(summary, key=key, reverse=True)
@@ -0,0 +1,240 @@
+"""
+Prometheus metrics for /metrics.
+
+Request, database, pool and cache metrics are recorded in the process that
+observes them. Under `flask serve` each gunicorn worker is a separate
+process: set PROMETHEUS_MULTIPROC_DIR (before the app is created) to a
+directory shared by the workers and prometheus_client keeps every worker's
+values in its own memory-mapped file there, merged when /metrics is
+scraped. Recording is a local in-memory update, no cross-process locking.
+Scheduled job durations are read from the job_runs table at scrape time, so
+they include runs of `flask run-scheduler` in its own process.
+"""
+import glob
+import logging
+import os
+import time
+from datetime import timezone
+from flask import g, request, has_request_context
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, REGISTRY, generate_latest, multiprocess
+)
+from prometheus_client.core import GaugeMetricFamily, CounterMetricFamily
+from sqlalchemy import event, func
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+REQUESTS = Counter(
+    'http_requests_total', 'HTTP requests served', ['blueprint', 'endpoint', 'method', 'status']
+)
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Time to produce the response', ['blueprint', 'endpoint', 'method'],
+    buckets=LATENCY_BUCKETS
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    'http_requests_in_flight', 'Requests being served', ['blueprint', 'endpoint'], multiprocess_mode='livesum'
+)
+REQUEST_DB_TIME = Histogram(
+    'http_request_db_duration_seconds', 'Time spent executing SQL per request', ['blueprint', 'endpoint'],
+    buckets=LATENCY_BUCKETS
+)
+REQUEST_DB_STATEMENTS = Histogram(
+    'http_request_db_statements', 'SQL statements executed per request', ['blueprint', 'endpoint'],
+    buckets=STATEMENT_BUCKETS
+)
+POOL_CHECKED_OUT = Gauge(
+    'db_pool_checked_out', 'Pooled connections in use', ['bind'], multiprocess_mode='livesum'
+)
+POOL_CHECKOUTS = Counter('db_pool_checkouts_total', 'Connection pool checkouts', ['bind'])
+POOL_CONNECTS = Counter('db_pool_connects_total', 'New database connections opened', ['bind'])
+POOL_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds', 'Time a checkout waited for a free connection', ['bind'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+POOL_TIMEOUTS = Counter('db_pool_checkout_timeouts_total', 'Checkouts that timed out', ['bind'])
+CACHE_REQUESTS = Counter('cache_requests_total', 'Cache lookups by result (hit or miss)', ['cache', 'result'])
+
+def record_cache(cache, hit):
+    """Count a lookup of `cache`; the hit ratio is hits / (hits + misses)"""
+    CACHE_REQUESTS.labels(cache=cache, result='hit' if hit else 'miss').inc()
+
+def _route_labels():
+    # Unmatched URLs share one label so scanners cannot grow the series without bound
+    return {'blueprint': request.blueprint or '', 'endpoint': request.endpoint or 'unmatched'}
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_db_seconds = 0.0
+    g.metrics_db_statements = 0
+    g.metrics_labels = _route_labels()
+    REQUESTS_IN_FLIGHT.labels(**g.metrics_labels).inc()
+
+def _after_request(response):
+    labels = g.get('metrics_labels')
+    if labels is None:
+        return response
+    REQUESTS.labels(**labels, method=request.method, status=str(response.status_code)).inc()
+    REQUEST_LATENCY.labels(**labels, method=request.method).observe(time.perf_counter() - g.metrics_started)
+    REQUEST_DB_TIME.labels(**labels).observe(g.metrics_db_seconds)
+    REQUEST_DB_STATEMENTS.labels(**labels).observe(g.metrics_db_statements)
+    return response
+
+def _teardown_request(exc):
+    labels = g.pop('metrics_labels', None)
+    if labels is not None:
+        REQUESTS_IN_FLIGHT.labels(**labels).dec()
+
+def _before_cursor_execute(conn, *args):
+    conn.info['metrics_started'] = time.perf_counter()
+
+def _after_cursor_execute(conn, *args):
+    started = conn.info.pop('metrics_started', None)
+    # Statements of bundle sections run outside the request context and are not attributed
+    if started is None or not has_request_context() or 'metrics_db_seconds' not in g:
+        return
+    g.metrics_db_seconds += time.perf_counter() - started
+    g.metrics_db_statements += 1
+
+def _listen_pool(bind, engine):
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    pool = engine.pool
+    checked_out = POOL_CHECKED_OUT.labels(bind=bind)
+    checkouts = POOL_CHECKOUTS.labels(bind=bind)
+    connects = POOL_CONNECTS.labels(bind=bind)
+    event.listen(pool, 'checkout', lambda *args: (checkouts.inc(), checked_out.inc()))
+    event.listen(pool, 'checkin', lambda *args: checked_out.dec())
+    event.listen(pool, 'connect', lambda *args: connects.inc())
+
+    stats = getattr(pool, 'stats', None)
+    if stats is not None:
+        wait = POOL_WAIT.labels(bind=bind)
+        timeouts = POOL_TIMEOUTS.labels(bind=bind)
+
+        def on_wait(wait_ms, timed_out):
+            wait.observe(wait_ms / 1000)
+            if timed_out:
+                timeouts.inc()
+        stats.wait_listeners.append(on_wait)
+
+class JobRunCollector:
+    """Last duration, last success and run counts of each scheduled job, from job_runs"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def collect(self):
+        # Imported here so the utils package does not import the models eagerly
+        from app.extensions import db
+        from app.models import JobRun
+
+        last_duration = GaugeMetricFamily(
+            'scheduler_job_last_duration_seconds', 'Duration of the latest finished run', labels=['job_id', 'status']
+        )
+        last_success = GaugeMetricFamily(
+            'scheduler_job_last_success_timestamp_seconds', 'End of the latest successful run', labels=['job_id']
+        )
+        runs = CounterMetricFamily('scheduler_job_runs', 'Recorded job runs', labels=['job_id', 'status'])
+        try:
+            with self.app.app_context():
+                latest = db.session.query(
+                    JobRun.job_id, func.max(JobRun.started_at).label('started_at')
+                ).filter(JobRun.finished_at.isnot(None)).group_by(JobRun.job_id).subquery()
+                for run in db.session.query(JobRun).join(
+                    latest, (JobRun.job_id == latest.c.job_id) & (JobRun.started_at == latest.c.started_at)
+                ):
+                    last_duration.add_metric([run.job_id, run.status], (run.duration_ms or 0) / 1000)
+
+                succeeded = db.session.query(JobRun.job_id, func.max(JobRun.finished_at)).filter(
+                    JobRun.status == 'succeeded'
+                ).group_by(JobRun.job_id)
+                for job_id, finished_at in succeeded:
+                    # job_runs times are naive UTC
+                    last_success.add_metric([job_id], finished_at.replace(tzinfo=timezone.utc).timestamp())
+
+                counts = db.session.query(JobRun.job_id, JobRun.status, func.count()).group_by(
+                    JobRun.job_id, JobRun.status
+                )
+                for job_id, status, count in counts:
+                    runs.add_metric([job_id, status], count)
+                db.session.remove()
+        except Exception as e:
+            logger.warning(f"Could not collect job run metrics: {str(e)}")
+        yield from (last_duration, last_success, runs)
+
+class PoolCollector:
+    """Configured size and overflow of the scraped worker's pools"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def collect(self):
+        from app.extensions import db
+
+        size = GaugeMetricFamily('db_pool_size', 'Pool size of the scraped worker', labels=['bind'])
+        overflow = GaugeMetricFamily(
+            'db_pool_max_overflow', 'Maximum overflow of the scraped worker', labels=['bind']
+        )
+        with self.app.app_context():
+            for bind, engine in db.engines.items():
+                pool = engine.pool
+                if hasattr(pool, 'size'):
+                    size.add_metric([bind or 'default'], pool.size())
+                    overflow.add_metric([bind or 'default'], pool._max_overflow)
+        yield from (size, overflow)
+
+def multiprocess_dir():
+    return os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+
+def reset_multiprocess_dir():
+    """Remove the value files of a previous server run; call in the master before forking"""
+    directory = multiprocess_dir()
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    for name in glob.glob(os.path.join(directory, '*.db')):
+        os.remove(name)
+
+def mark_worker_dead(pid):
+    """Drop the live gauges of an exited worker"""
+    if multiprocess_dir():
+        multiprocess.mark_process_dead(pid)
+
+def metrics_response(app):
+    """(body, content type) of the current metrics of all workers"""
+    if multiprocess_dir():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = CollectorRegistry()
+        registry.register(_DefaultRegistryCollector())
+    registry.register(PoolCollector(app))
+    registry.register(JobRunCollector(app))
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+class _DefaultRegistryCollector:
+    """The process-local metrics of the default registry, for single-process servers"""
+
+    def collect(self):
+        return REGISTRY.collect()
+
+def register_metrics(app):
+    """Time and count every request and attach the SQL and pool listeners to every engine"""
+    if not app.config['METRICS_ENABLED']:
+        return
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+
+    with app.app_context():
+        from app.extensions import db
+        for bind, engine in db.engines.items():
+            _listen_pool(bind or 'default', engine)
+
+    if multiprocess_dir():
+        logger.info(f"Metrics shared across workers through {multiprocess_dir()}")
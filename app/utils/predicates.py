@@ -0,0 +1,107 @@
+"""
+Sargable date predicates for the dashboard and mobile metrics.
+
+Each helper states a day-based window as a plain range on the column,
+against bounds computed here and sent as parameters, so SQL Server can seek
+on an index of the column instead of evaluating DATEDIFF/DATEADD per row.
+`today()` and `now()` come from the application clock; keep the API and
+database servers on the same timezone, as the GETDATE() forms they replace
+assumed.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import and_, func, select, literal, false
+from app.sql_functions import date_add_days, date_diff_days
+
+def now():
+    """Bound parameter equivalent of GETDATE()"""
+    return datetime.now()
+
+def day_start(value):
+    """Midnight of a date, datetime or ISO date string (None stays None)"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return datetime(value.year, value.month, value.day)
+
+def today():
+    """Bound parameter equivalent of CAST(GETDATE() AS date)"""
+    return day_start(now())
+
+def within_days_before(column, reference, days):
+    """
+    column falls on the day of `reference` or up to `days` calendar days before it.
+    Sargable form of DATEDIFF(day, column, reference) BETWEEN 0 AND days.
+    """
+    if reference is None:
+        # DATEDIFF against NULL matched nothing
+        return false()
+    upper = day_start(reference) + timedelta(days=1)
+    return and_(column >= upper - timedelta(days=days + 1), column < upper)
+
+def at_least_days_before(column, reference, days):
+    """
+    column falls at least `days` calendar days before the day of `reference`.
+    Sargable form of DATEDIFF(day, CAST(column AS date), CAST(reference AS date)) >= days.
+    """
+    if reference is None:
+        return false()
+    return column < day_start(reference) - timedelta(days=days - 1)
+
+def days_before_until(column, reference, days):
+    """
+    column lies between midnight `days` days before the day of `reference` and
+    midnight of that day, both inclusive.
+    Sargable form of column BETWEEN DATEADD(day, -days, CAST(reference AS date)) AND CAST(reference AS date).
+    """
+    if reference is None:
+        return false()
+    upper = day_start(reference)
+    return column.between(upper - timedelta(days=days), upper)
+
+def _legacy_predicates(reference):
+    """The DATEDIFF/DATEADD forms the helpers replaced, paired with their rewrite"""
+    # Imported here so the utils package does not import the models eagerly
+    from app.models import Patient
+
+    reference_day = literal(day_start(reference))
+    return {
+        'vl_result_within_365_days': (
+            Patient,
+            date_diff_days(Patient.date_of_current_viral_load, literal(reference)).between(0, 365),
+            within_days_before(Patient.date_of_current_viral_load, reference, 365)
+        ),
+        'art_start_180_days_before': (
+            Patient,
+            date_diff_days(Patient.art_start_date, literal(reference)) >= 180,
+            at_least_days_before(Patient.art_start_date, reference, 180)
+        ),
+        'vl_result_last_12_months': (
+            Patient,
+            and_(
+                Patient.date_of_current_viral_load >= date_add_days(reference_day, -365),
+                Patient.date_of_current_viral_load <= reference_day
+            ),
+            days_before_until(Patient.date_of_current_viral_load, reference, 365)
+        ),
+    }
+
+def verify_equivalence(session, reference=None):
+    """
+    Count the rows matched by each legacy predicate and by its sargable
+    rewrite. Returns [{'predicate', 'legacy', 'sargable', 'equal'}].
+    """
+    reference = reference or now()
+    results = []
+    for name, (model, legacy, sargable) in _legacy_predicates(reference).items():
+        legacy_count = session.execute(select(func.count()).select_from(model).where(legacy)).scalar()
+        sargable_count = session.execute(select(func.count()).select_from(model).where(sargable)).scalar()
+        results.append({
+            'predicate': name,
+            'legacy': legacy_count,
+            'sargable': sargable_count,
+            'equal': legacy_count == sargable_count
+        })
+    return results
@@ -0,0 +1,377 @@
+"""
+On-demand sampling CPU profiler.
+
+A background thread reads the Python stacks of the profiled threads every
+PROFILING_INTERVAL_MS (sys._current_frames) and counts each distinct stack,
+so the profiled code runs unmodified and pays only for the sampler holding
+the GIL while it copies the frames. Nothing runs until a profile is asked
+for:
+
+- a Super Admin sends `X-Profile: 1` with any request: that request's thread
+  is sampled, and so are pool threads while they work for it (the dashboard
+  bundle's sections, through profiled_thread); the profile is stored and its
+  id returned in `X-Profile-Id`;
+- GET /api/admin/profile?seconds=N samples every thread of the serving
+  worker for N seconds, i.e. whatever traffic it is handling meanwhile.
+
+Profiles are stored as JSON in PROFILING_DIR and rendered as collapsed
+stacks (the input of flamegraph.pl, speedscope, inferno) or a flamegraph SVG.
+Sampling counts wall time: a thread waiting on the database shows up in the
+driver's execute frame.
+"""
+import html
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+# Sampler of the request being profiled, seen by the pool threads running in a copy of its context
+_request_sampler = ContextVar('request_sampler', default=None)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Leaf frames of threads parked waiting for work (gunicorn's selector, idle pool
+# threads, the log listener); left out of worker profiles unless asked for
+IDLE_FRAMES = {
+    ('selectors.py', 'select'),
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('queue.py', 'get'),
+    ('thread.py', '_worker'),
+    ('socket.py', 'accept'),
+    ('socket.py', 'readinto'),
+}
+
+PROFILE_ID = re.compile(r'^[0-9a-f]{32}$')
+
+_labels = {}
+
+def short_path(filename):
+    if 'site-packages' in filename:
+        return filename.split('site-packages' + os.sep, 1)[-1]
+    if filename.startswith(REPO_ROOT):
+        return os.path.relpath(filename, REPO_ROOT)
+    return os.path.basename(filename)
+
+def _label(code):
+    label = _labels.get(code)
+    if label is None:
+        name = getattr(code, 'co_qualname', code.co_name)
+        # ';' separates frames in the collapsed format
+        label = f"{name} ({short_path(code.co_filename)}:{code.co_firstlineno})".replace(';', ':')
+        _labels[code] = label
+    return label
+
+def _is_idle(frame):
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+def collapse(frame):
+    """Root-first ';'-joined labels of a frame's stack"""
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+class StackSampler:
+    """
+    Counts the stacks of `thread_ids` (default: every thread but the sampler
+    and `exclude`) every `interval` seconds until stopped or `max_seconds`.
+    """
+
+    def __init__(self, interval=0.005, thread_ids=None, exclude=(), include_idle=False, max_seconds=60):
+        self.interval = interval
+        self.thread_ids = set(thread_ids) if thread_ids is not None else None
+        self.exclude = set(exclude)
+        self.include_idle = include_idle
+        self.max_seconds = max_seconds
+        self.stacks = Counter()
+        self.samples = 0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        deadline = self._started + self.max_seconds
+        while not self._stop.wait(self.interval) and time.perf_counter() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == own or ident in self.exclude:
+                    continue
+                if self.thread_ids is not None and ident not in self.thread_ids:
+                    continue
+                if not self.include_idle and _is_idle(frame):
+                    continue
+                self.stacks[collapse(frame)] += 1
+            self.samples += 1
+
+    def add_thread(self, ident):
+        if self.thread_ids is not None:
+            self.thread_ids.add(ident)
+
+    def remove_thread(self, ident):
+        if self.thread_ids is not None:
+            self.thread_ids.discard(ident)
+
+    def stop(self):
+        """Stop sampling; returns the stack counts"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self.duration = time.perf_counter() - self._started
+        return self.stacks
+
+def collapsed(stacks):
+    """Collapsed stacks text: one 'frame;frame;... count' line per stack, heaviest first"""
+    return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+def _color(name):
+    # Application code in blue-green, libraries and the runtime in the usual warm hues
+    seed = zlib.crc32(name.encode('utf-8'))
+    if ' (app/' in name:
+        return f"rgb({50 + seed % 60},{150 + seed % 80},{170 + seed % 60})"
+    return f"rgb({205 + seed % 50},{80 + seed % 130},{seed % 55})"
+
+def flamegraph_svg(stacks, title='CPU profile', width=1200, frame_height=16, min_width=0.5):
+    """Standalone flamegraph SVG (root at the bottom) of {stack: count}; hover a frame for its share"""
+    root = {'value': 0, 'children': {}}
+    for stack, count in stacks.items():
+        node = root
+        node['value'] += count
+        for name in stack.split(';'):
+            node = node['children'].setdefault(name, {'value': 0, 'children': {}})
+            node['value'] += count
+    total = root['value']
+
+    frames = []
+    pending = [('all', root, 0.0, 0)]
+    while pending:
+        name, node, x, depth = pending.pop()
+        node_width = node['value'] / total * (width - 20) if total else 0
+        if node_width < min_width:
+            continue
+        frames.append((name, node['value'], x, depth, node_width))
+        child_x = x
+        for child_name, child in sorted(node['children'].items()):
+            pending.append((child_name, child, child_x, depth + 1))
+            child_x += child['value'] / total * (width - 20)
+
+    depth = max((frame[3] for frame in frames), default=0) + 1
+    height = depth * frame_height + 60
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="Verdana, sans-serif" font-size="11">',
+        f'<rect width="100%" height="100%" fill="#f8f8f8"/>',
+        f'<text x="{width / 2}" y="20" text-anchor="middle" font-size="15">{html.escape(title)}</text>',
+        f'<text x="10" y="{height - 8}">{total} samples</text>',
+    ]
+    for name, value, x, level, frame_width in frames:
+        y = height - 30 - (level + 1) * frame_height
+        share = value / total * 100
+        fill = '#c8c8c8' if name == 'all' else _color(name)
+        escaped = html.escape(name)
+        parts.append(
+            f'<g><title>{escaped} ({value} samples, {share:.2f}%)</title>'
+            f'<rect x="{x + 10:.2f}" y="{y}" width="{frame_width:.2f}" height="{frame_height - 1}" '
+            f'fill="{fill}" rx="2"/>'
+        )
+        chars = int((frame_width - 6) / 7)
+        if chars >= 3:
+            text = name if len(name) <= chars else name[:chars - 2] + '..'
+            parts.append(f'<text x="{x + 13:.2f}" y="{y + frame_height - 4}">{html.escape(text)}</text>')
+        parts.append('</g>')
+    parts.append('</svg>')
+    return '\n'.join(parts)
+
+def save_profile(directory, sampler, kind, route=None, max_files=200):
+    """Store a stopped sampler's profile as <id>.json, dropping the oldest beyond `max_files`"""
+    os.makedirs(directory, exist_ok=True)
+    profile_id = uuid.uuid4().hex
+    profile = {
+        'id': profile_id,
+        'kind': kind,
+        'route': route,
+        'recorded_at': datetime.utcnow().isoformat(),
+        'pid': os.getpid(),
+        'duration_ms': round(sampler.duration * 1000, 3),
+        'interval_ms': sampler.interval * 1000,
+        'samples': sampler.samples,
+        'stacks': dict(sampler.stacks)
+    }
+    with open(os.path.join(directory, f'{profile_id}.json'), 'w', encoding='utf-8') as store:
+        json.dump(profile, store)
+
+    stored = sorted(
+        (os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.json')),
+        key=os.path.getmtime
+    )
+    for name in stored[:-max_files]:
+        try:
+            os.remove(name)
+        except OSError:
+            pass
+    return profile
+
+def load_profile(directory, profile_id):
+    if not PROFILE_ID.match(profile_id):
+        return None
+    try:
+        with open(os.path.join(directory, f'{profile_id}.json'), encoding='utf-8') as store:
+            return json.load(store)
+    except (OSError, ValueError):
+        return None
+
+def list_profiles(directory, limit=50):
+    """Stored profiles without their stacks, newest first"""
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in os.listdir(directory):
+        profile = load_profile(directory, name[:-len('.json')]) if name.endswith('.json') else None
+        if profile is not None:
+            profile.pop('stacks')
+            profiles.append(profile)
+    profiles.sort(key=lambda p: p['recorded_at'], reverse=True)
+    return profiles[:limit] if limit else profiles
+
+def merge_profiles(directory, route=None, limit=200):
+    """One profile summing the stacks of the latest `limit` request profiles, optionally of one route"""
+    stacks = Counter()
+    merged = {'id': None, 'kind': 'merged', 'route': route, 'pid': None, 'profiles': 0,
+              'duration_ms': 0.0, 'samples': 0}
+    for summary in list_profiles(directory, limit=None):
+        if summary['kind'] != 'request' or (route and summary['route'] != route):
+            continue
+        profile = load_profile(directory, summary['id'])
+        if profile is None:
+            continue
+        stacks.update(profile['stacks'])
+        merged['profiles'] += 1
+        merged['duration_ms'] += profile['duration_ms']
+        merged['samples'] += profile['samples']
+        if merged['profiles'] >= limit:
+            break
+    merged['stacks'] = dict(stacks)
+    return merged
+
+def render_profile(profile, fmt):
+    """(body, mimetype) of a stored profile as 'collapsed' stacks or a flamegraph 'svg'"""
+    stacks = Counter(profile['stacks'])
+    if fmt == 'svg':
+        title = f"{profile['route'] or profile['kind']}: {profile['duration_ms']:.0f} ms"
+        if profile.get('profiles'):
+            title += f" over {profile['profiles']} requests"
+        elif profile.get('pid'):
+            title += f", pid {profile['pid']}"
+        return flamegraph_svg(stacks, title=title), 'image/svg+xml'
+    return collapsed(stacks), 'text/plain'
+
+def profile_worker(config, seconds, include_idle=False):
+    """Sample every thread of this worker but the calling one for `seconds`; returns the stored profile"""
+    sampler = StackSampler(
+        interval=config['PROFILING_INTERVAL_MS'] / 1000,
+        exclude={threading.get_ident()},
+        include_idle=include_idle,
+        max_seconds=seconds
+    ).start()
+    time.sleep(seconds)
+    sampler.stop()
+    return save_profile(config['PROFILING_DIR'], sampler, 'worker', max_files=config['PROFILING_MAX_FILES'])
+
+def requested_by_admin(header):
+    """Whether the request sets `header` and carries a Super Admin token"""
+    if request.headers.get(header, '').lower() not in ('1', 'true', 'yes'):
+        return False
+    # Imported here: app.services imports app.utils helpers
+    from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+    from app.services import UserService
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        # The route reports the invalid token itself
+        return False
+    user = UserService.get_user_by_id(identity) if identity else None
+    if not user or 'Super Admin' not in user['roles']:
+        logger.info(f"Ignoring {header} from a non admin user on {request.path}")
+        return False
+    return True
+
+@contextmanager
+def profiled_thread():
+    """Sample the current (pool) thread along with the request it works for, if that request is profiled"""
+    sampler = _request_sampler.get()
+    if sampler is None:
+        yield
+        return
+    ident = threading.get_ident()
+    sampler.add_thread(ident)
+    try:
+        yield
+    finally:
+        sampler.remove_thread(ident)
+
+def _stop_request_sampler():
+    sampler = g.pop('profile_sampler', None)
+    if sampler is not None:
+        _request_sampler.reset(g.pop('profile_sampler_token'))
+        sampler.stop()
+    return sampler
+
+def register_profiling(app):
+    """Profile requests sent with `X-Profile: 1` by a Super Admin"""
+    config = app.config
+    if not config['PROFILING_ENABLED']:
+        return
+
+    @app.before_request
+    def start_profile():
+        if requested_by_admin('X-Profile'):
+            g.profile_sampler = StackSampler(
+                interval=config['PROFILING_INTERVAL_MS'] / 1000,
+                thread_ids={threading.get_ident()},
+                include_idle=True,
+                max_seconds=config['PROFILING_MAX_SECONDS']
+            ).start()
+            g.profile_sampler_token = _request_sampler.set(g.profile_sampler)
+
+    @app.after_request
+    def finish_profile(response):
+        sampler = _stop_request_sampler()
+        if sampler is None:
+            return response
+        try:
+            profile = save_profile(
+                config['PROFILING_DIR'], sampler, 'request',
+                route=f"{request.method} {request.endpoint or request.path}",
+                max_files=config['PROFILING_MAX_FILES']
+            )
+            response.headers['X-Profile-Id'] = profile['id']
+        except OSError as e:
+            logger.warning(f"Could not store profile: {str(e)}")
+        return response
+
+    @app.teardown_request
+    def stop_profile(exc):
+        # after_request does not run when the view raised
+        _stop_request_sampler()
@@ -0,0 +1,163 @@
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+from sqlalchemy import select, func, and_
+from app import db
+from app.models import Patient, DrugPickup, ViralLoad, CaseManager
+from app.utils.predicates import within_days_before
+
+SHOWPLAN_NS = '{http://schemas.microsoft.com/sqlserver/2004/07/showplan}'
+
+SCAN_OPERATORS = {'Table Scan', 'Clustered Index Scan', 'Index Scan'}
+SEEK_OPERATORS = {'Index Seek', 'Clustered Index Seek'}
+
+def _sample_values():
+    """Representative literal values taken from the data, so the plans reflect real selectivity"""
+    sample = db.session.query(Patient.state, Patient.case_manager_id).filter(
+        Patient.state.isnot(None), Patient.case_manager_id.isnot(None)
+    ).first()
+    case_manager = db.session.query(CaseManager.id).first()
+    end = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return {
+        'state': sample.state if sample else 'Lagos',
+        'cm_id': sample.case_manager_id if sample else 1,
+        'case_manager_id': case_manager.id if case_manager else 'CM0001',
+        'start': end - timedelta(days=90),
+        'end': end
+    }
+
+def hot_queries():
+    """The line list and appointment predicates the services filter and join on"""
+    v = _sample_values()
+    return {
+        'line_list_by_case_manager': select(Patient.id, Patient.pep_id, Patient.current_art_status).where(
+            Patient.case_manager_id == v['cm_id']
+        ),
+        'line_list_active_in_state': select(func.count()).select_from(Patient).where(
+            Patient.state == v['state'], Patient.current_art_status == 'Active'
+        ),
+        'line_list_pickups_in_window': select(func.count()).select_from(Patient).where(
+            Patient.state == v['state'],
+            Patient.pharmacy_last_pickup_date.between(v['start'], v['end'])
+        ),
+        'line_list_iit_in_window': select(func.count()).select_from(Patient).where(
+            Patient.state == v['state'],
+            Patient.current_art_status != 'Active',
+            Patient.iit_due_date.between(v['start'], v['end'])
+        ),
+        'line_list_vl_eligible': select(func.count()).select_from(Patient).where(
+            Patient.state == v['state'],
+            Patient.current_art_status == 'Active',
+            Patient.days_on_art_int >= 180
+        ),
+        'line_list_vl_results_in_window': select(func.count()).select_from(Patient).where(
+            Patient.state == v['state'],
+            Patient.current_art_status == 'Active',
+            within_days_before(Patient.date_of_current_viral_load, v['end'], 365)
+        ),
+        'line_list_pediatric_in_state': select(func.count()).select_from(Patient).where(
+            Patient.state == v['state'], Patient.is_pediatric == True
+        ),
+        'viral_load_join_line_list': select(func.count()).select_from(ViralLoad).join(
+            Patient,
+            and_(Patient.pep_id == ViralLoad.pep_id, Patient.datim_code == ViralLoad.datim_code)
+        ).where(ViralLoad.state == v['state']),
+        'drug_pickup_appointment_range': select(
+            func.min(DrugPickup.next_appointment_date), func.max(DrugPickup.next_appointment_date)
+        ),
+        'drug_pickups_by_case_manager': select(func.count()).select_from(DrugPickup).where(
+            DrugPickup.case_manager == v['case_manager_id'],
+            DrugPickup.next_appointment_date.between(v['start'], v['end'])
+        ),
+        'viral_loads_by_case_manager': select(func.count()).select_from(ViralLoad).where(
+            ViralLoad.case_manager == v['case_manager_id']
+        ),
+        'case_manager_by_id': select(CaseManager.cm_id, CaseManager.fullname).where(
+            CaseManager.id == v['case_manager_id']
+        ),
+    }
+
+def _summarize_mssql(plan_xml):
+    root = ET.fromstring(plan_xml)
+    operators = [
+        {
+            'operator': rel_op.get('PhysicalOp'),
+            'object': next(
+                (f"{obj.get('Table', '').strip('[]')}.{obj.get('Index', '').strip('[]')}".rstrip('.')
+                 for obj in rel_op.iter(f'{SHOWPLAN_NS}Object')),
+                None
+            ),
+            'estimated_rows': float(rel_op.get('EstimateRows', 0))
+        }
+        for rel_op in root.iter(f'{SHOWPLAN_NS}RelOp')
+        if rel_op.get('PhysicalOp') in SCAN_OPERATORS | SEEK_OPERATORS
+    ]
+    statement = next(root.iter(f'{SHOWPLAN_NS}StmtSimple'), None)
+    cost = statement.get('StatementSubTreeCost') if statement is not None else None
+    return operators, float(cost) if cost else None
+
+def _explain_mssql(connection, sql):
+    connection.exec_driver_sql('SET SHOWPLAN_XML ON')
+    try:
+        plan_xml = connection.exec_driver_sql(sql).scalar()
+    finally:
+        connection.exec_driver_sql('SET SHOWPLAN_XML OFF')
+    return _summarize_mssql(plan_xml)
+
+def _explain_sqlite(connection, sql):
+    operators = []
+    for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}'):
+        detail = row[-1]
+        if detail.startswith('SCAN'):
+            operators.append({'operator': 'Table Scan' if 'INDEX' not in detail else 'Index Scan', 'object': detail})
+        elif detail.startswith('SEARCH'):
+            operators.append({'operator': 'Index Seek', 'object': detail})
+    return operators, None
+
+def explain(connection, statement):
+    """Plan summary of a statement: access operators, scans/seeks and estimated cost"""
+    dialect = connection.dialect
+    # Plans are requested for the literal statement; SHOWPLAN cannot be combined with parameters
+    sql = str(statement.compile(
+        dialect=dialect,
+        compile_kwargs={'literal_binds': True},
+        schema_translate_map=connection.get_execution_options().get('schema_translate_map'),
+        render_schema_translate=True
+    ))
+    if dialect.name == 'mssql':
+        operators, cost = _explain_mssql(connection, sql)
+    elif dialect.name == 'sqlite':
+        operators, cost = _explain_sqlite(connection, sql)
+    else:
+        raise ValueError(f"Query plans are not supported for the {dialect.name} dialect")
+
+    return {
+        'scans': sum(1 for op in operators if op['operator'] in SCAN_OPERATORS),
+        'seeks': sum(1 for op in operators if op['operator'] in SEEK_OPERATORS),
+        'estimated_cost': cost,
+        'operators': operators
+    }
+
+def plan_report():
+    """Plans of all hot queries on the primary database"""
+    queries = hot_queries()
+    with db.engine.connect() as connection:
+        return {
+            'dialect': connection.dialect.name,
+            'generated_at': datetime.utcnow().isoformat(),
+            'queries': {name: explain(connection, statement) for name, statement in queries.items()}
+        }
+
+def compare_reports(before, after):
+    """Per-query change in scans, seeks and estimated cost between two reports"""
+    rows = []
+    for name, plan in after['queries'].items():
+        previous = before['queries'].get(name)
+        if previous is None:
+            continue
+        rows.append({
+            'query': name,
+            'scans': (previous['scans'], plan['scans']),
+            'seeks': (previous['seeks'], plan['seeks']),
+            'estimated_cost': (previous['estimated_cost'], plan['estimated_cost'])
+        })
+    return rows
@@ -30,3 +30,16 @@ def facility_access_required(f):
             return jsonify({"error": "Access denied to this facility"}), 403
         return f(*args, **kwargs)
     return decorated_function
+
+def admin_required(f):
+    """Restrict an endpoint to users holding the Super Admin role"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        # Imported here: app.services imports app.utils helpers
+        from app.services import UserService
+        user = UserService.get_user_by_id(get_jwt_identity())
+
+        if not user or 'Super Admin' not in user['roles']:
+            return jsonify({"error": "Unauthorized access"}), 403
+        return f(*args, **kwargs)
+    return decorated_function
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import has_request_context, request
+from sqlalchemy import event
+from app.utils.telemetry import configure_store, read_store
+
+logger = logging.getLogger(__name__)
+
+store_logger = logging.getLogger('app.slow_queries')
+
+SERVICES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'services')
+MAX_PARAMETERS_CHARS = 2000
+
+_local = threading.local()
+
+class SlowQueryRecorder:
+    """
+    Times every cursor execution of the engines it is attached to and writes
+    the ones above `threshold_ms` to the store: statement, parameters (with
+    `capture_parameters`), duration, rowcount, the Flask route and the
+    service method that issued it, and optionally the estimated plan. Plans
+    are taken once per statement fingerprint and process, on a separate
+    pooled connection.
+    """
+
+    def __init__(self, threshold_ms, explain=False, capture_parameters=False):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.capture_parameters = capture_parameters
+        self._explained = set()
+        self._lock = threading.Lock()
+
+    def attach(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._before)
+        event.listen(engine, 'after_cursor_execute', self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info['slow_query_started'] = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop('slow_query_started', None)
+        if started is None:
+            return
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms < self.threshold_ms or getattr(_local, 'explaining', False):
+            return
+        try:
+            self.record(conn, cursor, statement, parameters, context, executemany, duration_ms)
+        except Exception as e:
+            # Never fail the query because it could not be recorded
+            logger.warning(f"Could not record slow query: {str(e)}")
+
+    def record(self, conn, cursor, statement, parameters, context, executemany, duration_ms):
+        fingerprint = statement_fingerprint(statement)
+        entry = {
+            'recorded_at': datetime.utcnow().isoformat(),
+            'fingerprint': fingerprint,
+            'duration_ms': round(duration_ms, 3),
+            'rowcount': cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else None,
+            'executemany': executemany,
+            'statement': statement,
+            'parameters': _parameters_repr(parameters) if self.capture_parameters else None,
+            'database': conn.engine.url.database,
+            'route': None,
+            'service': calling_service(),
+            'pid': os.getpid()
+        }
+        if has_request_context():
+            entry['route'] = f"{request.method} {request.endpoint or request.path}"
+        if self.explain and context is not None and context.compiled is not None and not executemany:
+            with self._lock:
+                first = fingerprint not in self._explained
+                self._explained.add(fingerprint)
+            if first:
+                entry['plan'] = _explain(conn.engine, context.compiled.statement)
+
+        store_logger.info(json.dumps(entry, default=str))
+        logger.warning(
+            f"Slow query {fingerprint} took {duration_ms:.0f} ms"
+            f"{' in ' + entry['service'] if entry['service'] else ''}"
+            f"{' for ' + entry['route'] if entry['route'] else ''}"
+        )
+
+def statement_fingerprint(statement):
+    """Stable short id of a statement's text, ignoring whitespace and literal values"""
+    normalized = re.sub(r"'(?:[^']|'')*'", "?", statement)
+    normalized = re.sub(r'\b\d+\b', '?', normalized)
+    normalized = ' '.join(normalized.split()).lower()
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:12]
+
+def calling_service():
+    """Qualified name of the innermost app.services method on the current stack"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if code.co_filename.startswith(SERVICES_DIR):
+            return getattr(code, 'co_qualname', code.co_name)
+        frame = frame.f_back
+    return None
+
+def _parameters_repr(parameters):
+    text = repr(parameters)
+    return text if len(text) <= MAX_PARAMETERS_CHARS else text[:MAX_PARAMETERS_CHARS] + '...'
+
+def _explain(engine, statement):
+    # Imported here: query_plans imports the models
+    from app.utils.query_plans import explain
+    _local.explaining = True
+    try:
+        with engine.connect() as connection:
+            return explain(connection, statement)
+    except Exception as e:
+        return {'error': str(e)}
+    finally:
+        _local.explaining = False
+
+def register_slow_query_log(app):
+    """Attach the recorder to every engine when SLOW_QUERY_LOG_ENABLED"""
+    config = app.config
+    if not config['SLOW_QUERY_LOG_ENABLED']:
+        return None
+    try:
+        configure_store(store_logger, config['SLOW_QUERY_LOG_FILE'], config['SLOW_QUERY_LOG_MAX_BYTES'],
+                        config['SLOW_QUERY_LOG_BACKUP_COUNT'])
+    except OSError as e:
+        logger.warning(f"Slow query log disabled, cannot open {config['SLOW_QUERY_LOG_FILE']}: {str(e)}")
+        return None
+    recorder = SlowQueryRecorder(
+        threshold_ms=config['SLOW_QUERY_THRESHOLD_MS'],
+        explain=config['SLOW_QUERY_EXPLAIN'],
+        capture_parameters=config['SLOW_QUERY_CAPTURE_PARAMETERS']
+    )
+    with app.app_context():
+        from app.extensions import db
+        for engine in db.engines.values():
+            recorder.attach(engine)
+    app.extensions['slow_query_recorder'] = recorder
+    logger.info(f"Slow query log: statements over {recorder.threshold_ms} ms go to {config['SLOW_QUERY_LOG_FILE']}")
+    return recorder
+
+def read_records(path, since=None):
+    """Records of the store and its backups, optionally only those recorded after `since`"""
+    return [record for record in read_store(path) if since is None or record['recorded_at'] >= since.isoformat()]
+
+def top_offenders(path, limit=20, sort='total', hours=None):
+    """
+    Slow statements grouped by fingerprint, worst first by total, max or
+    average duration or by count, with the routes and services issuing them,
+    the slowest occurrence's parameters and the latest captured plan.
+    """
+    since = datetime.utcnow() - timedelta(hours=hours) if hours else None
+    groups = {}
+    for record in sorted(read_records(path, since), key=lambda r: r['recorded_at']):
+        group = groups.setdefault(record['fingerprint'], {
+            'fingerprint': record['fingerprint'],
+            'statement': record['statement'],
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'routes': set(),
+            'services': set(),
+            'slowest_parameters': None,
+            'max_rowcount': None,
+            'first_seen': record['recorded_at'],
+            'plan': None
+        })
+        group['count'] += 1
+        group['total_ms'] += record['duration_ms']
+        if record['duration_ms'] >= group['max_ms']:
+            group['max_ms'] = record['duration_ms']
+            group['slowest_parameters'] = record.get('parameters')
+        if record.get('rowcount') is not None:
+            group['max_rowcount'] = max(group['max_rowcount'] or 0, record['rowcount'])
+        if record.get('route'):
+            group['routes'].add(record['route'])
+        if record.get('service'):
+            group['services'].add(record['service'])
+        if record.get('plan'):
+            group['plan'] = record['plan']
+        group['last_seen'] = record['recorded_at']
+
+    for group in groups.values():
+        group['avg_ms'] = round(group['total_ms'] / group['count'], 3)
+        group['total_ms'] = round(group['total_ms'], 3)
+        group['routes'] = sorted(group['routes'])
+        group['services'] = sorted(group['services'])
+
+    key = {'total': 'total_ms', 'max': 'max_ms', 'avg': 'avg_ms', 'count': 'count'}[sort]
+    return sorted(groups.values(), key=lambda group: group[key], reverse=True)[:limit]
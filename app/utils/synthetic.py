@@ -0,0 +1,384 @@
+"""
+Synthetic line list for load tests and benchmarks.
+
+Generates states, facilities, CMTs, case managers, the patient line list,
+the drug pickup and viral load appointment snapshots and the performance
+rows, with distributions close to the production data: ART status and
+outcome mix, multi-month refills, viral load results, age bands, pregnancy
+status and case manager caseloads. Output is reproducible for a given seed,
+patient count and reference date. Rows are written with executemany in
+batches; on SQL Server create the engine with fast_executemany for speed.
+"""
+import logging
+import math
+import random
+import string
+from datetime import datetime, timedelta
+from sqlalchemy import insert, delete, select, func, inspect
+from app.models import (
+    State, Facility, CMT, CaseManager, CaseManagerPerformance, Patient, DrugPickup, ViralLoad
+)
+from app.utils.predicates import day_start
+
+logger = logging.getLogger(__name__)
+
+# State: (code, relative share of patients on treatment)
+STATES = {
+    'Abia': ('AB', 3), 'Adamawa': ('AD', 3), 'Akwa Ibom': ('AK', 8), 'Anambra': ('AN', 4),
+    'Bauchi': ('BA', 2), 'Bayelsa': ('BY', 2), 'Benue': ('BE', 8), 'Borno': ('BO', 2),
+    'Cross River': ('CR', 5), 'Delta': ('DE', 4), 'Ebonyi': ('EB', 2), 'Edo': ('ED', 3),
+    'Ekiti': ('EK', 1), 'Enugu': ('EN', 4), 'FCT': ('FC', 5), 'Gombe': ('GO', 2),
+    'Imo': ('IM', 4), 'Jigawa': ('JI', 1), 'Kaduna': ('KD', 4), 'Kano': ('KN', 3),
+    'Katsina': ('KT', 2), 'Kebbi': ('KE', 1), 'Kogi': ('KO', 2), 'Kwara': ('KW', 2),
+    'Lagos': ('LA', 9), 'Nasarawa': ('NA', 4), 'Niger': ('NI', 2), 'Ogun': ('OG', 2),
+    'Ondo': ('ON', 2), 'Osun': ('OS', 2), 'Oyo': ('OY', 3), 'Plateau': ('PL', 4),
+    'Rivers': ('RI', 7), 'Sokoto': ('SO', 1), 'Taraba': ('TA', 3), 'Yobe': ('YO', 1),
+    'Zamfara': ('ZA', 1),
+}
+
+PATIENTS_PER_FACILITY = 1500
+CASELOAD_MEDIAN = 170
+CASELOAD_RANGE = (40, 450)
+
+# currentArtStatus: (share, outcome recorded with it)
+ART_STATUSES = {
+    'Active': (0.82, None),
+    'LTFU': (0.09, None),
+    'Transferred Out': (0.04, 'Transferred out'),
+    'Death': (0.02, 'Dead'),
+    'Discontinued': (0.03, 'Stopped'),
+}
+REFILL_DAYS = {30: 0.15, 60: 0.10, 90: 0.50, 180: 0.25}
+# (band, lowest age, highest age, share)
+AGE_BANDS = [
+    ('<1', 0, 0, 0.003), ('1-4', 1, 4, 0.007), ('5-9', 5, 9, 0.012), ('10-14', 10, 14, 0.018),
+    ('15-19', 15, 19, 0.025), ('20-24', 20, 24, 0.045), ('25-29', 25, 29, 0.09),
+    ('30-34', 30, 34, 0.14), ('35-39', 35, 39, 0.17), ('40-44', 40, 44, 0.16),
+    ('45-49', 45, 49, 0.13), ('50+', 50, 75, 0.20),
+]
+FEMALE_SHARE = 0.64
+PREGNANCY_STATUSES = {'Pregnant': 0.05, 'Breastfeeding': 0.06, 'Not Pregnant': 0.89}
+SUPPRESSED_SHARE = 0.88
+VL_RESULT_SHARE = 0.85
+APPOINTMENT_KEPT_SHARE = 0.78
+SAMPLE_COLLECTED_SHARE = 0.6
+
+FACILITY_KINDS = ('General Hospital', 'Comprehensive Health Centre', 'Primary Health Centre',
+                  'Cottage Hospital', 'Specialist Hospital')
+FIRST_NAMES = ('Aisha', 'Chinedu', 'Ngozi', 'Emeka', 'Fatima', 'Ifeoma', 'Ibrahim', 'Blessing',
+               'Uche', 'Amina', 'Tunde', 'Grace', 'Musa', 'Chiamaka', 'Yusuf', 'Eno', 'Bassey', 'Kemi')
+LAST_NAMES = ('Okafor', 'Bello', 'Adeyemi', 'Eze', 'Ibrahim', 'Okon', 'Nwosu', 'Abubakar',
+              'Etim', 'Ogunleye', 'Umar', 'Obi', 'Effiong', 'Lawal', 'Akpan', 'Danjuma')
+
+GENERATED_MODELS = (
+    ViralLoad, DrugPickup, Patient, CaseManagerPerformance, CaseManager, CMT, Facility, State
+)
+
+def _choice(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+def _days_ago(reference, rng, low, high):
+    return reference - timedelta(days=rng.randint(low, high))
+
+def _viral_load(rng):
+    if rng.random() < SUPPRESSED_SHARE:
+        return float(rng.choice((0, 20, 40, 40, 49))) if rng.random() < 0.8 else float(rng.randint(50, 999))
+    return float(min(int(rng.lognormvariate(math.log(15000), 1.6)) + 1000, 5_000_000))
+
+def clear(session):
+    """Delete every row of the generated tables"""
+    for model in GENERATED_MODELS:
+        session.execute(delete(model))
+    session.commit()
+
+def _insert(session, model, rows):
+    """
+    Core executemany of rows keyed by attribute name. ORM bulk inserts would go
+    row by row to fetch the line list's computed columns back.
+    """
+    if rows:
+        columns = {prop.key: prop.columns[0].key for prop in inspect(model).column_attrs}
+        session.execute(
+            insert(model.__table__),
+            [{columns[key]: value for key, value in row.items()} for row in rows]
+        )
+
+class _Batch:
+    """Row buffers per table, written and committed every batch_size line list rows"""
+
+    def __init__(self, session, batch_size):
+        self.session = session
+        self.batch_size = batch_size
+        self.rows = {Patient: [], DrugPickup: [], ViralLoad: []}
+        self.counts = {model.__tablename__: 0 for model in self.rows}
+
+    def add(self, model, row):
+        self.rows[model].append(row)
+        if model is Patient and len(self.rows[Patient]) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        for model, rows in self.rows.items():
+            _insert(self.session, model, rows)
+            self.counts[model.__tablename__] += len(rows)
+            rows.clear()
+        self.session.commit()
+        logger.info(f"Synthetic data: {self.counts['CMPatientLineList']} line list rows written")
+
+def _plan_facilities(rng, patients):
+    """Facilities with their state, name and patient share"""
+    states = list(STATES)
+    weights = [STATES[name][1] for name in states]
+    facilities = []
+    datim_codes = set()
+    for index in range(max(1, patients // PATIENTS_PER_FACILITY)):
+        state = rng.choices(states, weights=weights)[0]
+        lga = f"{state} LGA {rng.randint(1, 20)}"
+        datim_code = ''.join(rng.choices(string.ascii_letters + string.digits, k=11))
+        while datim_code in datim_codes:
+            datim_code = ''.join(rng.choices(string.ascii_letters + string.digits, k=11))
+        datim_codes.add(datim_code)
+        facilities.append({
+            'state': state,
+            'lga': lga,
+            'datim_code': datim_code,
+            'name': f"{lga.replace(' LGA ', ' ')} {rng.choice(FACILITY_KINDS)} {index + 1}",
+            'size': rng.lognormvariate(0, 0.7)
+        })
+
+    # Patients are spread over facilities by size, summing exactly to the requested count
+    total = sum(facility['size'] for facility in facilities)
+    for facility in facilities:
+        facility['patients'] = int(patients * facility['size'] / total)
+    facilities[0]['patients'] += patients - sum(facility['patients'] for facility in facilities)
+    return facilities
+
+def _caseloads(rng, patients):
+    caseloads = []
+    while patients > 0:
+        caseload = int(rng.lognormvariate(math.log(CASELOAD_MEDIAN), 0.35))
+        caseload = min(max(caseload, CASELOAD_RANGE[0]), CASELOAD_RANGE[1], patients)
+        caseloads.append(caseload)
+        patients -= caseload
+    return caseloads
+
+def _write_structure(session, rng, facilities, now):
+    """States, facilities, CMTs and case managers; returns the case managers to fill"""
+    _insert(session, State, [{'name': name, 'code': code} for name, (code, _) in STATES.items()])
+    state_ids = dict(session.execute(select(State.name, State.id)).all())
+
+    _insert(session, Facility, [{
+        'datim_code': facility['datim_code'],
+        'name': facility['name'],
+        'state_id': state_ids[facility['state']],
+        'lga': facility['lga']
+    } for facility in facilities])
+
+    cmts = []
+    case_managers = []
+    for index, facility in enumerate(facilities):
+        teams = [f"CMT {STATES[facility['state']][0]}-{index + 1}-{team + 1}"
+                 for team in range(rng.randint(1, 3))]
+        cmts.extend({'name': team, 'state': facility['state'], 'facility_name': facility['name'],
+                     'created_at': now} for team in teams)
+        for caseload in _caseloads(rng, facility['patients']):
+            case_managers.append({
+                'id': f"CM{len(case_managers) + 1:07d}",
+                'fullname': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                'role': 'Case Manager',
+                'cmt': rng.choice(teams),
+                'state': facility['state'],
+                'facilities': facility['name'],
+                'created_at': now,
+                'caseload': caseload,
+                'facility': facility
+            })
+    _insert(session, CMT, cmts)
+    _insert(session, CaseManager, [
+        {key: value for key, value in case_manager.items() if key not in ('caseload', 'facility')}
+        for case_manager in case_managers
+    ])
+    cm_ids = dict(session.execute(select(CaseManager.id, CaseManager.cm_id)).all())
+    for case_manager in case_managers:
+        case_manager['cm_id'] = cm_ids[case_manager['id']]
+    session.commit()
+    return len(cmts), case_managers
+
+def _patient(rng, reference, case_manager, number):
+    facility = case_manager['facility']
+    band, low, high, _ = rng.choices(AGE_BANDS, weights=[band[3] for band in AGE_BANDS])[0]
+    age = rng.randint(low, high)
+    sex = 'F' if rng.random() < FEMALE_SHARE else 'M'
+    pregnancy = _choice(rng, PREGNANCY_STATUSES) if sex == 'F' and 15 <= age <= 49 else None
+    status = _choice(rng, {name: share for name, (share, _) in ART_STATUSES.items()})
+    refill = _choice(rng, REFILL_DAYS)
+
+    days_on_art = min(int(rng.lognormvariate(math.log(5 * 365), 0.8)), max(age, 1) * 365)
+    days_on_art = max(days_on_art, 14)
+    art_start = reference - timedelta(days=days_on_art)
+    if status == 'Active':
+        last_pickup = _days_ago(reference, rng, 0, refill)
+    else:
+        last_pickup = _days_ago(reference, rng, refill + 29, refill + 400)
+    last_pickup = max(last_pickup, art_start)
+
+    pep_id = f"PEP{number:08d}"
+    return {
+        'id': f"{facility['datim_code']}-{pep_id}",
+        'pep_id': pep_id,
+        'case_manager_id': case_manager['cm_id'],
+        'state': facility['state'],
+        'lga': facility['lga'],
+        'datim_code': facility['datim_code'],
+        'facility_name': facility['name'],
+        'sex': sex,
+        'dob': reference - timedelta(days=age * 365 + rng.randint(0, 364)),
+        'current_age': age,
+        'current_age_months': rng.randint(1, 11) if age == 0 else 0,
+        'age_band': band,
+        'art_start_date': art_start,
+        'days_on_art': str(days_on_art),
+        'pharmacy_last_pickup_date': last_pickup,
+        'days_of_arv_refill': refill,
+        'current_pregnancy_status': pregnancy,
+        'current_viral_load': None,
+        'date_of_current_viral_load': None,
+        'last_date_of_sample_collection': None,
+        'outcomes': ART_STATUSES[status][1],
+        'outcomes_date': _days_ago(reference, rng, 0, 300) if ART_STATUSES[status][1] else None,
+        'current_art_status': status,
+        'is_transfer_in': rng.random() < 0.05,
+        'recapture': False,
+        'recapture_count': 0
+    }
+
+def _appointments(rng, reference, patient, case_manager, metrics):
+    """Appointment snapshots of a line list row; fills its viral load fields and the CM metrics"""
+    active = patient['current_art_status'] == 'Active'
+    shared = {
+        'state': patient['state'], 'lga': patient['lga'], 'datim_code': patient['datim_code'],
+        'facility_name': patient['facility_name'], 'pep_id': patient['pep_id'], 'sex': patient['sex'],
+        'outcomes': patient['outcomes'], 'outcomes_date': patient['outcomes_date'],
+        'current_age': patient['current_age'], 'case_manager': case_manager['id']
+    }
+
+    drug_pickup = None
+    if active or patient['current_art_status'] == 'LTFU':
+        refill = patient['days_of_arv_refill']
+        kept = active and rng.random() < APPOINTMENT_KEPT_SHARE
+        # The snapshot holds the pickup before the latest one when the appointment was kept
+        previous_pickup = patient['pharmacy_last_pickup_date'] - timedelta(days=refill) if kept \
+            else patient['pharmacy_last_pickup_date']
+        drug_pickup = {
+            **shared,
+            'pharmacy_last_pickup_date': previous_pickup,
+            'days_of_arv_refill': refill,
+            'next_visit_date': previous_pickup + timedelta(days=refill),
+            'next_appointment_date': previous_pickup + timedelta(days=refill),
+            'current_age_months': patient['current_age_months'],
+            'age_band': patient['age_band'],
+            'recapture': False,
+            'recapture_count': 0
+        }
+        metrics['appointments_schedule'] += 1
+        metrics['appointments_completed'] += kept
+
+    viral_load = None
+    if active and int(patient['days_on_art']) >= 180:
+        metrics['fy_viral_load_eligible'] += 1
+        previous_sample = _days_ago(reference, rng, 150, 540)
+        collected = rng.random() < SAMPLE_COLLECTED_SHARE
+        sample = _days_ago(reference, rng, 0, 120) if collected else previous_sample
+        patient['last_date_of_sample_collection'] = sample
+        if rng.random() < VL_RESULT_SHARE:
+            result_date = min(sample + timedelta(days=rng.randint(7, 45)), reference)
+            patient['current_viral_load'] = _viral_load(rng)
+            patient['date_of_current_viral_load'] = result_date
+            metrics['viral_load_results'] += 1
+            metrics['viral_load_suppressed'] += patient['current_viral_load'] < 1000
+        viral_load = {
+            **shared,
+            'current_pregnancy_status': patient['current_pregnancy_status'],
+            'current_viral_load': patient['current_viral_load'],
+            'date_of_current_viral_load': patient['date_of_current_viral_load'],
+            'last_date_of_sample_collection': previous_sample,
+            'dob': patient['dob']
+        }
+        metrics['viral_load_eligible'] += 1
+        metrics['viral_load_samples'] += collected
+    return drug_pickup, viral_load
+
+def _rate(numerator, denominator):
+    return round(100.0 * numerator / denominator, 2) if denominator else 0
+
+def _performance(case_manager, metrics, now):
+    compliance = _rate(metrics['appointments_completed'], metrics['appointments_schedule'])
+    collection = _rate(metrics['viral_load_samples'], metrics['viral_load_eligible'])
+    suppression = _rate(metrics['viral_load_suppressed'], metrics['viral_load_results'])
+    return {
+        'CaseManagerID': case_manager['id'],
+        **metrics,
+        'appointment_compliance': compliance,
+        'sample_collection_rate': collection,
+        'suppression_rate': suppression,
+        'final_score': round((compliance + collection + suppression) / 3, 2),
+        'created_date': now,
+        'updated_date': now
+    }
+
+def generate(session, patients=1_000_000, seed=42, reference=None, batch_size=5000):
+    """
+    Populate the line list, appointment, structure and performance tables.
+    The tables must be empty (see clear()). Returns the row count per table.
+    """
+    existing = session.execute(select(func.count()).select_from(Patient)).scalar()
+    if existing:
+        raise ValueError(f"CMPatientLineList already has {existing} rows; clear the tables first")
+
+    rng = random.Random(seed)
+    reference = day_start(reference or datetime.now())
+    now = datetime.utcnow()
+
+    facilities = _plan_facilities(rng, patients)
+    cmt_count, case_managers = _write_structure(session, rng, facilities, now)
+
+    batch = _Batch(session, batch_size)
+    performance = []
+    number = 0
+    for case_manager in case_managers:
+        metrics = dict.fromkeys((
+            'tx_cur', 'iit', 'dead', 'discontinued', 'transferred_out', 'appointments_schedule',
+            'appointments_completed', 'fy_viral_load_eligible', 'viral_load_eligible',
+            'viral_load_samples', 'viral_load_results', 'viral_load_suppressed'
+        ), 0)
+        for _ in range(case_manager['caseload']):
+            number += 1
+            patient = _patient(rng, reference, case_manager, number)
+            drug_pickup, viral_load = _appointments(rng, reference, patient, case_manager, metrics)
+            status = patient['current_art_status']
+            metrics['tx_cur'] += status == 'Active'
+            metrics['iit'] += status == 'LTFU'
+            metrics['dead'] += status == 'Death'
+            metrics['discontinued'] += status == 'Discontinued'
+            metrics['transferred_out'] += status == 'Transferred Out'
+
+            batch.add(Patient, patient)
+            if drug_pickup:
+                batch.add(DrugPickup, drug_pickup)
+            if viral_load:
+                batch.add(ViralLoad, viral_load)
+        performance.append(_performance(case_manager, metrics, now))
+    batch.flush()
+
+    for start in range(0, len(performance), batch_size):
+        _insert(session, CaseManagerPerformance, performance[start:start + batch_size])
+    session.commit()
+
+    return {
+        'State': len(STATES),
+        'Facilities': len(facilities),
+        'cmt': cmt_count,
+        'case_managers': len(case_managers),
+        'performance': len(performance),
+        **batch.counts
+    }
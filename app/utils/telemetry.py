@@ -0,0 +1,51 @@
+"""
+Helpers shared by the slow query log, request tracing, memory profiles and
+load tests: rotating JSON lines stores, request sampling and percentiles.
+
+Records are written through a logger of their own per store, so each store
+rotates independently of the app log.
+"""
+import glob
+import json
+import logging
+import math
+import os
+import random
+from logging.handlers import RotatingFileHandler
+
+def configure_store(store_logger, path, max_bytes, backup_count):
+    """Append the records of `store_logger` to a rotating JSON lines file at `path`"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    for handler in list(store_logger.handlers):
+        store_logger.removeHandler(handler)
+        handler.close()
+    # Each worker rotates on its own; a worker that keeps writing to a just rotated
+    # file still lands its records in one of the backups read by read_store
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    store_logger.addHandler(handler)
+    store_logger.setLevel(logging.INFO)
+    store_logger.propagate = False
+
+def read_store(path):
+    """Records of the store at `path` and its backups, in no particular order"""
+    records = []
+    for name in glob.glob(f'{glob.escape(path)}*'):
+        with open(name, encoding='utf-8') as store:
+            for line in store:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # A line cut short by rotation in another worker
+                    continue
+    return records
+
+def sampled(rate):
+    """Whether to sample this request, at `rate` between 0 and 1"""
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+def percentile(ordered, percent):
+    """Nearest-rank percentile of an ascending list, None when empty"""
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
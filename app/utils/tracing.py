@@ -0,0 +1,246 @@
+"""
+Per-request tracing of routes, service methods and SQL statements.
+
+A sampled request opens a root span; service methods (classes decorated
+with @traced_service, or functions with @traced) and every SQL statement
+executed while it runs open child spans, so a trace reads route ->
+DashboardService.get_stats -> each count query. The current span lives in a
+ContextVar: unsampled requests and code outside a request pay one lookup.
+
+Each trace is appended as one JSON line in the Chrome Trace Event format
+({"traceEvents": [...]}) to a rotating local file. `flask traces --export`
+writes a single trace to a file that opens in Perfetto (ui.perfetto.dev),
+chrome://tracing or speedscope as a flame view.
+"""
+import inspect
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from flask import g, request
+from sqlalchemy import event
+from app.utils.telemetry import configure_store, read_store, sampled
+
+logger = logging.getLogger(__name__)
+
+store_logger = logging.getLogger('app.traces')
+
+# Spans beyond this are counted but not kept, so a runaway loop cannot exhaust memory
+MAX_SPANS = 5000
+MAX_STATEMENT_CHARS = 1000
+
+_current_span = ContextVar('current_span', default=None)
+
+class Trace:
+    """Spans of one sampled request"""
+
+    def __init__(self, trace_id):
+        self.trace_id = trace_id
+        self.started = time.perf_counter_ns()
+        self.recorded_at = datetime.utcnow()
+        self.spans = []
+        self.dropped = 0
+
+    def add(self, span):
+        # list.append is atomic, so sections running in other threads can add their spans
+        if len(self.spans) < MAX_SPANS:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+
+    def to_chrome(self, metadata):
+        """Chrome Trace Event document: one complete ('X') event per span, times in microseconds"""
+        pid = os.getpid()
+        threads = {}
+        events = []
+        for span in sorted(self.spans, key=lambda s: s.started):
+            tid = threads.setdefault(span.thread, len(threads) + 1)
+            events.append({
+                'name': span.name,
+                'cat': span.category,
+                'ph': 'X',
+                'ts': (span.started - self.started) / 1000,
+                'dur': span.duration / 1000,
+                'pid': pid,
+                'tid': tid,
+                'args': span.args
+            })
+        for tid in threads.values():
+            events.append({
+                'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                'args': {'name': 'request' if tid == 1 else f'section {tid - 1}'}
+            })
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {
+                'trace_id': self.trace_id,
+                'recorded_at': self.recorded_at.isoformat(),
+                'spans': len(self.spans),
+                'dropped_spans': self.dropped,
+                **metadata
+            }
+        }
+
+class Span:
+    """A timed section of a trace; entering makes it the parent of spans opened inside it"""
+    __slots__ = ('trace', 'name', 'category', 'args', 'started', 'duration', 'thread', '_token')
+
+    def __init__(self, trace, name, category, args=None):
+        self.trace = trace
+        self.name = name
+        self.category = category
+        self.args = args or {}
+        self.duration = 0
+
+    def __enter__(self):
+        self.thread = threading.get_ident()
+        self._token = _current_span.set(self)
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter_ns() - self.started
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.args['error'] = f"{exc_type.__name__}: {exc}"
+        self.trace.add(self)
+        return False
+
+def current_span():
+    return _current_span.get()
+
+def span(name, category='function', **args):
+    """Context manager for a child span of the current one; a no-op outside a sampled request"""
+    parent = _current_span.get()
+    if parent is None:
+        return nullcontext()
+    return Span(parent.trace, name, category, args)
+
+def traced(name=None, category='service'):
+    """Decorator recording each call of the function as a span named `name` (default: its qualified name)"""
+    def decorator(f):
+        span_name = name or f.__qualname__
+
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            parent = _current_span.get()
+            if parent is None:
+                return f(*args, **kwargs)
+            with Span(parent.trace, span_name, category):
+                return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+def traced_service(cls):
+    """Class decorator tracing every static, class and instance method of a service"""
+    for attribute, value in list(vars(cls).items()):
+        if attribute.startswith('__'):
+            continue
+        span_name = f"{cls.__name__}.{attribute}"
+        if isinstance(value, staticmethod):
+            setattr(cls, attribute, staticmethod(traced(span_name)(value.__func__)))
+        elif isinstance(value, classmethod):
+            setattr(cls, attribute, classmethod(traced(span_name)(value.__func__)))
+        elif inspect.isfunction(value):
+            setattr(cls, attribute, traced(span_name)(value))
+    return cls
+
+def _statement_name(statement):
+    verb = re.match(r'\s*(\w+)', statement)
+    table = re.search(r'\b(?:FROM|INTO|UPDATE)\s+([\w."\[\]]+)', statement, re.IGNORECASE)
+    name = verb.group(1).upper() if verb else 'SQL'
+    return f"{name} {table.group(1)}" if table else name
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    parent = _current_span.get()
+    if parent is None:
+        return
+    sql_span = Span(parent.trace, _statement_name(statement), 'sql', {
+        'statement': statement[:MAX_STATEMENT_CHARS],
+        'executemany': executemany
+    })
+    conn.info['trace_span'] = sql_span.__enter__()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    sql_span = conn.info.pop('trace_span', None)
+    if sql_span is not None:
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            sql_span.args['rowcount'] = cursor.rowcount
+        sql_span.__exit__(None, None, None)
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    sql_span = connection.info.pop('trace_span', None) if connection is not None else None
+    if sql_span is not None:
+        error = exception_context.original_exception
+        sql_span.__exit__(type(error), error, None)
+
+def register_tracing(app):
+    """Sample requests at TRACING_SAMPLE_RATE and trace their service calls and SQL"""
+    config = app.config
+    if not config['TRACING_ENABLED']:
+        return
+    try:
+        configure_store(store_logger, config['TRACING_FILE'], config['TRACING_MAX_BYTES'], config['TRACING_BACKUP_COUNT'])
+    except OSError as e:
+        logger.warning(f"Tracing disabled, cannot open {config['TRACING_FILE']}: {str(e)}")
+        return
+    rate = config['TRACING_SAMPLE_RATE']
+
+    @app.before_request
+    def start_trace():
+        if not sampled(rate):
+            return
+        trace = Trace(uuid.uuid4().hex)
+        root = Span(trace, f"{request.method} {request.endpoint or request.path}", 'request', {
+            'path': request.full_path.rstrip('?')
+        })
+        g.trace_root = root.__enter__()
+
+    @app.after_request
+    def tag_trace(response):
+        root = g.get('trace_root')
+        if root is not None:
+            root.args['status'] = response.status_code
+            response.headers['X-Trace-Id'] = root.trace.trace_id
+        return response
+
+    @app.teardown_request
+    def finish_trace(exc):
+        # Always runs, so the ContextVar never leaks into the next request on this thread
+        root = g.pop('trace_root', None)
+        if root is None:
+            return
+        root.__exit__(type(exc) if exc else None, exc, None)
+        try:
+            store_logger.info(json.dumps(root.trace.to_chrome({
+                'route': root.name,
+                'path': root.args.get('path'),
+                'status': root.args.get('status'),
+                'duration_ms': round(root.duration / 1e6, 3)
+            }), default=str))
+        except Exception as e:
+            logger.warning(f"Could not write trace {root.trace.trace_id}: {str(e)}")
+
+    with app.app_context():
+        from app.extensions import db
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(engine, 'handle_error', _handle_error)
+    logger.info(f"Tracing {rate:.1%} of requests to {config['TRACING_FILE']}")
+
+def read_traces(path):
+    """Traces of the store and its backups, oldest first"""
+    return sorted(read_store(path), key=lambda trace: trace['otherData']['recorded_at'])
+
+def find_trace(path, trace_id):
+    return next((t for t in read_traces(path) if t['otherData']['trace_id'] == trace_id), None)
@@ -22,3 +22,15 @@ def validate_date_range(f):
             
         return f(*args, **kwargs)
     return decorated_function
+
+def parse_date_range():
+    """
+    The request's start and end query parameters as datetimes, or (None, None)
+    unless both are given. Routes calling the same cached service pass the
+    dates in this one form, so they share cache entries.
+    """
+    start_date = request.args.get('start')
+    end_date = request.args.get('end')
+    if not start_date or not end_date:
+        return None, None
+    return datetime.strptime(start_date, '%Y-%m-%d'), datetime.strptime(end_date, '%Y-%m-%d')
@@ -0,0 +1,80 @@
+"""line list typed computed columns
+
+Adds persisted computed columns for the integer days on ART and the IIT due
+date (last pickup + days of refill + 28), with indexes, so the dashboard and
+mobile counts can seek on them instead of casting every row. SQLite cannot
+add stored generated columns to an existing table; it gets virtual ones,
+which can be indexed just the same.
+
+Revision ID: 5c2e1f7a9d34
+Revises: a441fa38bc41
+Create Date: 2026-10-19 13:20:11.402718
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2e1f7a9d34'
+down_revision = 'a441fa38bc41'
+branch_labels = None
+depends_on = None
+
+ACTIVE = "currentArtStatus = 'Active'"
+
+# column: (type, SQL Server expression, SQLite expression)
+COLUMNS = {
+    'daysOnArtInt': (
+        sa.Integer(),
+        'TRY_CAST(daysOnArt AS int)',
+        'CAST(daysOnArt AS INTEGER)'
+    ),
+    'iitDueDate': (
+        sa.DateTime(),
+        'DATEADD(day, CAST(TRY_CAST(daysOfArvRefill AS float) AS int) + 28, pharmacyLastPickupdate)',
+        "datetime(pharmacyLastPickupdate, '+' || (CAST(CAST(daysOfArvRefill AS REAL) AS INTEGER) + 28) || ' days')"
+    ),
+}
+
+# (name, key columns, included columns, filter)
+INDEXES = [
+    ('IX_CMPatientLineList_iitDueDate',
+     ['iitDueDate'], ['state', 'currentArtStatus', 'outcomes', 'caseManagerId'], None),
+    ('IX_CMPatientLineList_active_state_daysOnArtInt',
+     ['state', 'daysOnArtInt'],
+     ['currentViralLoad', 'dateofCurrentViralLoad', 'lastDateOfSampleCollection', 'caseManagerId'], ACTIVE),
+]
+
+
+def _is_sqlite():
+    return op.get_bind().dialect.name == 'sqlite'
+
+
+def _schema():
+    # Alembic renders ALTER TABLE itself, without the engine's schema translation
+    return None if _is_sqlite() else 'dbo'
+
+
+def upgrade():
+    sqlite = _is_sqlite()
+    for name, (type_, mssql_expression, sqlite_expression) in COLUMNS.items():
+        op.add_column('CMPatientLineList', sa.Column(
+            name, type_,
+            sa.Computed(sqlite_expression if sqlite else mssql_expression, persisted=not sqlite)
+        ), schema=_schema())
+
+    for name, columns, include, where in INDEXES:
+        op.create_index(
+            name, 'CMPatientLineList', columns, schema='dbo',
+            mssql_include=include,
+            mssql_where=sa.text(where) if where else None,
+            sqlite_where=sa.text(where) if where else None
+        )
+
+
+def downgrade():
+    for name, _, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='CMPatientLineList', schema='dbo')
+    for name in reversed(list(COLUMNS)):
+        op.drop_column('CMPatientLineList', name, schema=_schema())
@@ -0,0 +1,71 @@
+"""line list cohort flags
+
+Adds persisted isPediatric and isPmtct flags, computed from the age and the
+sex/pregnancy status columns, so the cohort filters compare one indexed bit
+instead of evaluating LOWER() and the age OR per row. Being computed columns
+they are kept current by every line list refresh. SQLite gets virtual
+columns, as in 5c2e1f7a9d34.
+
+Revision ID: 8b7d3e0c6f12
+Revises: 5c2e1f7a9d34
+Create Date: 2026-10-19 13:58:40.117204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b7d3e0c6f12'
+down_revision = '5c2e1f7a9d34'
+branch_labels = None
+depends_on = None
+
+COLUMNS = {
+    'isPediatric': (
+        'CAST(CASE WHEN (currentAge BETWEEN 0 AND 19) OR currentAgeMonths > 0 THEN 1 ELSE 0 END AS bit)'
+    ),
+    'isPmtct': (
+        "CAST(CASE WHEN LOWER(sex) = 'f' AND LOWER(currentPregnancyStatus) IN ('pregnant', 'breastfeeding') "
+        "THEN 1 ELSE 0 END AS bit)"
+    ),
+}
+
+# Filtered on the flag: the dashboard scopes by state, the performance views join on the case manager
+INCLUDE = ['currentArtStatus', 'pepId', 'datimCode']
+INDEXES = [
+    ('IX_CMPatientLineList_pediatric_state_caseManagerId', ['state', 'caseManagerId'], 'isPediatric = 1'),
+    ('IX_CMPatientLineList_pmtct_state_caseManagerId', ['state', 'caseManagerId'], 'isPmtct = 1'),
+]
+
+
+def _is_sqlite():
+    return op.get_bind().dialect.name == 'sqlite'
+
+
+def _schema():
+    # Alembic renders ALTER TABLE itself, without the engine's schema translation
+    return None if _is_sqlite() else 'dbo'
+
+
+def upgrade():
+    sqlite = _is_sqlite()
+    for name, expression in COLUMNS.items():
+        op.add_column('CMPatientLineList', sa.Column(
+            name, sa.Boolean(), sa.Computed(expression, persisted=not sqlite)
+        ), schema=_schema())
+
+    for name, columns, where in INDEXES:
+        op.create_index(
+            name, 'CMPatientLineList', columns, schema='dbo',
+            mssql_include=INCLUDE,
+            mssql_where=sa.text(where),
+            sqlite_where=sa.text(where)
+        )
+
+
+def downgrade():
+    for name, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='CMPatientLineList', schema='dbo')
+    for name in reversed(list(COLUMNS)):
+        op.drop_column('CMPatientLineList', name, schema=_schema())
@@ -0,0 +1,68 @@
+"""line list and appointment indexes
+
+Indexes for the predicates the dashboard, performance and mobile services
+filter and join on. The INCLUDE lists make the dashboard counts covering on
+SQL Server; the filtered index serves the many `currentArtStatus = 'Active'`
+counts. Other dialects get the plain key columns (SQLite keeps the filter).
+
+Revision ID: a441fa38bc41
+Revises: 
+Create Date: 2026-10-19 12:45:36.618150
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a441fa38bc41'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+ACTIVE = "currentArtStatus = 'Active'"
+
+# (name, table, schema, key columns, included columns, filter)
+INDEXES = [
+    ('IX_CMPatientLineList_caseManagerId', 'CMPatientLineList', 'dbo',
+     ['caseManagerId'], ['currentArtStatus', 'state'], None),
+    ('IX_CMPatientLineList_pepId_datimCode', 'CMPatientLineList', 'dbo',
+     ['pepId', 'datimCode'], ['currentAge', 'currentAgeMonths', 'sex', 'currentPregnancyStatus'], None),
+    ('IX_CMPatientLineList_state_currentArtStatus', 'CMPatientLineList', 'dbo',
+     ['state', 'currentArtStatus'],
+     ['outcomes', 'pharmacyLastPickupdate', 'daysOfArvRefill', 'currentAge', 'currentAgeMonths',
+      'sex', 'currentPregnancyStatus'], None),
+    ('IX_CMPatientLineList_pharmacyLastPickupdate', 'CMPatientLineList', 'dbo',
+     ['pharmacyLastPickupdate'], ['state', 'currentArtStatus', 'caseManagerId'], None),
+    ('IX_CMPatientLineList_active_state', 'CMPatientLineList', 'dbo',
+     ['state'],
+     ['daysOnArt', 'artStartDate', 'currentViralLoad', 'dateofCurrentViralLoad',
+      'lastDateOfSampleCollection', 'caseManagerId'], ACTIVE),
+    ('IX_DrugPickupAppointment_estimatedNextAppointmentPharmacy', 'DrugPickupAppointment', 'dbo',
+     ['estimatedNextAppointmentPharmacy'], ['CaseManagerId', 'State'], None),
+    ('IX_DrugPickupAppointment_CaseManagerId', 'DrugPickupAppointment', 'dbo',
+     ['CaseManagerId'], ['estimatedNextAppointmentPharmacy', 'PharmacyLastPickupdate'], None),
+    ('IX_VLAppointment_CaseManagerId', 'VLAppointment', 'dbo',
+     ['CaseManagerId'], ['DateofCurrentViralLoad', 'CurrentViralLoad', 'lastDateOfSampleCollection'], None),
+    ('IX_VLAppointment_PepID_DatimCode', 'VLAppointment', 'dbo',
+     ['PepID', 'DatimCode'], ['State'], None),
+    ('IX_case_managers_id', 'case_managers', 'cms',
+     ['id'], ['cm_id', 'cmt', 'state', 'facilities'], None),
+    ('IX_case_managers_cmt_state_facilities', 'case_managers', 'cms',
+     ['cmt', 'state', 'facilities'], ['cm_id', 'id'], None),
+]
+
+
+def upgrade():
+    for name, table, schema, columns, include, where in INDEXES:
+        op.create_index(
+            name, table, columns, schema=schema,
+            mssql_include=include,
+            mssql_where=sa.text(where) if where else None,
+            sqlite_where=sa.text(where) if where else None
+        )
+
+
+def downgrade():
+    for name, table, schema, _, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, schema=schema)
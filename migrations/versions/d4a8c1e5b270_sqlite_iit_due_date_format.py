@@ -0,0 +1,56 @@
+"""sqlite iit due date format
+
+Recreates the SQLite iitDueDate column of 5c2e1f7a9d34 in SQLAlchemy's
+datetime storage format ('YYYY-MM-DD HH:MM:SS.ffffff', as date_add_days
+renders it) so it compares correctly with stored values and bound
+parameters, and NULL when daysOfArvRefill is NULL. SQL Server's column is
+unchanged.
+
+Revision ID: d4a8c1e5b270
+Revises: 8b7d3e0c6f12
+Create Date: 2026-10-19 14:35:02.581946
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a8c1e5b270'
+down_revision = '8b7d3e0c6f12'
+branch_labels = None
+depends_on = None
+
+INDEX = 'IX_CMPatientLineList_iitDueDate'
+
+EXPRESSION = (
+    "(strftime('%Y-%m-%d %H:%M:%f', pharmacyLastPickupdate, "
+    "((CAST(CAST(daysOfArvRefill AS REAL) AS INTEGER) + 28) || ' days')) || '000')"
+)
+PREVIOUS_EXPRESSION = (
+    "datetime(pharmacyLastPickupdate, '+' || (CAST(CAST(daysOfArvRefill AS REAL) AS INTEGER) + 28) || ' days')"
+)
+
+
+def _is_sqlite():
+    return op.get_bind().dialect.name == 'sqlite'
+
+
+def _replace_column(expression):
+    # SQLite cannot alter a generated column: drop it with its index and add it again
+    op.drop_index(INDEX, table_name='CMPatientLineList', schema='dbo')
+    op.drop_column('CMPatientLineList', 'iitDueDate')
+    op.add_column('CMPatientLineList', sa.Column(
+        'iitDueDate', sa.DateTime(), sa.Computed(expression, persisted=False)
+    ))
+    op.create_index(INDEX, 'CMPatientLineList', ['iitDueDate'], schema='dbo')
+
+
+def upgrade():
+    if _is_sqlite():
+        _replace_column(EXPRESSION)
+
+
+def downgrade():
+    if _is_sqlite():
+        _replace_column(PREVIOUS_EXPRESSION)